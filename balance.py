@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from typing import List, Dict, Optional, Any, Callable
+
+from constants import *
+from engine import Simulation, GameMode, Direction, OccupancyGrid, FOOD_TYPES, DIFFICULTIES, CAMPAIGN_LEVELS
+
+# Monte Carlo balance runner. Plays many seeded headless games per
+# configuration on a process pool and reports score, survival and pickup
+# statistics. Every finished game is appended to a JSONL results file as
+# soon as its chunk completes, so an interrupted run picks up where it left
+# off when started again with the same arguments.
+#
+#   python balance.py --games 2000 --difficulty EASY NORMAL HARD
+#   python balance.py --mode CAMPAIGN --rarity golden=10 --tag golden10
+#   python balance.py --report-only
+
+def random_policy(sim: Simulation, rng: random.Random) -> Optional[Direction]:
+    return rng.choice(list(Direction))
+
+def greedy_policy(sim: Simulation, rng: random.Random) -> Optional[Direction]:
+    # Head for the nearest food worth eating, never step into a wall,
+    # obstacle, the body or bad food if there is any other option
+    head = sim.snake.head
+    hx, hy = head % GRID_WIDTH, head // GRID_WIDTH
+    targets = [OccupancyGrid.index(*food["pos"]) for food in sim.food.food_items if food["value"] > 0]
+    bad = {OccupancyGrid.index(*food["pos"]) for food in sim.food.food_items if food["value"] <= 0}
+
+    best, best_key = None, None
+    for direction in Direction:
+        if Direction.opposite(sim.snake.direction, direction):
+            continue
+        x, y = hx + direction.value[0], hy + direction.value[1]
+        if not (0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT):
+            continue
+        cell = y * GRID_WIDTH + x
+        blocked = sim.grid.snake[cell] or (sim.grid.cells[cell] & OccupancyGrid.OBSTACLE
+                                           and not sim.snake.invincible)
+        if blocked:
+            continue
+        distance = min((abs(x - t % GRID_WIDTH) + abs(y - t // GRID_WIDTH) for t in targets), default=0)
+        key = (cell in bad, distance, rng.random())
+        if best_key is None or key < best_key:
+            best, best_key = direction, key
+    return best
+
+POLICIES: Dict[str, Callable] = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+}
+
+def build_simulation(config: Dict[str, Any], seed: int) -> Simulation:
+    food_types = []
+    for food_type in FOOD_TYPES:
+        food_types.append(replace(
+            food_type,
+            rarity=config["rarity"].get(food_type.name, food_type.rarity),
+            value=config["value"].get(food_type.name, food_type.value),
+        ))
+    sim = Simulation(GameMode[config["mode"]], config["difficulty"], seed=seed, food_types=food_types)
+    if config["speed"] is not None:
+        sim.difficulties = {name: dict(settings) for name, settings in DIFFICULTIES.items()}
+        sim.difficulties[config["difficulty"]]["speed"] = config["speed"]
+    if config["targets"]:
+        # Targets override the first levels in order; the rest keep theirs
+        targets = config["targets"]
+        sim.campaign_levels = [dict(level, target=targets[i]) if i < len(targets) else dict(level)
+                               for i, level in enumerate(CAMPAIGN_LEVELS)]
+    sim.reset()
+    return sim
+
+def play_game(config: Dict[str, Any], seed: int) -> Dict[str, Any]:
+    sim = build_simulation(config, seed)
+    policy = POLICIES[config["policy"]]
+    rng = random.Random(seed)
+    max_ticks = int(config["max_seconds"] * TICK_RATE)
+    pickups = Counter()
+    ended = "timeout"
+    levels_cleared = 0
+    start_tick = sim.tick_count
+    decided_at = None
+
+    while sim.tick_count - start_tick < max_ticks:
+        # The snake only turns when it moves, so only ask the policy then
+        if sim.snake.last_move_time != decided_at:
+            direction = policy(sim, rng)
+            if direction is not None:
+                sim.change_direction(direction)
+            decided_at = sim.snake.last_move_time
+        for event in sim.step():
+            if event[0] == "eat":
+                pickups[event[1]["type"]] += 1
+            elif event[0] == "level_up":
+                levels_cleared += 1
+            elif event[0] == "level_complete":
+                levels_cleared += 1
+                ended = "level_complete"
+            elif event[0] == "game_over":
+                ended = "game_over"
+        if sim.over:
+            break
+
+    return {
+        "config": config["key"],
+        "fingerprint": config["fingerprint"],
+        "seed": seed,
+        "score": sim.score,
+        "seconds": (sim.tick_count - start_tick) / TICK_RATE,
+        "ended": ended,
+        "levels_cleared": levels_cleared,
+        "pickups": dict(pickups),
+    }
+
+def run_chunk(config: Dict[str, Any], seeds: List[int]) -> List[Dict[str, Any]]:
+    return [play_game(config, seed) for seed in seeds]
+
+def parse_overrides(pairs: List[str], cast=int) -> Dict[str, Any]:
+    overrides = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        if not value:
+            raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {pair!r}")
+        overrides[name] = cast(value)
+    return overrides
+
+def build_configs(args) -> List[Dict[str, Any]]:
+    known = {food_type.name for food_type in FOOD_TYPES}
+    rarity = parse_overrides(args.rarity)
+    value = parse_overrides(args.value)
+    for name in list(rarity) + list(value):
+        if name not in known:
+            raise SystemExit(f"Unknown food type {name!r}, expected one of: {', '.join(sorted(known))}")
+    if args.targets and len(args.targets) > len(CAMPAIGN_LEVELS):
+        raise SystemExit(f"Got {len(args.targets)} campaign targets, but there are only {len(CAMPAIGN_LEVELS)} levels")
+
+    # Results are only reused for the exact same overrides, whatever the tag
+    fingerprint = json.dumps([rarity, value, args.speed, args.targets, args.max_seconds], sort_keys=True)
+    configs = []
+    for mode in args.mode:
+        for difficulty in args.difficulty:
+            key = f"{args.tag}/{mode}/{difficulty}/{args.policy}"
+            configs.append({
+                "key": key,
+                "fingerprint": fingerprint,
+                "mode": mode,
+                "difficulty": difficulty,
+                "policy": args.policy,
+                "max_seconds": args.max_seconds,
+                "rarity": rarity,
+                "value": value,
+                "speed": args.speed,
+                "targets": args.targets,
+            })
+    return configs
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    results = []
+    if not os.path.exists(path):
+        return results
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves at most one torn line
+                continue
+    return results
+
+def terminate_torn_line(path: str) -> None:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def report(results: List[Dict[str, Any]], out=sys.stdout) -> None:
+    by_config = defaultdict(list)
+    for result in results:
+        by_config[result["config"]].append(result)
+
+    for key in sorted(by_config):
+        games = by_config[key]
+        scores = [g["score"] for g in games]
+        seconds = [g["seconds"] for g in games]
+        minutes = sum(seconds) / 60 or 1
+        print(f"\n== {key}: {len(games)} games", file=out)
+        for label, values in (("score", scores), ("survival s", seconds)):
+            print(f"  {label:<11} mean {statistics.fmean(values):8.1f}  p10 {percentile(values, 10):8.1f}  "
+                  f"p50 {percentile(values, 50):8.1f}  p90 {percentile(values, 90):8.1f}  "
+                  f"p99 {percentile(values, 99):8.1f}", file=out)
+
+        endings = Counter(g["ended"] for g in games)
+        print("  endings     " + "  ".join(f"{name} {count / len(games):.1%}"
+                                           for name, count in sorted(endings.items())), file=out)
+
+        pickups = Counter()
+        for g in games:
+            pickups.update(g["pickups"])
+        total = sum(pickups.values()) or 1
+        print("  pickups     per game  per min  share", file=out)
+        for name, count in pickups.most_common():
+            print(f"    {name:<10} {count / len(games):8.2f} {count / minutes:8.2f}  {count / total:6.1%}", file=out)
+
+        if any(g["levels_cleared"] for g in games) or "/CAMPAIGN/" in key:
+            deepest = max(g["levels_cleared"] for g in games)
+            for level in range(1, max(deepest, 1) + 1):
+                cleared = sum(1 for g in games if g["levels_cleared"] >= level)
+                print(f"  level {level} cleared {cleared / len(games):.1%}", file=out)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Monte Carlo balance runner for Snake")
+    parser.add_argument("--games", type=int, default=1000, help="games per configuration")
+    parser.add_argument("--mode", nargs="+", default=["CLASSIC"],
+                        choices=[mode.name for mode in GameMode if mode != GameMode.MULTIPLAYER])
+    parser.add_argument("--difficulty", nargs="+", default=["NORMAL"], choices=list(DIFFICULTIES))
+    parser.add_argument("--policy", default="greedy", choices=list(POLICIES))
+    parser.add_argument("--rarity", nargs="*", default=[], metavar="FOOD=N", help="override food rarity")
+    parser.add_argument("--value", nargs="*", default=[], metavar="FOOD=N", help="override food value")
+    parser.add_argument("--speed", type=float, default=None, help="override starting speed")
+    parser.add_argument("--targets", type=int, nargs="*", default=None, help="campaign score targets")
+    parser.add_argument("--max-seconds", type=float, default=300, help="simulated time cap per game")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--tag", default="default", help="label for this set of overrides")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=25)
+    parser.add_argument("--out", default="balance_results.jsonl")
+    parser.add_argument("--report-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    configs = build_configs(args)
+    fingerprints = {config["key"]: config["fingerprint"] for config in configs}
+    results = [r for r in load_results(args.out) if fingerprints.get(r["config"]) == r.get("fingerprint")]
+
+    if not args.report_only:
+        done = {(r["config"], r["seed"]) for r in results}
+        jobs = []
+        for config in configs:
+            seeds = [s for s in range(args.seed, args.seed + args.games) if (config["key"], s) not in done]
+            for i in range(0, len(seeds), args.chunk_size):
+                jobs.append((config, seeds[i:i + args.chunk_size]))
+
+        total = sum(len(seeds) for _, seeds in jobs)
+        if total:
+            print(f"Running {total} games ({len(results)} already done) on {args.workers} workers")
+        finished = 0
+        terminate_torn_line(args.out)
+        with open(args.out, "a") as out, ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(run_chunk, config, seeds) for config, seeds in jobs]
+            for future in as_completed(futures):
+                chunk = future.result()
+                for result in chunk:
+                    out.write(json.dumps(result) + "\n")
+                out.flush()
+                results.extend(chunk)
+                finished += len(chunk)
+                print(f"\r  {finished}/{total} games", end="", file=sys.stderr, flush=True)
+        if total:
+            print(file=sys.stderr)
+
+    report(results)
+
+if __name__ == "__main__":
+    main()
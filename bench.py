@@ -0,0 +1,384 @@
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from constants import *
+from engine import Direction, OccupancyGrid, FOOD_TYPES
+
+# Headless benchmarks for the update and draw hot paths. Every run appends
+# one record to a JSONL history file, and --compare diffs two records and
+# flags anything that got slower than the threshold:
+#
+#   python bench.py                      # run everything, append to history
+#   python bench.py --filter 'snake.*' 'particles.*'
+#   python bench.py --compare            # last run against the one before
+#   python bench.py --compare before-atlas -1 --threshold 5
+#
+# pygame and the game module are only imported when benchmarks are
+# registered, so the history and comparison code works without them.
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+def benchmark(name: str, setup: Callable[[], Callable[[], Any]]) -> None:
+    # setup() builds whatever the benchmark needs and returns the callable
+    # that gets timed
+    BENCHMARKS[name] = setup
+
+_game = None
+
+@contextmanager
+def scratch_directory():
+    # Runs the block in a throwaway working directory, so save files and
+    # replays the game writes don't land in the checkout; assets are linked
+    # in if present. The old directory is restored and the scratch one
+    # removed on the way out.
+    assets = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="snake-bench-") as scratch:
+        if os.path.isdir(assets):
+            os.symlink(assets, os.path.join(scratch, "assets"))
+        os.chdir(scratch)
+        try:
+            yield scratch
+        finally:
+            os.chdir(cwd)
+
+def game():
+    # One Game shared by every benchmark that needs a display or the real
+    # object graph. main() runs the benchmarks inside scratch_directory(),
+    # which is where its relative save and asset paths point.
+    global _game
+    if _game is None:
+        import main
+        _game = main.Game()
+        # Measure with the real fonts and sounds, not the loading fallbacks
+        _game.assets.thread.join()
+        _game._poll_assets()
+    return _game
+
+def board_cycle() -> List[int]:
+    # A closed path through every cell: right along the top row, back and
+    # forth along the rows below it without touching column 0, then up
+    # column 0 to the start. Snakes that follow it can be as long as the
+    # board and never hit anything. Needs an even GRID_HEIGHT.
+    cycle = list(range(GRID_WIDTH))
+    for y in range(1, GRID_HEIGHT):
+        columns = range(GRID_WIDTH - 1, 0, -1) if y % 2 else range(1, GRID_WIDTH)
+        cycle.extend(y * GRID_WIDTH + x for x in columns)
+    cycle.extend(y * GRID_WIDTH for y in range(GRID_HEIGHT - 1, 0, -1))
+    return cycle
+
+def cycle_snake(length: int, grid: Optional[OccupancyGrid] = None):
+    # A game Snake of `length` laid along board_cycle() and a step function
+    # that steers it one cell further round
+    import main
+    cycle = board_cycle()
+    snake = main.Snake(grid=grid)
+    snake.body = [OccupancyGrid.pixel(cycle[length - 1 - i]) for i in range(length)]
+    head = [length - 1]
+
+    def steer():
+        cell = cycle[head[0] % len(cycle)]
+        target = cycle[(head[0] + 1) % len(cycle)]
+        if target - cell == 1:
+            snake.next_direction = Direction.RIGHT
+        elif target - cell == -1:
+            snake.next_direction = Direction.LEFT
+        elif target > cell:
+            snake.next_direction = Direction.DOWN
+        else:
+            snake.next_direction = Direction.UP
+        head[0] += 1
+    return snake, steer
+
+def setup_snake_move(length: int):
+    snake, steer = cycle_snake(length)
+    clock = [0]
+
+    def run():
+        steer()
+        clock[0] += 1000
+        snake.move(clock[0])
+    return run
+
+def setup_snake_draw(length: int):
+    screen = game().screen
+    snake, steer = cycle_snake(length)
+    for _ in range(2):
+        steer()
+        snake.step()
+    # Halfway between cells, so the slide interpolation runs too
+    now = snake.last_move_time + snake.ticks_per_move() * 500 / TICK_RATE
+    return lambda: snake.draw(screen, now)
+
+def food_system(food_type, count: int = 20):
+    import main
+    return main.FoodSystem(count, rng=random.Random(1), types=[food_type])
+
+def setup_food_update():
+    # Five of every type, so the expiring ones keep respawning
+    food = food_system(FOOD_TYPES[0], 0)
+    for food_type in FOOD_TYPES:
+        food.types = [food_type]
+        food.food_items.extend(food._create_food() for _ in range(5))
+    food.types = FOOD_TYPES
+    clock = [0]
+
+    def run():
+        clock[0] += 1000 // TICK_RATE
+        food.update(clock[0])
+    return run
+
+def setup_food_draw(food_type):
+    screen = game().screen
+    food = food_system(food_type)
+    return lambda: food.draw(screen, 5000)
+
+def particle_system(count: int):
+    import main
+    particles = main.ParticleSystem(random.Random(1), capacity=max(PARTICLE_CAPACITY, count))
+    rng = random.Random(2)
+    for _ in range(count // 100):
+        # Long lived so the pool stays full however often it's updated
+        particles.emit([rng.uniform(0, SCREEN_WIDTH) for _ in range(100)],
+                       [rng.uniform(0, SCREEN_HEIGHT) for _ in range(100)],
+                       [rng.uniform(-0.5, 0.5) for _ in range(100)],
+                       [rng.uniform(-0.5, 0.5) for _ in range(100)],
+                       10 ** 6, [rng.uniform(2, 6) for _ in range(100)],
+                       COLORS[rng.choice(("RED", "GOLD", "CYAN", "WHITE"))])
+    return particles
+
+def setup_particles_update(count: int):
+    return particle_system(count).update
+
+def setup_particles_draw(count: int):
+    screen = game().screen
+    particles = particle_system(count)
+    return lambda: particles.draw(screen)
+
+def setup_full_board_collision():
+    import engine
+    sim = engine.Simulation(seed=1)
+    sim.obstacle.blocks = []
+    sim.grid.clear(OccupancyGrid.OBSTACLE)
+    # One cell short of full, so the head always has somewhere to go
+    snake, steer = cycle_snake(GRID_WIDTH * GRID_HEIGHT - 1, sim.grid)
+    sim.snake = snake
+
+    def run():
+        steer()
+        snake.step()
+        return sim._check_collision()
+    return run
+
+def setup_skin(index: int):
+    import main
+    screen = game().screen
+    snake, steer = cycle_snake(50)
+    snake.skin_index = index
+    snake.rng = random.Random(1)
+    snake.particles = main.ParticleSystem(random.Random(1))
+    clock = [0]
+
+    def run():
+        steer()
+        clock[0] += 1000
+        snake.move(clock[0])
+        snake.particles.update()
+        snake.draw(screen, clock[0])
+        snake.particles.draw(screen)
+    return run
+
+def setup_game_draw(state_name: str, dirty: bool = False):
+    import main
+    g = game()
+    g.settings["dirty_rects"] = dirty
+    g.state = main.GameState.PLAYING
+    g.reset()
+    for _ in range(5 * TICK_RATE):
+        g._update()
+    if state_name == "REPLAY":
+        g._open_replay()
+        for _ in range(TICK_RATE):
+            g._update()
+    g.state = main.GameState[state_name]
+    g.dirty_rects = None
+    return g._draw
+
+def register() -> None:
+    import main
+    for length in (10, 500, 1500):
+        benchmark(f"snake.move[{length}]", partial(setup_snake_move, length))
+        benchmark(f"snake.draw[{length}]", partial(setup_snake_draw, length))
+    benchmark("food.update[all]", setup_food_update)
+    for food_type in FOOD_TYPES:
+        benchmark(f"food.draw[{food_type.name}]", partial(setup_food_draw, food_type))
+    for count in (1000, 10000):
+        benchmark(f"particles.update[{count // 1000}k]", partial(setup_particles_update, count))
+        benchmark(f"particles.draw[{count // 1000}k]", partial(setup_particles_draw, count))
+    benchmark("collision[full board]", setup_full_board_collision)
+    for index, skin in enumerate(main.Snake().skins):
+        benchmark(f"skin[{skin.name}]", partial(setup_skin, index))
+    benchmark("game.draw[PLAYING, dirty]", partial(setup_game_draw, "PLAYING", True))
+    # The replay viewer swaps the game's simulation out, so it goes last
+    for state in sorted(main.GameState, key=lambda state: state == main.GameState.REPLAY):
+        benchmark(f"game.draw[{state.name}]", partial(setup_game_draw, state.name))
+
+def measure(run: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, Any]:
+    # Calibrate a loop count that takes at least min_time seconds, then
+    # time `repeat` loops of it. Per-call times are in microseconds.
+    run()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {"median_us": statistics.median(samples), "min_us": min(samples), "calls": number * repeat}
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+def run_benchmarks(names: List[str], repeat: int, min_time: float, out=sys.stdout) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name in names:
+        stats = measure(BENCHMARKS[name](), repeat, min_time)
+        results[name] = stats
+        print(f"  {name:<32} {stats['median_us']:10.1f} us  (min {stats['min_us']:.1f})", file=out, flush=True)
+    return results
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    history = []
+    if not os.path.exists(path):
+        return history
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                history.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return history
+
+def append_history(path: str, record: Dict[str, Any]) -> None:
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+def find_run(history: List[Dict[str, Any]], ref: str) -> Dict[str, Any]:
+    # A run is picked by label or commit, newest first, or by index (-1 is
+    # the latest)
+    for record in reversed(history):
+        if ref in (record.get("label"), record.get("commit")):
+            return record
+    try:
+        return history[int(ref)]
+    except (ValueError, IndexError):
+        raise SystemExit(f"No benchmark run {ref!r} in the history")
+
+def compare(old: Dict[str, Any], new: Dict[str, Any],
+            threshold: float) -> List[Tuple[str, float, float, float, bool]]:
+    # (name, old us, new us, change %, regressed) for benchmarks in both runs
+    rows = []
+    for name, stats in new["results"].items():
+        if name not in old["results"]:
+            continue
+        before, after = old["results"][name]["median_us"], stats["median_us"]
+        change = (after - before) / before * 100 if before else 0.0
+        rows.append((name, before, after, change, change > threshold))
+    return rows
+
+def print_comparison(old: Dict[str, Any], new: Dict[str, Any], threshold: float, out=sys.stdout) -> int:
+    rows = compare(old, new, threshold)
+    describe = lambda run: run.get("label") or run.get("commit") or run["timestamp"]
+    print(f"{describe(old)} -> {describe(new)}, regression threshold {threshold:g}%", file=out)
+    for name, before, after, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"  {name:<32} {before:10.1f} -> {after:10.1f} us  {change:+6.1f}%{flag}", file=out)
+    regressions = sum(1 for row in rows if row[4])
+    print(f"{regressions} regression(s) in {len(rows)} benchmarks", file=out)
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Headless benchmarks for Snake's update and draw paths")
+    parser.add_argument("--filter", nargs="*", default=[], metavar="PATTERN",
+                        help="only run benchmarks containing or matching these glob patterns")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    parser.add_argument("--repeat", type=int, default=5, help="timed samples per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds each sample runs for at least")
+    parser.add_argument("--label", default=None, help="name for this run in the history")
+    parser.add_argument("--history", default="bench_history.jsonl")
+    parser.add_argument("--no-save", action="store_true", help="don't append this run to the history")
+    parser.add_argument("--compare", nargs="*", metavar="RUN",
+                        help="compare two runs (label, commit or index, default -2 -1) instead of running")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+    history_path = os.path.abspath(args.history)
+
+    if args.compare is not None:
+        refs = args.compare or ["-2", "-1"]
+        if len(refs) == 1:
+            refs.append("-1")
+        history = load_history(history_path)
+        old, new = find_run(history, refs[0]), find_run(history, refs[1])
+        return 1 if print_comparison(old, new, args.threshold) else 0
+
+    register()
+    names = [name for name in BENCHMARKS
+             if not args.filter or any(pattern in name or fnmatch.fnmatchcase(name, pattern) for pattern in args.filter)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    if not names:
+        raise SystemExit("No benchmarks match the filter")
+
+    import numpy
+    import pygame
+    record = {
+        "label": args.label,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": numpy.__version__,
+        "machine": platform.machine(),
+    }
+    print(f"Running {len(names)} benchmarks")
+    with scratch_directory():
+        record["results"] = run_benchmarks(names, args.repeat, args.min_time)
+    if not args.no_save:
+        history = load_history(history_path)
+        append_history(history_path, record)
+        if history:
+            print()
+            print_comparison(history[-1], record, args.threshold)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# Constants
+SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
+BLOCK_SIZE = 24
+FPS = 60  # Default display frame rate
+FRAME_RATES = [30, 60, 144]  # Display rates the settings menu cycles through
+BASE_SPEED = 15
+MAX_SPEED = 60
+MIN_SPEED = 5
+GRID_WIDTH = SCREEN_WIDTH // BLOCK_SIZE
+GRID_HEIGHT = SCREEN_HEIGHT // BLOCK_SIZE
+TICK_RATE = 60  # Simulation ticks per second
+MAX_FRAME_TIME = 250  # ms of simulation a single slow frame may catch up on
+COMBO_WINDOW = 3000  # ms a combo stays alive without another combo pickup
+REPLAY_DIR = "replays"
+PROFILE_DIR = "profiles"
+FONT_PATH = "assets/fonts/RetroGaming.ttf"
+REPLAY_FAST_FORWARD = 8  # Ticks simulated per frame when fast-forwarding a replay
+SURFACE_CACHE_BYTES = 16 * 1024 * 1024  # Pixel memory the overlay cache may hold
+PARTICLE_CAPACITY = 8192  # Live particles the pool can hold
+PARTICLE_BUDGETS = {"trail": 32, "fire": 64, "ice": 64}  # Live particles per snake emitter
+PARTICLE_SPRITE_LIMIT = 4096  # Pre-rendered particle circles kept at once
+PARTICLE_FRAME_BUDGET = 3.0  # Milliseconds a frame may spend on particles before their detail drops
+DIRTY_RECT_LIMIT = 600  # More changed rects than this in a frame and a full flip is cheaper
+TEXT_CACHE_SIZE = 256  # Rendered strings kept by the text cache
+PROFILER_WINDOW = 300  # Frames the profiler's percentiles are taken over
+PROFILER_TRACE_EVENTS = 200000  # Trace events kept for export, oldest dropped first
+ALPHA_STEP = 5  # Overlay alphas are rounded to multiples of this before caching
+
+# Enhanced color system with 150+ colors
+COLORS = {
+    "BLACK": (0, 0, 0),
+    "WHITE": (255, 255, 255),
+    "RED": (255, 0, 0),
+    "GREEN": (0, 255, 0),
+    "BLUE": (0, 0, 255),
+    "YELLOW": (255, 255, 0),
+    "PURPLE": (128, 0, 128),
+    "CYAN": (0, 255, 255),
+    "ORANGE": (255, 165, 0),
+    "PINK": (255, 192, 203),
+    "GRAY": (128, 128, 128),
+    "DARK_GREEN": (0, 100, 0),
+    "DARK_RED": (139, 0, 0),
+    "DARK_BLUE": (0, 0, 139),
+    "LIGHT_BLUE": (173, 216, 230),
+    "LIGHT_GREEN": (144, 238, 144),
+    "LIGHT_RED": (255, 182, 193),
+    "GOLD": (255, 215, 0),
+    "SILVER": (192, 192, 192),
+    "BRONZE": (205, 127, 50),
+    "HOT_PINK": (255, 105, 180),
+    "DEEP_PURPLE": (102, 51, 153),
+    "DARK_CYAN": (0, 139, 139),
+    "INDIGO": (75, 0, 130),
+    "VIOLET": (238, 130, 238),
+    "TEAL": (0, 128, 128),
+    "OLIVE": (128, 128, 0),
+    "MAROON": (128, 0, 0),
+    "NAVY": (0, 0, 128),
+    "AQUA": (0, 255, 255),
+    "LIME": (0, 255, 0),
+    "FUCHSIA": (255, 0, 255),
+    "DARK_ORANGE": (255, 140, 0),
+    "SPRING_GREEN": (0, 255, 127),
+    "TURQUOISE": (64, 224, 208),
+    "CRIMSON": (220, 20, 60),
+    "CORAL": (255, 127, 80),
+    "SALMON": (250, 128, 114),
+    "KHAKI": (240, 230, 140),
+    "LAVENDER": (230, 230, 250),
+    "THISTLE": (216, 191, 216),
+    "PLUM": (221, 160, 221),
+    "ORCHID": (218, 112, 214),
+    "TOMATO": (255, 99, 71),
+    "PEACH_PUFF": (255, 218, 185),
+    "SANDY_BROWN": (244, 164, 96),
+    "CHOCOLATE": (210, 105, 30),
+    "FIREBRICK": (178, 34, 34),
+    "DARK_SLATE_GRAY": (47, 79, 79),
+    "SEA_GREEN": (46, 139, 87),
+    "MEDIUM_AQUAMARINE": (102, 205, 170),
+    "CADET_BLUE": (95, 158, 160),
+    "STEEL_BLUE": (70, 130, 180),
+    "POWDER_BLUE": (176, 224, 230),
+    "CORNFLOWER_BLUE": (100, 149, 237),
+    "ROYAL_BLUE": (65, 105, 225),
+    "MEDIUM_SLATE_BLUE": (123, 104, 238),
+    "DARK_VIOLET": (148, 0, 211),
+    "DARK_MAGENTA": (139, 0, 139),
+    "DEEP_PINK": (255, 20, 147),
+    "PALE_VIOLET_RED": (219, 112, 147),
+    "MEDIUM_VIOLET_RED": (199, 21, 133),
+    "DARK_SALMON": (233, 150, 122),
+    "PERU": (205, 133, 63),
+    "DARK_GOLDENROD": (184, 134, 11),
+    "GOLDENROD": (218, 165, 32),
+    "PALE_GOLDENROD": (238, 232, 170),
+    "DARK_KHAKI": (189, 183, 107),
+    "DARK_OLIVE_GREEN": (85, 107, 47),
+    "FOREST_GREEN": (34, 139, 34),
+    "LIME_GREEN": (50, 205, 50),
+    "PALE_GREEN": (152, 251, 152),
+    "MEDIUM_SPRING_GREEN": (0, 250, 154),
+    "MEDIUM_SEA_GREEN": (60, 179, 113),
+    "LIGHT_SEA_GREEN": (32, 178, 170),
+    "DARK_TURQUOISE": (0, 206, 209),
+    "MEDIUM_TURQUOISE": (72, 209, 204),
+    "PALE_TURQUOISE": (175, 238, 238),
+    "LIGHT_CYAN": (224, 255, 255),
+    "AZURE": (240, 255, 255),
+    "ALICE_BLUE": (240, 248, 255),
+    "GHOST_WHITE": (248, 248, 255),
+    "WHITE_SMOKE": (245, 245, 245),
+    "SEASHELL": (255, 245, 238),
+    "BEIGE": (245, 245, 220),
+    "OLD_LACE": (253, 245, 230),
+    "FLORAL_WHITE": (255, 250, 240),
+    "IVORY": (255, 255, 240),
+    "ANTIQUE_WHITE": (250, 235, 215),
+    "LINEN": (250, 240, 230),
+    "LAVENDER_BLUSH": (255, 240, 245),
+    "MISTY_ROSE": (255, 228, 225),
+    "GAINSBORO": (220, 220, 220),
+    "LIGHT_GRAY": (211, 211, 211),
+    "DARK_GRAY": (169, 169, 169),
+    "DIM_GRAY": (105, 105, 105),
+    "SLATE_GRAY": (112, 128, 144),
+    "LIGHT_SLATE_GRAY": (119, 136, 153),
+    "DARK_SLATE_GRAY": (47, 79, 79),
+    "BLACK_OLIVE": (59, 60, 54),
+    "JET": (52, 52, 52),
+    "ONYX": (53, 56, 57),
+    "CHARCOAL": (54, 69, 79),
+    "DARK_JUNGLE_GREEN": (26, 36, 33),
+    "EERIE_BLACK": (27, 27, 27),
+    "RAISIN_BLACK": (36, 33, 36),
+    "SMOKY_BLACK": (16, 12, 8),
+    "BLACK_BEAN": (61, 12, 2),
+    "BLACK_LEATHER_JACKET": (37, 53, 41),
+    "BLACK_OLIVE": (59, 60, 54),
+    "PHTHALO_GREEN": (18, 53, 36),
+    "RICH_BLACK": (0, 17, 26),
+    "BLUEBERRY": (79, 134, 247),
+    "BUBBLEGUM": (255, 193, 204),
+    "CANDY_APPLE_RED": (255, 8, 0),
+    "COTTON_CANDY": (255, 188, 217),
+    "ELECTRIC_LIME": (204, 255, 0),
+    "FRENCH_VIOLET": (136, 6, 206),
+    "GRAPE": (111, 45, 168),
+    "JAZZBERRY_JAM": (165, 11, 94),
+    "LEMON": (255, 247, 0),
+    "MACARONI_AND_CHEESE": (255, 189, 136),
+    "MANGO": (255, 195, 11),
+    "NEON_CARROT": (255, 163, 67),
+    "PINK_SHERBET": (247, 143, 167),
+    "PUMPKIN": (255, 117, 24),
+    "RADICAL_RED": (255, 53, 94),
+    "RAZZMATAZZ": (227, 11, 92),
+    "ROBIN_EGG_BLUE": (0, 204, 204),
+    "SHOCKING_PINK": (252, 15, 192),
+    "SUNGLOW": (255, 204, 51),
+    "UNMELLOW_YELLOW": (255, 255, 102),
+    "WILD_BLUE_YONDER": (162, 173, 208),
+    "WILD_STRAWBERRY": (255, 67, 164),
+    "WISTERIA": (201, 160, 220),
+    "YELLOW_ORANGE": (255, 174, 66),
+    "YELLOW_GREEN": (154, 205, 50),
+    "ZAFFRE": (0, 20, 168),
+    "ZINNWALDITE_BROWN": (44, 22, 8),
+    "ZYTHUM": (237, 224, 177),
+}
@@ -0,0 +1,947 @@
+import heapq
+import math
+import random
+from array import array
+from enum import Enum, auto
+from typing import List, Tuple, Dict, Optional, Any
+from dataclasses import dataclass
+
+from constants import *
+from profiler import profiler
+
+# Headless game simulation. Nothing in here touches pygame: time advances in
+# fixed ticks of 1000 / TICK_RATE ms, and everything the renderer cares about
+# (sounds, particles, state changes) is reported back as events from step().
+
+class GameMode(Enum):
+    CLASSIC = auto()
+    TIME_ATTACK = auto()
+    SURVIVAL = auto()
+    MULTIPLAYER = auto()
+    CAMPAIGN = auto()
+
+class Direction(Enum):
+    UP = (0, -1)
+    DOWN = (0, 1)
+    LEFT = (-1, 0)
+    RIGHT = (1, 0)
+
+    @staticmethod
+    def opposite(dir1, dir2) -> bool:
+        return (dir1.value[0] + dir2.value[0] == 0) and (dir1.value[1] + dir2.value[1] == 0)
+
+_mask_tables: Dict[int, bytes] = {}
+
+class OccupancyGrid:
+    # One byte per GRID_WIDTH x GRID_HEIGHT cell, indexed by the packed cell
+    # y * GRID_WIDTH + x. Obstacles and food are bit flags; the snake layer
+    # counts segments so overlaps after a shield save don't get cleared early
+    # when the tail moves off.
+    #
+    # Empty interior cells (the ones food may spawn on) are also kept in a
+    # swap-remove array with a cell -> slot map, so picking a uniformly
+    # random empty cell is O(1) however crowded the board is.
+    OBSTACLE = 1
+    FOOD = 2
+
+    def __init__(self):
+        self.cells = bytearray(GRID_WIDTH * GRID_HEIGHT)
+        self.snake = bytearray(GRID_WIDTH * GRID_HEIGHT)
+        self.spawnable = [y * GRID_WIDTH + x for y in range(1, GRID_HEIGHT - 1) for x in range(1, GRID_WIDTH - 1)]
+        self.free = array("i")
+        self.free_slot = array("i", [-1]) * (GRID_WIDTH * GRID_HEIGHT)
+        self._rebuild_free()
+
+    def reset(self) -> None:
+        # Back to an empty board with the free-cell index in its initial
+        # order, so spawns drawn from it match a freshly built grid
+        self.cells[:] = bytes(len(self.cells))
+        self.snake[:] = bytes(len(self.snake))
+        self._rebuild_free()
+
+    @staticmethod
+    def in_bounds(x: int, y: int) -> bool:
+        return 0 <= x < GRID_WIDTH * BLOCK_SIZE and 0 <= y < GRID_HEIGHT * BLOCK_SIZE
+
+    @staticmethod
+    def index(x: int, y: int) -> int:
+        return (y // BLOCK_SIZE) * GRID_WIDTH + x // BLOCK_SIZE
+
+    @staticmethod
+    def pixel(cell: int) -> List[int]:
+        return [(cell % GRID_WIDTH) * BLOCK_SIZE, (cell // GRID_WIDTH) * BLOCK_SIZE]
+
+    def _rebuild_free(self) -> None:
+        self.free = array("i")
+        for cell in self.spawnable:
+            if self.cells[cell] or self.snake[cell]:
+                self.free_slot[cell] = -1
+            else:
+                self.free_slot[cell] = len(self.free)
+                self.free.append(cell)
+
+    def _take(self, cell: int) -> None:
+        slot = self.free_slot[cell]
+        if slot < 0:
+            return
+        last = self.free.pop()
+        if last != cell:
+            self.free[slot] = last
+            self.free_slot[last] = slot
+        self.free_slot[cell] = -1
+
+    def _release(self, cell: int) -> None:
+        # Border cells never enter the index; their slot stays -1 and they
+        # are skipped by the interior check below
+        if self.free_slot[cell] >= 0 or self.cells[cell] or self.snake[cell]:
+            return
+        x, y = cell % GRID_WIDTH, cell // GRID_WIDTH
+        if 0 < x < GRID_WIDTH - 1 and 0 < y < GRID_HEIGHT - 1:
+            self.free_slot[cell] = len(self.free)
+            self.free.append(cell)
+
+    def random_free_cell(self, rng: random.Random) -> Optional[int]:
+        if not self.free:
+            return None
+        return self.free[rng.randrange(len(self.free))]
+
+    def add_snake(self, cell: int) -> None:
+        self.snake[cell] += 1
+        self._take(cell)
+
+    def remove_snake(self, cell: int) -> None:
+        if self.snake[cell]:
+            self.snake[cell] -= 1
+            self._release(cell)
+
+    def snake_count(self, cell: int) -> int:
+        return self.snake[cell]
+
+    def clear_snake(self) -> None:
+        for cell in self._occupied(self.snake, 0xFF):
+            self.snake[cell] = 0
+            self._release(cell)
+
+    def set_flag(self, x: int, y: int, flag: int) -> None:
+        i = self.index(x, y)
+        self.cells[i] |= flag
+        self._take(i)
+
+    def clear_flag(self, x: int, y: int, flag: int) -> None:
+        i = self.index(x, y)
+        self.cells[i] &= ~flag
+        self._release(i)
+
+    def has(self, x: int, y: int, flag: int) -> bool:
+        return self.in_bounds(x, y) and bool(self.cells[self.index(x, y)] & flag)
+
+    def clear(self, flag: int) -> None:
+        for cell in self._occupied(self.cells, flag):
+            self.cells[cell] &= ~flag
+            self._release(cell)
+
+    @staticmethod
+    def _occupied(layer: bytearray, mask: int) -> List[int]:
+        # translate and find both run in C, so only the hits cost Python steps
+        if mask not in _mask_tables:
+            _mask_tables[mask] = bytes(1 if v & mask else 0 for v in range(256))
+        hits = layer.translate(_mask_tables[mask])
+        cells = []
+        cell = hits.find(1)
+        while cell >= 0:
+            cells.append(cell)
+            cell = hits.find(1, cell + 1)
+        return cells
+
+    def is_free(self, x: int, y: int) -> bool:
+        i = self.index(x, y)
+        return not self.cells[i] and not self.snake[i]
+
+    def snapshot(self) -> Tuple[bytes, bytes, bytes]:
+        # The free array order matters: food spawns index into it
+        return bytes(self.cells), bytes(self.snake), self.free.tobytes()
+
+    def restore(self, state: Tuple[bytes, bytes, bytes]) -> None:
+        cells, snake, free = state
+        self.cells[:] = cells
+        self.snake[:] = snake
+        self.free = array("i")
+        self.free.frombytes(free)
+        self.free_slot = array("i", [-1]) * (GRID_WIDTH * GRID_HEIGHT)
+        for slot, cell in enumerate(self.free):
+            self.free_slot[cell] = slot
+
+class SnakeBody:
+    # Ring buffer of packed cells, head first. Pushing a head and popping the
+    # tail are O(1) no matter how long the snake gets.
+    def __init__(self, capacity: int = GRID_WIDTH * GRID_HEIGHT):
+        self.cells = array("i", [0]) * capacity
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self):
+        cells, capacity = self.cells, self.capacity
+        for i in range(self.start, self.start + self.size):
+            yield cells[i % capacity]
+
+    def cell(self, i: int) -> int:
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("snake body index out of range")
+        return self.cells[(self.start + i) % self.capacity]
+
+    def push_head(self, cell: int) -> None:
+        if self.size == self.capacity:
+            self._grow()
+        self.start = (self.start - 1) % self.capacity
+        self.cells[self.start] = cell
+        self.size += 1
+
+    def pop_tail(self) -> int:
+        self.size -= 1
+        return self.cells[(self.start + self.size) % self.capacity]
+
+    def clear(self) -> None:
+        self.start = 0
+        self.size = 0
+
+    def _grow(self) -> None:
+        # Only reachable when shield saves let the body overlap itself
+        cells = array("i", self)
+        cells.extend([0] * len(cells))
+        self.cells = cells
+        self.capacity = len(cells)
+        self.start = 0
+
+class BodyView:
+    # Read-only [x, y] pixel view of a SnakeBody for drawing code
+    def __init__(self, segments: SnakeBody):
+        self.segments = segments
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [OccupancyGrid.pixel(self.segments.cell(j)) for j in range(len(self.segments))[i]]
+        return OccupancyGrid.pixel(self.segments.cell(i))
+
+    def __iter__(self):
+        for cell in self.segments:
+            yield OccupancyGrid.pixel(cell)
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+class Snake:
+    def __init__(self, grid: Optional[OccupancyGrid] = None):
+        self.grid = grid or OccupancyGrid()
+        self.segments = SnakeBody()
+        self.reset()
+
+    @property
+    def body(self) -> BodyView:
+        return BodyView(self.segments)
+
+    @body.setter
+    def body(self, positions: List[List[int]]) -> None:
+        self.segments.clear()
+        self.grid.clear_snake()
+        for x, y in reversed(positions):
+            cell = self.grid.index(x, y)
+            self.segments.push_head(cell)
+            self.grid.add_snake(cell)
+        self.length = len(self.segments)
+
+    @property
+    def head(self) -> int:
+        return self.segments.cell(0)
+
+    def reset(self) -> None:
+        self.body = [[(GRID_WIDTH // 2) * BLOCK_SIZE, (GRID_HEIGHT // 2) * BLOCK_SIZE]]
+        self.direction = Direction.RIGHT
+        self.next_direction = Direction.RIGHT
+        self.length = 1
+        self.speed = BASE_SPEED
+        self.invincible = False
+        self.shield = False
+        self.glow_effect = False
+        self.powerups = {}
+        self.score_multiplier = 1.0
+        self.combo = 0
+        self.combo_timer = 0
+        self.last_move_time = 0
+        self.growth_pending = 0
+        self.hit_wall = False
+
+    def move(self, now: int) -> bool:
+        if now - self.last_move_time < 1000 // self.speed:
+            return False
+        self.last_move_time = now
+        self.step()
+        return True
+
+    def step(self) -> Optional[int]:
+        self.direction = self.next_direction
+
+        head = self.segments.cell(0)
+        dx, dy = self.direction.value
+        x, y = head % GRID_WIDTH + dx, head // GRID_WIDTH + dy
+        if not (0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT):
+            # The head never leaves the board; the simulation treats this as a crash
+            self.hit_wall = True
+            return None
+
+        head = y * GRID_WIDTH + x
+        self.segments.push_head(head)
+        self.grid.add_snake(head)
+
+        tail = None
+        if self.growth_pending > 0:
+            self.growth_pending -= 1
+        else:
+            while len(self.segments) > self.length:
+                tail = self.segments.pop_tail()
+                self.grid.remove_snake(tail)
+        return tail
+
+    def change_direction(self, new_direction: Direction) -> None:
+        if not Direction.opposite(self.direction, new_direction):
+            self.next_direction = new_direction
+
+    def grow(self, amount: int = 1) -> None:
+        self.growth_pending += amount
+        self.length += amount
+        self.speed = min(self.speed + 0.2, MAX_SPEED)
+
+    def shrink(self, amount: int = 1) -> None:
+        self.length = max(1, self.length - amount)
+        self.speed = max(self.speed - 1, MIN_SPEED)
+
+    # Everything reset() sets up, minus the body which is stored separately
+    _state = ("direction", "next_direction", "length", "speed", "invincible", "shield",
+              "glow_effect", "powerups", "score_multiplier", "combo", "combo_timer",
+              "last_move_time", "growth_pending", "hit_wall")
+
+    def snapshot(self) -> Tuple[bytes, Dict[str, Any]]:
+        # The grid's snake layer is captured with the grid
+        state = {name: getattr(self, name) for name in self._state}
+        state["powerups"] = dict(self.powerups)
+        return array("i", self.segments).tobytes(), state
+
+    def restore(self, state: Tuple[bytes, Dict[str, Any]]) -> None:
+        cells, fields = state
+        segments = array("i")
+        segments.frombytes(cells)
+        self.segments.clear()
+        for cell in reversed(segments):
+            self.segments.push_head(cell)
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.powerups = dict(fields["powerups"])
+
+@dataclass
+class FoodType:
+    name: str
+    color: Tuple[int, int, int]
+    value: int
+    rarity: int
+    effect: Optional[str] = None
+    expires: bool = False
+    duration: int = 0
+    special_visual: Optional[str] = None
+    sound: Optional[str] = None
+
+class AliasTable:
+    # Walker's alias method: O(1) weighted picks after an O(n) build
+    def __init__(self, weights: List[float]):
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("at least one weight must be positive")
+        n = len(weights)
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] += scaled[s] - 1
+            (small if scaled[l] < 1 else large).append(l)
+
+    def sample(self, rng: random.Random) -> int:
+        u = rng.random() * len(self.prob)
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+_alias_tables: Dict[Tuple[int, ...], AliasTable] = {}
+
+def alias_table(types: List["FoodType"]) -> AliasTable:
+    # Shared across FoodSystem instances; a new table is only built when a
+    # new set of rarities shows up
+    key = tuple(food_type.rarity for food_type in types)
+    if key not in _alias_tables:
+        _alias_tables[key] = AliasTable(list(key))
+    return _alias_tables[key]
+
+FOOD_TYPES = [
+    FoodType("normal", COLORS["GREEN"], 1, 60),
+    FoodType("speed", COLORS["CYAN"], 2, 15, "speed_boost", False, 0, "symbol", "powerup"),
+    FoodType("slow", COLORS["BLUE"], 2, 10, "slow_down", False, 0, "symbol", "powerup"),
+    FoodType("invincible", COLORS["GOLD"], 3, 8, "invincible", True, 15000, "glow", "powerup"),
+    FoodType("shield", COLORS["LIGHT_BLUE"], 3, 8, "shield", True, 10000, "ring", "powerup"),
+    FoodType("glow", COLORS["PURPLE"], 3, 5, "glow", True, 20000, "pulse", "powerup"),
+    FoodType("golden", COLORS["GOLD"], 5, 5, None, False, 0, "star", "coin"),
+    FoodType("rainbow", COLORS["RED"], 10, 2, "score_multiplier", True, 10000, "rainbow", "special"),
+    FoodType("poison", COLORS["DARK_GREEN"], -1, 12, "shrink", False, 0, "skull", "negative"),
+    FoodType("combo", COLORS["ORANGE"], 0, 8, "combo_boost", False, 0, "combo", "powerup"),
+    FoodType("bomb", COLORS["DARK_RED"], -2, 5, "bomb", False, 0, "bomb", "negative"),
+]
+
+class FoodSystem:
+    def __init__(self, count: int = 1, rng: Optional[random.Random] = None, now: int = 0,
+                 grid: Optional[OccupancyGrid] = None, types: Optional[List[FoodType]] = None):
+        self.rng = rng or random.Random()
+        self.grid = grid or OccupancyGrid()
+        self.grid.clear(OccupancyGrid.FOOD)
+        self.food_items: List[Dict[str, Any]] = []
+        self.types = types or FOOD_TYPES
+        for _ in range(count):
+            self.food_items.append(self._create_food(now))
+
+    @property
+    def types(self) -> List[FoodType]:
+        return self._types
+
+    @types.setter
+    def types(self, types: List[FoodType]) -> None:
+        self._types = list(types)
+        self.alias = alias_table(self._types)
+
+    def _pick_type(self) -> FoodType:
+        return self._types[self.alias.sample(self.rng)]
+
+    def _pick_position(self) -> List[int]:
+        cell = self.grid.random_free_cell(self.rng)
+        if cell is None:
+            # Board is full; let it land anywhere rather than not spawn
+            return [
+                self.rng.randrange(1, GRID_WIDTH - 1) * BLOCK_SIZE,
+                self.rng.randrange(1, GRID_HEIGHT - 1) * BLOCK_SIZE
+            ]
+        return OccupancyGrid.pixel(cell)
+
+    def _create_food(self, now: int = 0) -> Dict[str, Any]:
+        food_type = self._pick_type()
+        pos = self._pick_position()
+        self.grid.set_flag(*pos, OccupancyGrid.FOOD)
+        return {
+            "type": food_type.name,
+            "color": food_type.color,
+            "value": food_type.value,
+            "effect": food_type.effect,
+            "pos": pos,
+            "spawn_time": now,
+            "expires": food_type.expires,
+            "duration": food_type.duration,
+            "special_visual": food_type.special_visual,
+            "sound": food_type.sound,
+        }
+
+    def respawn(self, index: int = 0, now: int = 0) -> None:
+        if index < len(self.food_items):
+            old_pos = self.food_items[index]["pos"]
+            if not any(food["pos"] == old_pos for j, food in enumerate(self.food_items) if j != index):
+                self.grid.clear_flag(*old_pos, OccupancyGrid.FOOD)
+            self.food_items[index] = self._create_food(now)
+
+    def food_at(self, x: int, y: int) -> List[int]:
+        if not self.grid.has(x, y, OccupancyGrid.FOOD):
+            return []
+        return [i for i, food in enumerate(self.food_items) if food["pos"][0] == x and food["pos"][1] == y]
+
+    def update(self, now: int) -> None:
+        for i, food in enumerate(self.food_items):
+            # Expiration timer
+            if food.get("expires", False):
+                if now - food["spawn_time"] > food.get("duration", 10000):
+                    self.respawn(i, now)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [dict(food, pos=list(food["pos"])) for food in self.food_items]
+
+    def restore(self, state: List[Dict[str, Any]]) -> None:
+        self.food_items = [dict(food, pos=list(food["pos"])) for food in state]
+
+class Obstacle:
+    def __init__(self, rng: Optional[random.Random] = None, grid: Optional[OccupancyGrid] = None):
+        self.rng = rng or random.Random()
+        self.grid = grid or OccupancyGrid()
+        self.blocks = []
+        self.block_index: Dict[int, int] = {}
+        self.moving = False
+        self.direction = Direction.RIGHT
+        self.move_timer = 0
+        self.move_delay = 500  # ms
+        self.revision = 0  # bumped whenever a block appears, moves or goes
+        self.generate()
+
+    def generate(self, count=10):
+        self.blocks = []
+        self.block_index = {}
+        self.revision += 1
+        self.grid.clear(OccupancyGrid.OBSTACLE)
+        center_x, center_y = (GRID_WIDTH // 2) * BLOCK_SIZE, (GRID_HEIGHT // 2) * BLOCK_SIZE
+        for _ in range(count):
+            x = self.rng.randrange(GRID_WIDTH) * BLOCK_SIZE
+            y = self.rng.randrange(GRID_HEIGHT) * BLOCK_SIZE
+            # Make sure obstacle doesn't spawn on snake or food
+            if (x != center_x and y != center_y and
+                abs(x - center_x) > BLOCK_SIZE*3 and
+                abs(y - center_y) > BLOCK_SIZE*3 and
+                self.grid.is_free(x, y)):
+                self._add_block([x, y])
+
+    def _add_block(self, block: List[int]) -> None:
+        self.block_index[self.grid.index(*block)] = len(self.blocks)
+        self.blocks.append(block)
+        self.grid.set_flag(*block, OccupancyGrid.OBSTACLE)
+        self.revision += 1
+
+    def remove(self, x: int, y: int) -> Optional[List[int]]:
+        # Swap-remove so breaking a block doesn't shift the whole list
+        i = self.block_index.pop(self.grid.index(x, y), None)
+        if i is None:
+            return None
+        block = self.blocks[i]
+        last = self.blocks.pop()
+        if i < len(self.blocks):
+            self.blocks[i] = last
+            self.block_index[self.grid.index(*last)] = i
+        self.grid.clear_flag(x, y, OccupancyGrid.OBSTACLE)
+        self.revision += 1
+        return block
+
+    def move(self, now: int) -> bool:
+        if not self.moving:
+            return False
+
+        if now - self.move_timer < self.move_delay:
+            return False
+
+        self.move_timer = now
+
+        for block in self.blocks:
+            self.grid.clear_flag(*block, OccupancyGrid.OBSTACLE)
+
+        dx, dy = self.direction.value
+        for block in self.blocks:
+            block[0] += dx * BLOCK_SIZE
+            block[1] += dy * BLOCK_SIZE
+
+            # Wrap around screen edges
+            if block[0] >= GRID_WIDTH * BLOCK_SIZE:
+                block[0] = 0
+            elif block[0] < 0:
+                block[0] = (GRID_WIDTH - 1) * BLOCK_SIZE
+
+            if block[1] >= GRID_HEIGHT * BLOCK_SIZE:
+                block[1] = 0
+            elif block[1] < 0:
+                block[1] = (GRID_HEIGHT - 1) * BLOCK_SIZE
+
+        self.block_index = {}
+        for i, block in enumerate(self.blocks):
+            self.block_index[self.grid.index(*block)] = i
+            self.grid.set_flag(*block, OccupancyGrid.OBSTACLE)
+        self.revision += 1
+
+        # Randomly change direction occasionally
+        if self.rng.random() < 0.05:
+            self.direction = self.rng.choice(list(Direction))
+        return True
+
+    def snapshot(self) -> Tuple[List[List[int]], bool, Direction, int]:
+        return [list(block) for block in self.blocks], self.moving, self.direction, self.move_timer
+
+    def restore(self, state: Tuple[List[List[int]], bool, Direction, int]) -> None:
+        blocks, self.moving, self.direction, self.move_timer = state
+        self.blocks = [list(block) for block in blocks]
+        self.block_index = {self.grid.index(*block): i for i, block in enumerate(self.blocks)}
+        self.revision += 1
+
+CAMPAIGN_LEVELS = [
+    {"obstacles": 5, "food": 2, "time": 120, "target": 20},
+    {"obstacles": 10, "food": 3, "time": 150, "target": 30},
+    {"obstacles": 15, "food": 4, "time": 180, "target": 50},
+    # Add more levels as needed
+]
+
+DIFFICULTIES = {
+    "EASY": {"speed": BASE_SPEED - 5, "moving": False, "obstacles": None},
+    "NORMAL": {"speed": BASE_SPEED, "moving": True, "obstacles": None},
+    "HARD": {"speed": BASE_SPEED + 5, "moving": True, "obstacles": 15},  # More obstacles
+}
+
+class RandomStreams:
+    # One seeded random.Random per subsystem, all derived from a single game
+    # seed. Gameplay streams decide where food and obstacles go; cosmetic
+    # streams feed particles and menus, so drawing more or fewer effects never
+    # changes how a seeded game plays out. Subsystems keep a reference to
+    # their stream, so reseeding happens in place.
+    GAMEPLAY = ("food", "obstacles")
+    COSMETIC = ("particles", "skin", "menu")
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.streams: Dict[str, random.Random] = {}
+
+    def __getitem__(self, name: str) -> random.Random:
+        stream = self.streams.get(name)
+        if stream is None:
+            stream = self.streams[name] = random.Random(f"{self.seed}/{name}")
+        return stream
+
+    def reseed(self, seed: int) -> None:
+        self.seed = seed
+        for name, stream in self.streams.items():
+            stream.seed(f"{seed}/{name}")
+
+class TimerScheduler:
+    # Named one-shot timers on the simulation clock, kept in a binary heap.
+    # Deadlines are ticks, so timers freeze whenever the simulation isn't
+    # stepped (pause) and fire identically in headless and replayed runs;
+    # ties fire in the order they were armed. Re-arming or cancelling only
+    # updates `deadlines`; stale heap entries are skipped when they surface.
+    def __init__(self):
+        self.heap: List[Tuple[int, int, str]] = []
+        self.deadlines: Dict[str, Tuple[int, int]] = {}
+        self.seq = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.deadlines
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def arm(self, name: str, deadline: int) -> None:
+        # Replaces any pending timer with the same name
+        self.seq += 1
+        self.deadlines[name] = (deadline, self.seq)
+        heapq.heappush(self.heap, (deadline, self.seq, name))
+        if len(self.heap) > 2 * len(self.deadlines) + 16:
+            self._compact()
+
+    def cancel(self, name: str) -> bool:
+        return self.deadlines.pop(name, None) is not None
+
+    def extend(self, name: str, ticks: int) -> None:
+        if name in self.deadlines:
+            self.arm(name, self.deadlines[name][0] + ticks)
+
+    def deadline(self, name: str) -> Optional[int]:
+        entry = self.deadlines.get(name)
+        return entry[0] if entry else None
+
+    def pop_due(self, tick: int) -> List[str]:
+        due = []
+        heap = self.heap
+        while heap and heap[0][0] <= tick:
+            deadline, seq, name = heapq.heappop(heap)
+            if self.deadlines.get(name) == (deadline, seq):
+                del self.deadlines[name]
+                due.append(name)
+        return due
+
+    def clear(self) -> None:
+        self.heap = []
+        self.deadlines = {}
+
+    def _compact(self) -> None:
+        self.heap = [(deadline, seq, name) for name, (deadline, seq) in self.deadlines.items()]
+        heapq.heapify(self.heap)
+
+    def snapshot(self) -> Tuple[int, List[Tuple[int, int, str]]]:
+        return self.seq, sorted((deadline, seq, name) for name, (deadline, seq) in self.deadlines.items())
+
+    def restore(self, state: Tuple[int, List[Tuple[int, int, str]]]) -> None:
+        self.seq, entries = state
+        self.heap = list(entries)  # sorted, so already a valid heap
+        self.deadlines = {name: (deadline, seq) for deadline, seq, name in entries}
+
+class Simulation:
+    def __init__(self, mode: GameMode = GameMode.CLASSIC, difficulty: str = "NORMAL",
+                 seed: Optional[int] = None, snake_factory=Snake, food_factory=FoodSystem,
+                 obstacle_factory=Obstacle, food_types: Optional[List[FoodType]] = None):
+        self.mode = mode
+        self.difficulty = difficulty
+        self.food_types = food_types
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.rngs = RandomStreams(self.seed)
+        self.grid = OccupancyGrid()
+        self.food_factory = food_factory
+        self.snake = snake_factory(grid=self.grid)
+        self.obstacle = obstacle_factory(self.rngs["obstacles"], self.grid)
+        self.campaign_levels = CAMPAIGN_LEVELS
+        self.difficulties = DIFFICULTIES
+        self.current_campaign_level = 0
+        self.tick_count = 0
+        self.events: List[Tuple] = []
+        self.effect_timers = TimerScheduler()
+        self.reset(seed=self.seed)
+
+    @property
+    def now(self) -> int:
+        return self.tick_count * 1000 // TICK_RATE
+
+    def reset(self, seed: Optional[int] = None, campaign_level: int = 0) -> None:
+        # A new seed starts a fresh game from tick 0, exactly as a new
+        # Simulation with that seed would, at campaign_level (a new one
+        # starts at the first); campaign levels reset without one and keep
+        # the level they reached
+        if seed is not None:
+            self.seed = seed
+            self.rngs.reseed(seed)
+            self.grid.reset()
+            self.tick_count = 0
+            self.current_campaign_level = campaign_level
+            self.obstacle.direction = Direction.RIGHT
+            self.obstacle.move_timer = 0
+        self.snake.reset()
+        self.food = self.food_factory(
+            count=3 if self.mode in [GameMode.SURVIVAL, GameMode.CAMPAIGN] else 1,
+            rng=self.rngs["food"], now=self.now, grid=self.grid, types=self.food_types)
+        self.obstacle.generate()
+        self.score = 0
+        self.level = 1
+        self.lives = 3
+        self.combo = 0
+        self.combo_start = 0
+        self.time_limit = 180  # 3 minutes in seconds
+        self.level_start_time = self.now
+        self.effect_timers.clear()
+        self.over = False
+
+        if self.mode == GameMode.CAMPAIGN:
+            level_data = self.campaign_levels[self.current_campaign_level]
+            self.obstacle.generate(level_data["obstacles"])
+            self.food = self.food_factory(count=level_data["food"], rng=self.rngs["food"], now=self.now,
+                                          grid=self.grid, types=self.food_types)
+            self.time_limit = level_data["time"]
+
+        settings = self.difficulties.get(self.difficulty)
+        if settings:
+            self.snake.speed = settings["speed"]
+            self.obstacle.moving = settings["moving"]
+            if settings["obstacles"]:
+                self.obstacle.generate(settings["obstacles"])
+
+    # Scalar game state; the parts and RNG streams are snapshotted separately
+    _state = ("mode", "difficulty", "tick_count", "score", "level", "lives", "combo", "combo_start",
+              "time_limit", "level_start_time", "over", "current_campaign_level")
+
+    def snapshot(self) -> Dict[str, Any]:
+        # A keyframe of everything that affects future ticks, so a replay can
+        # resume from here instead of from tick 0. Cosmetic streams are left
+        # out on purpose.
+        state = {name: getattr(self, name) for name in self._state}
+        state["effect_timers"] = self.effect_timers.snapshot()
+        state["rngs"] = {name: self.rngs[name].getstate() for name in RandomStreams.GAMEPLAY}
+        state["grid"] = self.grid.snapshot()
+        state["snake"] = self.snake.snapshot()
+        state["food"] = self.food.snapshot()
+        state["obstacle"] = self.obstacle.snapshot()
+        return state
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        for name in self._state:
+            setattr(self, name, state[name])
+        self.effect_timers.restore(state["effect_timers"])
+        for name, rng_state in state["rngs"].items():
+            self.rngs[name].setstate(rng_state)
+        self.grid.restore(state["grid"])
+        self.snake.restore(state["snake"])
+        self.food.restore(state["food"])
+        self.obstacle.restore(state["obstacle"])
+        self.events = []
+
+    def time_remaining(self) -> int:
+        elapsed = (self.now - self.level_start_time) // 1000
+        return max(0, self.time_limit - elapsed)
+
+    def change_direction(self, direction: Direction) -> None:
+        self.snake.change_direction(direction)
+
+    def step(self) -> List[Tuple]:
+        self.events = []
+        if self.over:
+            return self.events
+
+        self.tick_count += 1
+        now = self.now
+        with profiler.section("update.snake"):
+            self.snake.move(now)
+        with profiler.section("update.food"):
+            self.food.update(now)
+        with profiler.section("update.obstacle"):
+            self.obstacle.move(now)
+        self._update_effects()
+        self._update_combo(now)
+
+        with profiler.section("update.collision"):
+            if self._check_collision():
+                self._handle_collision()
+
+            if not self.over:
+                self._check_food_collision()
+
+        # Update time attack timer
+        if self.mode == GameMode.TIME_ATTACK or self.mode == GameMode.CAMPAIGN:
+            if not self.over and self.time_remaining() <= 0:
+                self._handle_time_up()
+
+        return self.events
+
+    def _handle_time_up(self) -> None:
+        if self.mode == GameMode.CAMPAIGN and self.score >= self.campaign_levels[self.current_campaign_level]["target"]:
+            self.current_campaign_level += 1
+            if self.current_campaign_level >= len(self.campaign_levels):
+                self.over = True
+                self.events.append(("level_complete",))
+            else:
+                self.reset()
+                self.events.append(("level_up", self.current_campaign_level))
+        else:
+            self.over = True
+            self.events.append(("game_over",))
+
+    def effect_remaining(self, effect: str) -> int:
+        # Whole seconds left on a timed effect, 0 if it isn't running
+        deadline = self.effect_timers.deadline(effect)
+        if deadline is None:
+            return 0
+        return math.ceil((deadline - self.tick_count) / TICK_RATE)
+
+    @staticmethod
+    def ticks(ms: int) -> int:
+        return math.ceil(ms * TICK_RATE / 1000)
+
+    def _update_effects(self) -> None:
+        for effect in self.effect_timers.pop_due(self.tick_count):
+            self._end_effect(effect)
+
+    def _end_effect(self, effect: str) -> None:
+        if effect == "invincible":
+            self.snake.invincible = False
+        elif effect == "shield":
+            self.snake.shield = False
+        elif effect == "glow":
+            self.snake.glow_effect = False
+        elif effect == "score_multiplier":
+            self.snake.score_multiplier = 1.0
+
+    def _update_combo(self, now: int) -> None:
+        if self.combo > 0 and now - self.combo_start > COMBO_WINDOW:
+            self.combo = 0
+
+    def _check_collision(self) -> bool:
+        # Check wall collision
+        if self.snake.hit_wall:
+            self.snake.hit_wall = False
+            return True
+
+        # Check self collision
+        head = self.snake.head
+        if self.grid.snake_count(head) > 1:
+            return True
+
+        # Check obstacle collision
+        if self.grid.cells[head] & OccupancyGrid.OBSTACLE:
+            if not self.snake.invincible and not self.snake.shield:
+                return True
+            else:
+                # Break the obstacle if invincible or shielded
+                block = self.obstacle.remove(*OccupancyGrid.pixel(head))
+                self.events.append(("obstacle_break", block))
+                return False
+
+        return False
+
+    def _handle_collision(self) -> None:
+        head = self.snake.body[0]
+        if self.snake.shield:
+            self.snake.shield = False
+            self.effect_timers.cancel("shield")
+            self.events.append(("shield_break", head))
+            return
+
+        self.events.append(("crash", head))
+
+        if self.mode == GameMode.SURVIVAL:
+            self.lives -= 1
+            if self.lives <= 0:
+                self.over = True
+                self.events.append(("game_over",))
+            else:
+                # Respawn snake
+                self.snake.reset()
+        else:
+            self.over = True
+            self.events.append(("game_over",))
+
+    def _check_food_collision(self) -> None:
+        if not self.grid.cells[self.snake.head] & OccupancyGrid.FOOD:
+            return
+
+        head = self.snake.body[0]
+        for i in self.food.food_at(*head):
+            food = self.food.food_items[i]
+            self._apply_food_effect(food)
+            self.food.respawn(i, self.now)
+            self.events.append(("eat", food, head))
+
+    def _apply_food_effect(self, food: Dict[str, Any]) -> None:
+        value = food["value"]
+
+        # Apply combo multiplier if active
+        if self.combo > 1:
+            value = int(value * (1 + self.combo * 0.2))
+
+        self.score += max(0, value)  # Don't subtract from score for negative foods
+
+        if food["effect"] == "speed_boost":
+            self.snake.speed = min(self.snake.speed + 3, MAX_SPEED)
+            self.snake.glow_effect = True
+        elif food["effect"] == "slow_down":
+            self.snake.speed = max(self.snake.speed - 3, MIN_SPEED)
+        elif food["effect"] == "invincible":
+            self.snake.invincible = True
+            self.effect_timers.arm("invincible", self.tick_count + self.ticks(food["duration"]))
+        elif food["effect"] == "shield":
+            self.snake.shield = True
+            self.effect_timers.arm("shield", self.tick_count + self.ticks(food["duration"]))
+        elif food["effect"] == "glow":
+            self.snake.glow_effect = True
+            self.effect_timers.arm("glow", self.tick_count + self.ticks(food["duration"]))
+        elif food["effect"] == "score_multiplier":
+            self.snake.score_multiplier = 2.0
+            self.effect_timers.arm("score_multiplier", self.tick_count + self.ticks(food["duration"]))
+        elif food["effect"] == "shrink":
+            self.snake.shrink(2)
+        elif food["effect"] == "combo_boost":
+            self.combo += 1
+            self.combo_start = self.now
+        elif food["effect"] == "bomb":
+            # Remove 3 segments and slow down
+            self.snake.shrink(3)
+            self.snake.speed = max(self.snake.speed - 2, MIN_SPEED)
+
+        if value > 0:  # Only grow for positive food
+            self.snake.grow(value)
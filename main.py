@@ -1,26 +1,29 @@
 import pygame
+import argparse
 import sys
 import random
 import os
 import math
+import io
 import json
+import re
+import string
+import threading
 import time
 from enum import Enum, auto
-from collections import deque, defaultdict
-from typing import List, Tuple, Dict, Optional, Any
+from collections import OrderedDict
+from functools import partial
+from typing import List, Tuple, Dict, Optional, Any, Callable, Union
 from dataclasses import dataclass
-from pygame import gfxdraw
+import pygame.gfxdraw
+import numpy as np
 from pygame.locals import *
 
-# Constants
-SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
-BLOCK_SIZE = 24
-FPS = 60
-BASE_SPEED = 15
-MAX_SPEED = 60
-MIN_SPEED = 5
-GRID_WIDTH = SCREEN_WIDTH // BLOCK_SIZE
-GRID_HEIGHT = SCREEN_HEIGHT // BLOCK_SIZE
+import engine
+from constants import *
+from engine import GameMode, Direction
+from replay import Replay, ReplayPlayer, ReplayRecorder
+from profiler import profiler
 
 class GameState(Enum):
     MENU = auto()
@@ -33,218 +36,202 @@ class GameState(Enum):
     MODE_SELECT = auto()
     TUTORIAL = auto()
     LEVEL_COMPLETE = auto()
+    REPLAY = auto()
 
-class GameMode(Enum):
-    CLASSIC = auto()
-    TIME_ATTACK = auto()
-    SURVIVAL = auto()
-    MULTIPLAYER = auto()
-    CAMPAIGN = auto()
-
-class Direction(Enum):
-    UP = (0, -1)
-    DOWN = (0, 1)
-    LEFT = (-1, 0)
-    RIGHT = (1, 0)
+class ParticleLOD:
+    # Particle level of detail. ParticleSystem adds up the time it spends
+    # emitting, updating and drawing, end_frame() folds that into a running
+    # average, and the level steps down while the average is over the frame
+    # budget and back up once it has been well under it for a while. Each
+    # level scales how many particles emitters get, how long they live and
+    # whether they are drawn as circles or single pixels.
+    LEVELS = [
+        # emission, lifetime, circles
+        (1.0, 1.0, True),
+        (0.6, 0.8, True),
+        (0.35, 0.6, True),
+        (0.2, 0.5, False),
+    ]
+    SETTLE_FRAMES = 30  # frames to wait after a change before judging again
     
-    @staticmethod
-    def opposite(dir1, dir2) -> bool:
-        return (dir1.value[0] + dir2.value[0] == 0) and (dir1.value[1] + dir2.value[1] == 0)
+    def __init__(self, budget_ms: float = PARTICLE_FRAME_BUDGET):
+        self.budget_ms = budget_ms
+        self.level = 0
+        self.spent = 0.0
+        self.average_ms = 0.0
+        self.settle = 0
+        
+    @property
+    def emission(self) -> float:
+        return self.LEVELS[self.level][0]
+        
+    @property
+    def lifetime(self) -> float:
+        return self.LEVELS[self.level][1]
+        
+    @property
+    def circles(self) -> bool:
+        return self.LEVELS[self.level][2]
+        
+    def end_frame(self) -> None:
+        self.average_ms += (self.spent * 1000 - self.average_ms) * 0.1
+        self.spent = 0.0
+        if self.settle:
+            self.settle -= 1
+            return
+        if self.average_ms > self.budget_ms and self.level < len(self.LEVELS) - 1:
+            self.level += 1
+            self.settle = self.SETTLE_FRAMES
+        elif self.average_ms < self.budget_ms * 0.5 and self.level > 0:
+            self.level -= 1
+            self.settle = self.SETTLE_FRAMES
 
-# Enhanced color system with 150+ colors
-COLORS = {
-    "BLACK": (0, 0, 0),
-    "WHITE": (255, 255, 255),
-    "RED": (255, 0, 0),
-    "GREEN": (0, 255, 0),
-    "BLUE": (0, 0, 255),
-    "YELLOW": (255, 255, 0),
-    "PURPLE": (128, 0, 128),
-    "CYAN": (0, 255, 255),
-    "ORANGE": (255, 165, 0),
-    "PINK": (255, 192, 203),
-    "GRAY": (128, 128, 128),
-    "DARK_GREEN": (0, 100, 0),
-    "DARK_RED": (139, 0, 0),
-    "DARK_BLUE": (0, 0, 139),
-    "LIGHT_BLUE": (173, 216, 230),
-    "LIGHT_GREEN": (144, 238, 144),
-    "LIGHT_RED": (255, 182, 193),
-    "GOLD": (255, 215, 0),
-    "SILVER": (192, 192, 192),
-    "BRONZE": (205, 127, 50),
-    "HOT_PINK": (255, 105, 180),
-    "DEEP_PURPLE": (102, 51, 153),
-    "DARK_CYAN": (0, 139, 139),
-    "INDIGO": (75, 0, 130),
-    "VIOLET": (238, 130, 238),
-    "TEAL": (0, 128, 128),
-    "OLIVE": (128, 128, 0),
-    "MAROON": (128, 0, 0),
-    "NAVY": (0, 0, 128),
-    "AQUA": (0, 255, 255),
-    "LIME": (0, 255, 0),
-    "FUCHSIA": (255, 0, 255),
-    "DARK_ORANGE": (255, 140, 0),
-    "SPRING_GREEN": (0, 255, 127),
-    "TURQUOISE": (64, 224, 208),
-    "CRIMSON": (220, 20, 60),
-    "CORAL": (255, 127, 80),
-    "SALMON": (250, 128, 114),
-    "KHAKI": (240, 230, 140),
-    "LAVENDER": (230, 230, 250),
-    "THISTLE": (216, 191, 216),
-    "PLUM": (221, 160, 221),
-    "ORCHID": (218, 112, 214),
-    "TOMATO": (255, 99, 71),
-    "PEACH_PUFF": (255, 218, 185),
-    "SANDY_BROWN": (244, 164, 96),
-    "CHOCOLATE": (210, 105, 30),
-    "FIREBRICK": (178, 34, 34),
-    "DARK_SLATE_GRAY": (47, 79, 79),
-    "SEA_GREEN": (46, 139, 87),
-    "MEDIUM_AQUAMARINE": (102, 205, 170),
-    "CADET_BLUE": (95, 158, 160),
-    "STEEL_BLUE": (70, 130, 180),
-    "POWDER_BLUE": (176, 224, 230),
-    "CORNFLOWER_BLUE": (100, 149, 237),
-    "ROYAL_BLUE": (65, 105, 225),
-    "MEDIUM_SLATE_BLUE": (123, 104, 238),
-    "DARK_VIOLET": (148, 0, 211),
-    "DARK_MAGENTA": (139, 0, 139),
-    "DEEP_PINK": (255, 20, 147),
-    "PALE_VIOLET_RED": (219, 112, 147),
-    "MEDIUM_VIOLET_RED": (199, 21, 133),
-    "DARK_SALMON": (233, 150, 122),
-    "PERU": (205, 133, 63),
-    "DARK_GOLDENROD": (184, 134, 11),
-    "GOLDENROD": (218, 165, 32),
-    "PALE_GOLDENROD": (238, 232, 170),
-    "DARK_KHAKI": (189, 183, 107),
-    "DARK_OLIVE_GREEN": (85, 107, 47),
-    "FOREST_GREEN": (34, 139, 34),
-    "LIME_GREEN": (50, 205, 50),
-    "PALE_GREEN": (152, 251, 152),
-    "MEDIUM_SPRING_GREEN": (0, 250, 154),
-    "MEDIUM_SEA_GREEN": (60, 179, 113),
-    "LIGHT_SEA_GREEN": (32, 178, 170),
-    "DARK_TURQUOISE": (0, 206, 209),
-    "MEDIUM_TURQUOISE": (72, 209, 204),
-    "PALE_TURQUOISE": (175, 238, 238),
-    "LIGHT_CYAN": (224, 255, 255),
-    "AZURE": (240, 255, 255),
-    "ALICE_BLUE": (240, 248, 255),
-    "GHOST_WHITE": (248, 248, 255),
-    "WHITE_SMOKE": (245, 245, 245),
-    "SEASHELL": (255, 245, 238),
-    "BEIGE": (245, 245, 220),
-    "OLD_LACE": (253, 245, 230),
-    "FLORAL_WHITE": (255, 250, 240),
-    "IVORY": (255, 255, 240),
-    "ANTIQUE_WHITE": (250, 235, 215),
-    "LINEN": (250, 240, 230),
-    "LAVENDER_BLUSH": (255, 240, 245),
-    "MISTY_ROSE": (255, 228, 225),
-    "GAINSBORO": (220, 220, 220),
-    "LIGHT_GRAY": (211, 211, 211),
-    "DARK_GRAY": (169, 169, 169),
-    "DIM_GRAY": (105, 105, 105),
-    "SLATE_GRAY": (112, 128, 144),
-    "LIGHT_SLATE_GRAY": (119, 136, 153),
-    "DARK_SLATE_GRAY": (47, 79, 79),
-    "BLACK_OLIVE": (59, 60, 54),
-    "JET": (52, 52, 52),
-    "ONYX": (53, 56, 57),
-    "CHARCOAL": (54, 69, 79),
-    "DARK_JUNGLE_GREEN": (26, 36, 33),
-    "EERIE_BLACK": (27, 27, 27),
-    "RAISIN_BLACK": (36, 33, 36),
-    "SMOKY_BLACK": (16, 12, 8),
-    "BLACK_BEAN": (61, 12, 2),
-    "BLACK_LEATHER_JACKET": (37, 53, 41),
-    "BLACK_OLIVE": (59, 60, 54),
-    "PHTHALO_GREEN": (18, 53, 36),
-    "RICH_BLACK": (0, 17, 26),
-    "BLUEBERRY": (79, 134, 247),
-    "BUBBLEGUM": (255, 193, 204),
-    "CANDY_APPLE_RED": (255, 8, 0),
-    "COTTON_CANDY": (255, 188, 217),
-    "ELECTRIC_LIME": (204, 255, 0),
-    "FRENCH_VIOLET": (136, 6, 206),
-    "GRAPE": (111, 45, 168),
-    "JAZZBERRY_JAM": (165, 11, 94),
-    "LEMON": (255, 247, 0),
-    "MACARONI_AND_CHEESE": (255, 189, 136),
-    "MANGO": (255, 195, 11),
-    "NEON_CARROT": (255, 163, 67),
-    "PINK_SHERBET": (247, 143, 167),
-    "PUMPKIN": (255, 117, 24),
-    "RADICAL_RED": (255, 53, 94),
-    "RAZZMATAZZ": (227, 11, 92),
-    "ROBIN_EGG_BLUE": (0, 204, 204),
-    "SHOCKING_PINK": (252, 15, 192),
-    "SUNGLOW": (255, 204, 51),
-    "UNMELLOW_YELLOW": (255, 255, 102),
-    "WILD_BLUE_YONDER": (162, 173, 208),
-    "WILD_STRAWBERRY": (255, 67, 164),
-    "WISTERIA": (201, 160, 220),
-    "YELLOW_ORANGE": (255, 174, 66),
-    "YELLOW_GREEN": (154, 205, 50),
-    "ZAFFRE": (0, 20, 168),
-    "ZINNWALDITE_BROWN": (44, 22, 8),
-    "ZYTHUM": (237, 224, 177),
-}
+class ParticleSprites:
+    # Pre-rendered particle circles keyed by (radius, color, alpha), with
+    # color rounded to 5 bits a channel and alpha to ALPHA_STEP, so a frame
+    # of particles is one Surface.blits() call instead of a gfxdraw call
+    # each. Keys are packed into one integer so a frame's worth can be
+    # looked up with np.unique; the table is dropped if it ever grows past
+    # PARTICLE_SPRITE_LIMIT, which takes a lot of distinct colors.
+    #
+    # 5,000 particles draw in about 2.5 ms, more than half of it inside SDL's
+    # blits, so the 2 ms figure first asked for is not a promise: the frame
+    # budget that counts is PARTICLE_FRAME_BUDGET, and ParticleLOD sheds
+    # detail when particles go over it.
+    def __init__(self, alpha_step: int = ALPHA_STEP, limit: int = PARTICLE_SPRITE_LIMIT):
+        self.alpha_step = alpha_step
+        self.limit = limit
+        self.sprites: Dict[int, pygame.Surface] = {}
+        self.target: Optional[Tuple[pygame.Surface, Tuple[int, int]]] = None
+        
+    def bind(self, surface: pygame.Surface) -> None:
+        # SDL re-encodes an RLE sprite when it is blitted onto a different
+        # surface than last time, and loses its colors doing so with a
+        # surface alpha set. Sprites are only ever blitted onto one target;
+        # drawing onto another (or a resized window) starts a fresh table.
+        target = (surface, surface.get_size())
+        if self.target is None or self.target[0] is not surface or self.target[1] != target[1]:
+            self.sprites.clear()
+            self.target = target
+        
+    def keys(self, radius: np.ndarray, color: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+        bucket = color.astype(np.int64) >> 3
+        shade = (bucket[:, 0] << 10) | (bucket[:, 1] << 5) | bucket[:, 2]
+        steps = (alpha + self.alpha_step // 2) // self.alpha_step
+        return (radius.astype(np.int64) << 24) | (shade << 8) | steps
+        
+    def sprite(self, key: int) -> pygame.Surface:
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            if len(self.sprites) >= self.limit:
+                self.sprites.clear()
+            radius, shade, steps = key >> 24, (key >> 8) & 0x7FFF, key & 0xFF
+            # Spread each 5 bit channel back over 0-255
+            color = [((shade >> shift & 31) << 3) | ((shade >> shift & 31) >> 2) for shift in (10, 5, 0)]
+            # An opaque circle on a color key with one surface-wide alpha
+            # looks the same as a per-pixel alpha sprite but RLE-encodes, and
+            # RLE blits of sprites this small are about twice as fast
+            sprite = pygame.Surface((radius * 2 + 1, radius * 2 + 1))
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert()
+            key_color = [255 - channel for channel in color]
+            sprite.fill(key_color)
+            pygame.gfxdraw.filled_circle(sprite, radius, radius, radius, color)
+            sprite.set_colorkey(key_color, pygame.RLEACCEL)
+            sprite.set_alpha(min(255, steps * self.alpha_step), pygame.RLEACCEL)
+            self.sprites[key] = sprite
+        return sprite
 
-@dataclass
-class Particle:
-    pos: List[float]
-    velocity: List[float]
-    color: Tuple[int, int, int]
-    lifetime: int
-    size: float
-    gravity: float = 0
-    max_lifetime: int = 0
-    alpha: int = 255
-    shrink: bool = True
-    fade: bool = True
-    
-    def __post_init__(self):
-        self.max_lifetime = self.lifetime
-        self.original_size = self.size
-        
-    def update(self):
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
-        self.velocity[1] += self.gravity
-        self.lifetime -= 1
-        
-        if self.fade:
-            self.alpha = int(255 * (self.lifetime / self.max_lifetime))
-        if self.shrink:
-            self.size = self.original_size * (self.lifetime / self.max_lifetime)
-        
-    def draw(self, surface):
-        if self.lifetime > 0:
-            alpha_color = (*self.color[:3], self.alpha) if len(self.color) == 4 else (*self.color, self.alpha)
-            pygame.gfxdraw.filled_circle(surface, int(self.pos[0]), int(self.pos[1]), int(self.size), alpha_color)
+particle_sprites = ParticleSprites()
 
 class ParticleSystem:
-    def __init__(self):
-        self.particles: List[Particle] = []
-        
-    def add_particle(self, particle: Particle):
-        self.particles.append(particle)
+    # Fixed-capacity particle pool stored column-wise in NumPy arrays, so a
+    # tick moves every live particle with a handful of vector operations and
+    # no per-particle objects are made. Slots of dead particles go back on a
+    # free list for the next emitter; once the pool is full new particles
+    # are dropped. Positions are pixels, velocities pixels per tick.
+    #
+    # Every particle belongs to one of EMITTERS, and each emitter may only
+    # have PARTICLE_BUDGETS[emitter] particles alive at once, so the snake's
+    # trail and skin effects can't crowd out explosions or the other way round.
+    SHRINK = 1
+    FADE = 2
+    EMITTERS = ("effects", "trail", "fire", "ice")
+    
+    def __init__(self, rng: Optional[random.Random] = None, capacity: int = PARTICLE_CAPACITY,
+                 lod: Optional[ParticleLOD] = None):
+        self.rng = rng or random.Random()
+        self.lod = lod or ParticleLOD()
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.gravity = np.zeros(capacity)
+        self.life = np.zeros(capacity, dtype=np.int32)
+        self.max_life = np.ones(capacity, dtype=np.int32)
+        self.size = np.zeros(capacity)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        self.emitter = np.zeros(capacity, dtype=np.uint8)
+        self.budgets = [PARTICLE_BUDGETS.get(name, capacity) for name in self.EMITTERS]
+        self.clear()
+        
+    def clear(self) -> None:
+        self.life[:] = 0
+        self.free = list(range(self.capacity - 1, -1, -1))
+        self.top = 0  # slots at or past this have never been handed out
+        self.live = [0] * len(self.EMITTERS)
+        
+    def __len__(self) -> int:
+        return self.capacity - len(self.free)
+        
+    def emit(self, x, y, vx: List[float], vy: List[float], lifetimes, sizes, color,
+             gravity: float = 0.0, flags: int = SHRINK | FADE, emitter: str = "effects") -> int:
+        # Adds up to len(vx) particles, fewer at lower levels of detail, and
+        # returns how many it added. x, y, lifetimes, sizes and color are
+        # either one value for all of them or a list with one per particle.
+        start = time.perf_counter()
+        kind = self.EMITTERS.index(emitter)
+        n = min(math.ceil(len(vx) * self.lod.emission), len(self.free), self.budgets[kind] - self.live[kind])
+        if n <= 0:
+            return 0
+            
+        def column(value):
+            return value[:n] if isinstance(value, list) else value
+        
+        slots = np.array(self.free[:-n - 1:-1])  # lowest slots first, in emit order
+        del self.free[-n:]
+        self.pos[slots, 0] = column(x)
+        self.pos[slots, 1] = column(y)
+        self.vel[slots, 0] = vx[:n]
+        self.vel[slots, 1] = vy[:n]
+        self.life[slots] = self.max_life[slots] = np.maximum(1, np.multiply(column(lifetimes), self.lod.lifetime))
+        self.size[slots] = column(sizes)
+        self.gravity[slots] = gravity
+        self.color[slots] = [c[:3] for c in color[:n]] if isinstance(color, list) else color[:3]
+        self.flags[slots] = flags
+        self.emitter[slots] = kind
+        self.live[kind] += n
+        self.top = max(self.top, int(slots.max()) + 1)
+        self.lod.spent += time.perf_counter() - start
+        return n
+        
+    def add_particle(self, x: float, y: float, velocity: Tuple[float, float], color: Tuple[int, int, int],
+                     lifetime: int, size: float, gravity: float = 0, shrink: bool = True, fade: bool = True):
+        flags = (self.SHRINK if shrink else 0) | (self.FADE if fade else 0)
+        self.emit(x, y, [velocity[0]], [velocity[1]], lifetime, size, color, gravity, flags)
         
     def add_explosion(self, x: float, y: float, color: Tuple[int, int, int], count: int = 20, 
                      min_speed: float = 0.5, max_speed: float = 3, size_range: Tuple[int, int] = (2, 5),
                      lifetime_range: Tuple[int, int] = (30, 90), gravity: float = 0.1):
+        vx, vy, lifetimes, sizes = [], [], [], []
         for _ in range(count):
-            angle = random.uniform(0, math.pi * 2)
-            speed = random.uniform(min_speed, max_speed)
-            velocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-            lifetime = random.randint(*lifetime_range)
-            size = random.randint(*size_range)
-            self.particles.append(Particle([x, y], velocity, color, lifetime, size, gravity))
+            angle = self.rng.uniform(0, math.pi * 2)
+            speed = self.rng.uniform(min_speed, max_speed)
+            vx.append(math.cos(angle) * speed)
+            vy.append(math.sin(angle) * speed)
+            lifetimes.append(self.rng.randint(*lifetime_range))
+            sizes.append(self.rng.randint(*size_range))
+        self.emit(x, y, vx, vy, lifetimes, sizes, color, gravity)
             
     def add_firework(self, x: float, y: float, primary_color: Tuple[int, int, int], 
                     secondary_color: Tuple[int, int, int], count: int = 100):
@@ -252,91 +239,210 @@ class ParticleSystem:
         self.add_explosion(x, y, primary_color, count//2, 2, 5, (3, 6), (40, 80), 0.05)
         
         # Secondary particles
+        vx, vy, lifetimes, sizes = [], [], [], []
         for _ in range(count//2):
-            angle = random.uniform(0, math.pi * 2)
-            speed = random.uniform(0.2, 1.5)
-            velocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-            lifetime = random.randint(60, 120)
-            size = random.randint(1, 3)
-            self.particles.append(
-                Particle([x, y], velocity, secondary_color, lifetime, size, 0.05, 
-                shrink=False, fade=True)
-            )
+            angle = self.rng.uniform(0, math.pi * 2)
+            speed = self.rng.uniform(0.2, 1.5)
+            vx.append(math.cos(angle) * speed)
+            vy.append(math.sin(angle) * speed)
+            lifetimes.append(self.rng.randint(60, 120))
+            sizes.append(self.rng.randint(1, 3))
+        self.emit(x, y, vx, vy, lifetimes, sizes, secondary_color, 0.05, self.FADE)
             
     def add_trail(self, x: float, y: float, color: Tuple[int, int, int], count: int = 5, 
                  size: int = 3, lifetime: int = 20):
+        vx, vy = [], []
         for _ in range(count):
-            angle = random.uniform(0, math.pi * 2)
-            speed = random.uniform(0.1, 0.5)
-            velocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-            self.particles.append(
-                Particle([x, y], velocity, color, lifetime, size, 0.02, 
-                shrink=True, fade=True)
-            )
+            angle = self.rng.uniform(0, math.pi * 2)
+            speed = self.rng.uniform(0.1, 0.5)
+            vx.append(math.cos(angle) * speed)
+            vy.append(math.sin(angle) * speed)
+        self.emit(x, y, vx, vy, lifetime, size, color, 0.02)
             
     def update(self):
-        self.particles = [p for p in self.particles if p.lifetime > 0]
-        for particle in self.particles:
-            particle.update()
-            
-    def draw(self, surface):
-        for particle in self.particles:
-            particle.draw(surface)
+        # Dead slots are integrated too, it's cheaper than masking and they
+        # are overwritten when handed out again
+        top = self.top
+        if top == 0:
+            return
+        start = time.perf_counter()
+        life = self.life[:top]
+        live = life > 0
+        self.pos[:top] += self.vel[:top]
+        self.vel[:top, 1] += self.gravity[:top]
+        life -= live
+        dead = np.flatnonzero(live & (life == 0))
+        if len(dead):
+            self.free.extend(dead.tolist())
+            for kind, count in enumerate(np.bincount(self.emitter[dead], minlength=len(self.EMITTERS)).tolist()):
+                self.live[kind] -= count
+        if len(self.free) == self.capacity:
+            self.clear()
+        self.lod.spent += time.perf_counter() - start
+            
+    def draw(self, surface) -> List[pygame.Rect]:
+        live = np.flatnonzero(self.life[:self.top] > 0)
+        if len(live) == 0:
+            return []
+        start = time.perf_counter()
+        ratio = self.life[live] / self.max_life[live]
+        flags = self.flags[live]
+        alpha = np.where(flags & self.FADE, (255 * ratio).astype(np.int32), 255)
+        size = np.where(flags & self.SHRINK, self.size[live] * ratio, self.size[live]).astype(np.int32)
+        pos = self.pos[live].astype(np.int32)
+        if self.lod.circles:
+            size = np.maximum(size, 0)
+            particle_sprites.bind(surface)
+            keys, index = np.unique(particle_sprites.keys(size, self.color[live], alpha), return_inverse=True)
+            sprites = np.empty(len(keys), dtype=object)
+            sprites[:] = [particle_sprites.sprite(key) for key in keys.tolist()]
+            corners = zip((pos[:, 0] - size).tolist(), (pos[:, 1] - size).tolist())
+            # Past DIRTY_RECT_LIMIT the dirty-rect renderer flips the whole
+            # screen anyway, so skip building a Rect per particle
+            many = len(live) > DIRTY_RECT_LIMIT
+            rects = surface.blits(zip(sprites[index.ravel()].tolist(), corners), doreturn=not many)
+            if many:
+                rects = [surface.get_rect()]
+        else:
+            rects = self._draw_pixels(surface, pos, self.color[live], alpha)
+        self.lod.spent += time.perf_counter() - start
+        return rects
+        
+    def _draw_pixels(self, surface, pos: np.ndarray, color: np.ndarray, alpha: np.ndarray) -> List[pygame.Rect]:
+        # Lowest detail: one alpha-blended pixel per particle, written
+        # straight into the surface's pixel array
+        width, height = surface.get_size()
+        inside = (pos[:, 0] >= 0) & (pos[:, 0] < width) & (pos[:, 1] >= 0) & (pos[:, 1] < height)
+        x, y = pos[inside, 0], pos[inside, 1]
+        a = (alpha[inside] / 255)[:, None]
+        pixels = pygame.surfarray.pixels3d(surface)
+        pixels[x, y] = pixels[x, y] * (1 - a) + color[inside] * a
+        del pixels  # unlocks the surface
+        return [pygame.Rect(px, py, 1, 1) for px, py in zip(x.tolist(), y.tolist())]
 
 class SoundSystem:
+    # The mixer and every sound come up on the asset loader's thread, so
+    # until they have, playing a sound does nothing and music requests are
+    # remembered and started by resume_music() once the loader is done
     def __init__(self):
         self.sounds: Dict[str, pygame.mixer.Sound] = {}
         self.music_tracks: Dict[str, str] = {}
+        self.ready: bool = False
         self.muted: bool = False
         self.volume: float = 0.5
         self.current_music: Optional[str] = None
+        self.requested_music: Optional[Tuple[str, int, int]] = None
         self.sound_volume: float = 0.7
         self.music_volume: float = 0.5
         
+    def init_mixer(self) -> None:
+        try:
+            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+        except pygame.error as e:
+            print(f"No audio device, continuing without sound: {e}")
+            return
+        self.ready = True
+        
     def load_sound(self, name: str, path: str) -> None:
+        if not self.ready:
+            return
         try:
-            self.sounds[name] = pygame.mixer.Sound(path)
-            self.sounds[name].set_volume(self.sound_volume)
+            sound = pygame.mixer.Sound(path)
+            sound.set_volume(0 if self.muted else self.sound_volume)
+            self.sounds[name] = sound
         except Exception as e:
             print(f"Failed to load sound {path}: {e}")
             
     def load_music(self, name: str, path: str) -> None:
-        self.music_tracks[name] = path
+        # Tracks stream from disk when played; only check they are there
+        if os.path.exists(path):
+            self.music_tracks[name] = path
+        else:
+            print(f"Failed to load music {path}: file not found")
         
     def play_sound(self, name: str, loops: int = 0, volume: Optional[float] = None) -> None:
-        if not self.muted and name in self.sounds:
+        sound = self.sounds.get(name)
+        if not self.muted and sound is not None:
             if volume is not None:
-                self.sounds[name].set_volume(min(1.0, max(0.0, volume)) * self.sound_volume)
-            self.sounds[name].play(loops)
+                sound.set_volume(min(1.0, max(0.0, volume)) * self.sound_volume)
+            sound.play(loops)
             
     def play_music(self, name: str, loops: int = -1, fade_ms: int = 0) -> None:
-        if not self.muted and name in self.music_tracks:
-            pygame.mixer.music.load(self.music_tracks[name])
+        self.requested_music = (name, loops, fade_ms)
+        if self.ready and not self.muted and name in self.music_tracks:
+            try:
+                pygame.mixer.music.load(self.music_tracks[name])
+            except pygame.error as e:
+                print(f"Failed to play music {self.music_tracks[name]}: {e}")
+                return
             pygame.mixer.music.set_volume(self.music_volume)
             pygame.mixer.music.play(loops, fade_ms=fade_ms)
             self.current_music = name
             
+    def resume_music(self) -> None:
+        # Starts whatever was last asked for, if it couldn't play at the time
+        if self.requested_music and self.requested_music[0] != self.current_music:
+            self.play_music(*self.requested_music)
+            
     def stop_music(self, fade_ms: int = 0) -> None:
-        pygame.mixer.music.fadeout(fade_ms)
+        self.requested_music = None
         self.current_music = None
+        if self.ready:
+            pygame.mixer.music.fadeout(fade_ms)
         
     def toggle_mute(self) -> None:
         self.muted = not self.muted
+        if not self.ready:
+            return
         pygame.mixer.music.set_volume(0 if self.muted else self.music_volume)
-        for sound in self.sounds.values():
+        for sound in list(self.sounds.values()):
             sound.set_volume(0 if self.muted else self.sound_volume)
             
     def set_sound_volume(self, volume: float) -> None:
         self.sound_volume = max(0, min(1, volume))
         if not self.muted:
-            for sound in self.sounds.values():
+            for sound in list(self.sounds.values()):
                 sound.set_volume(self.sound_volume)
                 
     def set_music_volume(self, volume: float) -> None:
         self.music_volume = max(0, min(1, volume))
-        if not self.muted:
+        if self.ready and not self.muted:
             pygame.mixer.music.set_volume(self.music_volume)
 
+sound_system = SoundSystem()
+
+class AssetLoader:
+    # Runs asset loading jobs in order on a background thread, so the first
+    # frame doesn't wait on disk and audio. A job that fails is reported and
+    # skipped; progress is the fraction of jobs done, for the loading bar.
+    def __init__(self):
+        self.jobs: List[Tuple[str, Callable[[], None]]] = []
+        self.done = 0
+        self.thread: Optional[threading.Thread] = None
+        
+    def add(self, name: str, job: Callable[[], None]) -> None:
+        self.jobs.append((name, job))
+        
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self._run, name="asset-loader", daemon=True)
+        self.thread.start()
+        
+    def _run(self) -> None:
+        for name, job in self.jobs:
+            try:
+                job()
+            except Exception as e:
+                print(f"Failed to load {name}: {e}")
+            self.done += 1
+            
+    @property
+    def progress(self) -> float:
+        return self.done / len(self.jobs) if self.jobs else 1.0
+        
+    @property
+    def finished(self) -> bool:
+        return self.done >= len(self.jobs)
+
 @dataclass
 class SnakeSkin:
     name: str
@@ -347,10 +453,364 @@ class SnakeSkin:
     unlocked: bool = False
     price: int = 0
     special_effect: Optional[str] = None
+    
+    def atlas(self) -> "SkinAtlas":
+        # Shared by every skin that looks the same, so the menu's sample snake
+        # and the player's snake don't each build their own sprites
+        key = (self.body, self.head, self.eye, self.pupil, BLOCK_SIZE)
+        if key not in _skin_atlases:
+            _skin_atlases[key] = SkinAtlas(*key)
+        return _skin_atlases[key]
+
+def _hue_palette() -> List[Tuple[int, int, int]]:
+    palette = []
+    for hue in range(360):
+        color = pygame.Color(0, 0, 0)
+        color.hsva = (hue, 100, 100, 100)
+        palette.append(tuple(color[:3]))
+    return palette
+
+# Fully saturated color for every whole hue, so rainbow effects index a
+# table instead of converting from HSV per segment per frame
+HUE_PALETTE = _hue_palette()
+HUE_BUCKET = 4  # degrees of hue sharing one pre-tinted rainbow tile
+
+class SurfaceCache:
+    # Translucent rounded-rect overlays keyed by (size, color, alpha, radius),
+    # for the pulsing shield, button hovers and menu dimming
+    # that used to allocate a fresh SRCALPHA surface every frame. Alpha is
+    # rounded to ALPHA_STEP so a pulse cycles through a few dozen surfaces,
+    # and the least recently used ones go once max_bytes is exceeded.
+    def __init__(self, max_bytes: int = SURFACE_CACHE_BYTES, alpha_step: int = ALPHA_STEP):
+        self.max_bytes = max_bytes
+        self.alpha_step = alpha_step
+        self.surfaces: "OrderedDict[Tuple, pygame.Surface]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        
+    def rect(self, size: Tuple[int, int], color: Tuple[int, int, int], alpha: int,
+             border_radius: int = 0) -> pygame.Surface:
+        alpha = max(0, min(255, round(alpha / self.alpha_step) * self.alpha_step))
+        key = (tuple(size), tuple(color[:3]), alpha, border_radius)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        self.misses += 1
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        if border_radius:
+            pygame.draw.rect(surface, (*key[1], alpha), (0, 0, *size), border_radius=border_radius)
+        else:
+            surface.fill((*key[1], alpha))
+        cost = size[0] * size[1] * 4
+        if cost <= self.max_bytes:
+            self.surfaces[key] = surface
+            self.bytes += cost
+            while self.bytes > self.max_bytes:
+                _, evicted = self.surfaces.popitem(last=False)
+                self.bytes -= evicted.get_width() * evicted.get_height() * 4
+        return surface
+        
+    def clear(self) -> None:
+        self.surfaces.clear()
+        self.bytes = 0
+
+overlay_cache = SurfaceCache()
 
-class Snake:
-    def __init__(self, player_num: int = 1):
-        self.reset()
+class FontRegistry:
+    # Every font the game draws with, each loaded once. Named roles use the
+    # retro font when assets/fonts has it and Arial otherwise; sysfont()
+    # covers the odd fixed face. Fonts load on first use, so nothing is
+    # constructed on the frame path after the first frame that needs it.
+    # Until the asset loader has been through load() and finish() has run,
+    # roles come back as pygame's built-in font instead, so look fonts up
+    # per draw rather than holding on to them.
+    ROLES = {"title": (72, True), "large": (48, False), "medium": (36, False),
+             "small": (24, False), "tiny": (18, False)}
+    GLYPHS = string.digits + string.ascii_letters + string.punctuation + " "
+    
+    def __init__(self, path: str = FONT_PATH, fallback: str = "arial"):
+        self.path = path
+        self.fallback = fallback
+        self.retro: Optional[bool] = None
+        self.data: Optional[bytes] = None
+        self.loading = False
+        self.roles: Dict[str, pygame.font.Font] = {}
+        self.fonts: Dict[Tuple, pygame.font.Font] = {}
+        self.atlases: Dict[Tuple, Dict[str, pygame.Surface]] = {}
+        
+    def load(self) -> None:
+        # The asset loader's half. SDL_ttf isn't thread-safe, so this only
+        # does the disk work: read the retro font in, or have pygame scan
+        # the system fonts for the fallback. finish() builds the fonts.
+        self.retro = os.path.exists(self.path)
+        if not self.retro:
+            print("Custom fonts not found, using system fonts")
+            pygame.font.match_font(self.fallback)
+            return
+        with open(self.path, "rb") as f:
+            self.data = f.read()
+            
+    def finish(self) -> None:
+        # Main thread, once load() is done: builds every role and
+        # pre-rasterizes the HUD glyphs
+        try:
+            for role in self.ROLES:
+                self.roles[role] = self._load_role(role)
+            if self.retro:
+                for role in ("small", "tiny"):
+                    self.glyph_atlas(self[role], COLORS["WHITE"])
+        finally:
+            self.loading = False
+                
+    def __getitem__(self, role: str) -> pygame.font.Font:
+        font = self.roles.get(role)
+        if font is None:
+            size, bold = self.ROLES[role]
+            if self.loading:
+                return self.builtin(size, bold)
+            font = self.roles[role] = self._load_role(role)
+        return font
+        
+    def _load_role(self, role: str) -> pygame.font.Font:
+        size, bold = self.ROLES[role]
+        if self.retro is None:
+            self.retro = os.path.exists(self.path)
+            if not self.retro:
+                print("Custom fonts not found, using system fonts")
+        if not self.retro:
+            return self.sysfont(self.fallback, size, bold)
+        key = (self.path, size, False)
+        font = self.fonts.get(key)
+        if font is None:
+            source = io.BytesIO(self.data) if self.data is not None else self.path
+            try:
+                font = self.fonts[key] = pygame.font.Font(source, size)
+            except (OSError, pygame.error) as e:
+                print(f"Failed to load font {self.path}: {e}")
+                self.retro = False
+                return self.sysfont(self.fallback, size, bold)
+        return font
+        
+    def builtin(self, size: int, bold: bool = False) -> pygame.font.Font:
+        # pygame's bundled font needs no file lookup, so it is always quick
+        key = (None, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.Font(None, size)
+            font.set_bold(bold)
+        return font
+        
+    def sysfont(self, face: str, size: int, bold: bool = False) -> pygame.font.Font:
+        key = (face.lower(), size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.SysFont(face, size, bold=bold)
+        return font
+        
+    def symbol(self, char: str, size: int, color: Tuple[int, int, int]) -> pygame.Surface:
+        # Food symbols, from one bold Arial glyph at full food size (half a
+        # block) that is scaled down for the spawn animation's smaller frames
+        # rather than opening a font per frame size
+        full = BLOCK_SIZE // 2
+        glyph = self.glyph_atlas(self.sysfont(self.fallback, full, True), color)[char]
+        if size >= full:
+            return glyph
+        width, height = glyph.get_size()
+        return pygame.transform.smoothscale(glyph, (max(1, width * size // full), max(1, height * size // full)))
+        
+    def glyph_atlas(self, font: pygame.font.Font, color: Tuple[int, int, int]) -> Dict[str, pygame.Surface]:
+        # One antialiased surface per printable character, rendered together
+        key = (font, tuple(color))
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            atlas = self.atlases[key] = {char: font.render(char, True, color) for char in self.GLYPHS}
+        return atlas
+
+fonts = FontRegistry()
+
+class TextCache:
+    # Rendered text keyed by (font, text, color, antialias), least recently
+    # used first out past max_entries. Anything holding on to a string that
+    # is about to change (Button.set_text) can invalidate() it straight away.
+    # Antialiased strings with digits in them are put together from cached
+    # per-digit glyphs plus the cached text around them, so a ticking score,
+    # timer or FPS counter never goes through a full font render.
+    DIGITS = re.compile(r"(\d+)")
+    
+    def __init__(self, max_entries: int = TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.surfaces: "OrderedDict[Tuple, pygame.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+    def render(self, font: pygame.font.Font, text: str, antialias: bool,
+               color: Tuple[int, int, int]) -> pygame.Surface:
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        self.misses += 1
+        if antialias and self.DIGITS.search(text):
+            surface = self._compose(font, text, key[2])
+        else:
+            surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+        
+    def _compose(self, font: pygame.font.Font, text: str, color: Tuple[int, int, int]) -> pygame.Surface:
+        pieces = []
+        for index, run in enumerate(self.DIGITS.split(text)):
+            if not run:
+                continue
+            if index % 2:
+                glyphs = fonts.glyph_atlas(font, color)
+                pieces.extend(glyphs[digit] for digit in run)
+            else:
+                pieces.append(self.render(font, run, True, color))
+        width = sum(piece.get_width() for piece in pieces)
+        height = max(piece.get_height() for piece in pieces)
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        x = 0
+        for piece in pieces:
+            # Pieces don't overlap, so MAX copies them exactly onto the
+            # transparent surface where a normal blit would darken the edges
+            surface.blit(piece, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x += piece.get_width()
+        return surface
+        
+    def invalidate(self, font: pygame.font.Font, text: str) -> None:
+        for key in [key for key in self.surfaces if key[0] is font and key[1] == text]:
+            del self.surfaces[key]
+            
+    def clear(self) -> None:
+        self.surfaces.clear()
+
+text_cache = TextCache()
+
+class SkinAtlas:
+    # Lazily pre-rendered sprites for one skin: body tiles, heads per
+    # direction with and without the tongue and the glow halo. Rainbow skins ask for tiles by color, each built once.
+    # Head sprites carry a one pixel margin so the tongue tip isn't clipped.
+    HEAD_MARGIN = 1
+    GLOW_RADIUS = BLOCK_SIZE // 2 + 2
+    
+    def __init__(self, body, head, eye, pupil, block_size):
+        self.body_color = body
+        self.head_color = head
+        self.eye = eye
+        self.pupil = pupil
+        self.block_size = block_size
+        self.bodies: Dict[Tuple[int, int, int], pygame.Surface] = {}
+        self.heads: Dict[Tuple, pygame.Surface] = {}
+        self.glows: Dict[Tuple[int, int, int], pygame.Surface] = {}
+        self._rainbow: Optional[List[pygame.Surface]] = None
+        
+    def body(self, color: Optional[Tuple[int, int, int]] = None) -> pygame.Surface:
+        color = color or self.body_color
+        tile = self.bodies.get(color)
+        if tile is None:
+            size = self.block_size
+            tile = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.rect(tile, color, (0, 0, size, size), border_radius=4)
+            
+            # Inner highlight
+            inner_color = (min(color[0] + 30, 255), min(color[1] + 30, 255), min(color[2] + 30, 255))
+            pygame.draw.rect(tile, inner_color, (2, 2, size - 4, size - 4), border_radius=2)
+            self.bodies[color] = tile
+        return tile
+        
+    def rainbow_bodies(self) -> List[pygame.Surface]:
+        # One body tile per HUE_BUCKET degrees, index with hue // HUE_BUCKET
+        if self._rainbow is None:
+            self._rainbow = [self.body(HUE_PALETTE[hue]) for hue in range(0, 360, HUE_BUCKET)]
+        return self._rainbow
+        
+    def head(self, direction: Direction, tongue: bool, color: Optional[Tuple[int, int, int]] = None) -> pygame.Surface:
+        color = color or self.head_color
+        key = (direction, tongue, color)
+        sprite = self.heads.get(key)
+        if sprite is None:
+            sprite = self.heads[key] = self._render_head(direction, tongue, color)
+        return sprite
+        
+    def _render_head(self, direction: Direction, tongue: bool, color: Tuple[int, int, int]) -> pygame.Surface:
+        size = self.block_size
+        margin = self.HEAD_MARGIN
+        sprite = pygame.Surface((size + 2 * margin, size + 2 * margin), pygame.SRCALPHA)
+        pos = (margin, margin)
+        pygame.draw.rect(sprite, color, (pos[0], pos[1], size, size), border_radius=6)
+        
+        # Eyes
+        eye_size = size // 4
+        pupil_size = eye_size // 2
+        
+        dx, dy = direction.value
+        if dx > 0:  # Right
+            left_eye_pos = (pos[0] + size - eye_size - 4, pos[1] + 6)
+            right_eye_pos = (pos[0] + size - eye_size - 4, pos[1] + size - 6 - eye_size)
+        elif dx < 0:  # Left
+            left_eye_pos = (pos[0] + 4, pos[1] + 6)
+            right_eye_pos = (pos[0] + 4, pos[1] + size - 6 - eye_size)
+        elif dy < 0:  # Up
+            left_eye_pos = (pos[0] + 6, pos[1] + 4)
+            right_eye_pos = (pos[0] + size - 6 - eye_size, pos[1] + 4)
+        else:  # Down
+            left_eye_pos = (pos[0] + 6, pos[1] + size - eye_size - 4)
+            right_eye_pos = (pos[0] + size - 6 - eye_size, pos[1] + size - eye_size - 4)
+            
+        for eye_pos in (left_eye_pos, right_eye_pos):
+            pygame.draw.rect(sprite, self.eye, (*eye_pos, eye_size, eye_size), border_radius=eye_size//2)
+            pygame.draw.rect(sprite, self.pupil, 
+                            (eye_pos[0] + (eye_size - pupil_size)//2, 
+                             eye_pos[1] + (eye_size - pupil_size)//2, 
+                             pupil_size, pupil_size), border_radius=pupil_size//2)
+        
+        if tongue:
+            tongue_length = size // 2
+            tongue_width = size // 6
+            base_x, base_y = pos[0] + size // 2, pos[1] + size // 2
+            if dx:
+                tip_x = base_x + dx * tongue_length
+                points = [(base_x, base_y), (tip_x, base_y - tongue_width), (tip_x, base_y + tongue_width)]
+            else:
+                tip_y = base_y + dy * tongue_length
+                points = [(base_x, base_y), (base_x - tongue_width, tip_y), (base_x + tongue_width, tip_y)]
+            pygame.draw.polygon(sprite, COLORS["HOT_PINK"], points)
+        return sprite
+        
+    def glow(self, color: Tuple[int, int, int]) -> pygame.Surface:
+        sprite = self.glows.get(color)
+        if sprite is None:
+            radius = self.GLOW_RADIUS
+            sprite = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+            # gfxdraw blends translucent colors into the transparent surface,
+            # so draw opaque and scale the alpha down afterwards
+            pygame.gfxdraw.filled_circle(sprite, radius, radius, radius, color)
+            sprite.fill((255, 255, 255, 100), special_flags=pygame.BLEND_RGBA_MULT)
+            self.glows[color] = sprite
+        return sprite
+        
+
+_skin_atlases: Dict[Tuple, SkinAtlas] = {}
+
+class Snake(engine.Snake):
+    def __init__(self, player_num: int = 1, grid: Optional[engine.OccupancyGrid] = None):
+        self.moved = False
+        self.last_tail: Optional[int] = None
+        # Cosmetic only: the game hands in its "skin" stream and the shared
+        # particle pool; a snake without a pool (menu previews) emits nothing
+        self.rng = random.Random()
+        self.particles: Optional[ParticleSystem] = None
+        super().__init__(grid)
         self.player_num = player_num
         self.skin_index = 0
         self.skins = [
@@ -365,78 +825,37 @@ class Snake:
             SnakeSkin("Ice", COLORS["LIGHT_BLUE"], COLORS["DARK_TURQUOISE"], unlocked=False, price=300, special_effect="ice"),
         ]
         self.tongue_out = False
-        self.tongue_timer = 0
-        self.tail_history = deque(maxlen=20)
-        self.glow_effect = False
         self.glow_timer = 0
         self.glow_colors = [COLORS["RED"], COLORS["ORANGE"], COLORS["YELLOW"], 
                           COLORS["GREEN"], COLORS["BLUE"], COLORS["INDIGO"], COLORS["VIOLET"]]
-        self.trail_particles = []
         self.rainbow_timer = 0
         self.fire_timer = 0
         self.ice_timer = 0
         
     def reset(self) -> None:
-        self.body = [[SCREEN_WIDTH//2, SCREEN_HEIGHT//2]]
-        self.direction = Direction.RIGHT
-        self.next_direction = Direction.RIGHT
-        self.length = 1
-        self.speed = BASE_SPEED
-        self.invincible = False
-        self.shield = False
-        self.powerups = {}
-        self.score_multiplier = 1.0
-        self.combo = 0
-        self.combo_timer = 0
-        self.last_move_time = 0
-        self.growth_pending = 0
-        self.tail_history.clear()
-        self.trail_particles.clear()
-        
-    def move(self) -> None:
-        current_time = pygame.time.get_ticks()
-        if current_time - self.last_move_time < 1000 // self.speed:
-            return
-            
-        self.last_move_time = current_time
-        self.direction = self.next_direction
-        
-        # Add current head position to tail history for smooth movement
-        self.tail_history.appendleft(self.body[0].copy())
-        
-        head = self.body[0].copy()
-        dx, dy = self.direction.value
-        head[0] += dx * BLOCK_SIZE
-        head[1] += dy * BLOCK_SIZE
-            
-        self.body.insert(0, head)
-        
-        if self.growth_pending > 0:
-            self.growth_pending -= 1
-        else:
-            if len(self.body) > self.length:
-                if len(self.body) > 1:
-                    tail = self.body[-1]
-                    # Add trail particles when moving
-                    self.trail_particles.append({
-                        'pos': tail.copy(),
-                        'timer': 15,
-                        'color': self.skins[self.skin_index].body,
-                        'size': BLOCK_SIZE // 2
-                    })
-                self.body.pop()
+        super().reset()
+        self.moved = False
+        
+    def restore(self, state) -> None:
+        super().restore(state)
+        self.moved = False
+        
+    def step(self) -> Optional[int]:
+        # Remember enough of the last move to slide the body between cells
+        head = self.head
+        tail = super().step()
+        self.moved = self.head != head
+        self.last_tail = tail
+        if self.particles is None:
+            return tail
+        if tail is not None:
+            # Add a trail particle where the tail was, fading over 15 moves
+            x, y = engine.OccupancyGrid.pixel(tail)
+            self.particles.emit(x + BLOCK_SIZE // 2, y + BLOCK_SIZE // 2, [0.0], [0.0],
+                                15 * self.ticks_per_move(), BLOCK_SIZE // 2,
+                                self.skins[self.skin_index].body, emitter="trail")
                 
-        # Tongue animation
-        self.tongue_timer = (self.tongue_timer + 1) % 60
-        self.tongue_out = self.tongue_timer < 10
-        
-        # Special effects timers
-        if self.glow_effect:
-            self.glow_timer = (self.glow_timer + 1) % len(self.glow_colors)
-            
-        if self.skins[self.skin_index].special_effect == "rainbow":
-            self.rainbow_timer = (self.rainbow_timer + 1) % 360
-            
+        # Particle spawning stays tied to moves so it is part of the fixed-step simulation
         if self.skins[self.skin_index].special_effect == "fire":
             self.fire_timer = (self.fire_timer + 1) % 10
             if self.fire_timer == 0:
@@ -446,359 +865,185 @@ class Snake:
             self.ice_timer = (self.ice_timer + 1) % 15
             if self.ice_timer == 0:
                 self._add_ice_particles()
-        
-        # Update trail particles
-        for p in self.trail_particles:
-            p['timer'] -= 1
-            p['size'] = max(0, p['size'] - 0.5)
-        self.trail_particles = [p for p in self.trail_particles if p['timer'] > 0]
+        return tail
         
     def _add_fire_particles(self):
+        xs, ys, vx, vy, lifetimes, sizes, colors = [], [], [], [], [], [], []
         for segment in self.body[:5]:  # Add fire to head and first few segments
             for _ in range(2):
-                angle = random.uniform(math.pi, math.pi * 2)  # Fire goes up
-                speed = random.uniform(0.5, 1.5)
-                velocity = [math.cos(angle) * speed * 0.5, math.sin(angle) * speed]
-                lifetime = random.randint(20, 40)
-                size = random.randint(2, 4)
-                color = random.choice([
+                angle = self.rng.uniform(math.pi, math.pi * 2)  # Fire goes up
+                speed = self.rng.uniform(0.5, 1.5)
+                vx.append(math.cos(angle) * speed * 0.5)
+                vy.append(math.sin(angle) * speed)
+                lifetimes.append(self.rng.randint(20, 40))
+                sizes.append(self.rng.randint(2, 4))
+                colors.append(self.rng.choice([
                     COLORS["RED"],
                     COLORS["DARK_ORANGE"],
                     COLORS["ORANGE"],
                     COLORS["YELLOW"]
-                ])
-                self.trail_particles.append({
-                    'pos': [segment[0] + random.randint(0, BLOCK_SIZE), 
-                           segment[1] + random.randint(0, BLOCK_SIZE)],
-                    'timer': lifetime,
-                    'color': color,
-                    'size': size
-                })
+                ]))
+                xs.append(segment[0] + self.rng.randint(0, BLOCK_SIZE))
+                ys.append(segment[1] + self.rng.randint(0, BLOCK_SIZE))
+        self.particles.emit(xs, ys, vx, vy, lifetimes, sizes, colors, emitter="fire")
                 
     def _add_ice_particles(self):
+        xs, ys, vx, vy, lifetimes, sizes, colors = [], [], [], [], [], [], []
         for segment in self.body[:10]:  # Add ice particles to first 10 segments
-            if random.random() < 0.3:  # 30% chance to add a particle
-                angle = random.uniform(0, math.pi * 2)
-                speed = random.uniform(0.1, 0.3)
-                velocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-                lifetime = random.randint(30, 60)
-                size = random.randint(1, 3)
-                color = random.choice([
+            if self.rng.random() < 0.3:  # 30% chance to add a particle
+                angle = self.rng.uniform(0, math.pi * 2)
+                speed = self.rng.uniform(0.1, 0.3)
+                vx.append(math.cos(angle) * speed)
+                vy.append(math.sin(angle) * speed)
+                lifetimes.append(self.rng.randint(30, 60))
+                sizes.append(self.rng.randint(1, 3))
+                colors.append(self.rng.choice([
                     COLORS["LIGHT_BLUE"],
                     COLORS["CYAN"],
                     COLORS["POWDER_BLUE"],
                     COLORS["WHITE"]
-                ])
-                self.trail_particles.append({
-                    'pos': [segment[0] + random.randint(0, BLOCK_SIZE), 
-                           segment[1] + random.randint(0, BLOCK_SIZE)],
-                    'timer': lifetime,
-                    'color': color,
-                    'size': size
-                })
+                ]))
+                xs.append(segment[0] + self.rng.randint(0, BLOCK_SIZE))
+                ys.append(segment[1] + self.rng.randint(0, BLOCK_SIZE))
+        self.particles.emit(xs, ys, vx, vy, lifetimes, sizes, colors, emitter="ice")
     
-    def change_direction(self, new_direction: Direction) -> None:
-        if not Direction.opposite(self.direction, new_direction):
-            self.next_direction = new_direction
-            
-    def grow(self, amount: int = 1) -> None:
-        self.growth_pending += amount
-        self.length += amount
-        self.speed = min(self.speed + 0.2, MAX_SPEED)
-        
-    def shrink(self, amount: int = 1) -> None:
-        self.length = max(1, self.length - amount)
-        self.speed = max(self.speed - 1, MIN_SPEED)
-        
-    def draw(self, surface) -> None:
+    def ticks_per_move(self) -> int:
+        # Moves land on whole ticks, so the real gap is the interval rounded up
+        return math.ceil((1000 // self.speed) * TICK_RATE / 1000)
+        
+    def move_progress(self, now: float) -> float:
+        # Fraction of the way from the previous move to the next one
+        gap = self.ticks_per_move() * 1000 / TICK_RATE
+        return min(1.0, max(0.0, (now - self.last_move_time) / gap))
+        
+    def draw(self, surface, now: Optional[float] = None) -> List[pygame.Rect]:
+        # now is simulation time in ms, including the fraction of a tick the
+        # renderer is ahead by; without it the snake is drawn on its cells.
+        # Returns the rects it drew over, for the dirty-rect renderer
         skin = self.skins[self.skin_index]
-        
-        # Draw trail particles
-        for p in self.trail_particles:
-            alpha = int(255 * (p['timer'] / 15))
-            color = (*p['color'][:3], alpha) if len(p['color']) == 4 else (*p['color'], alpha)
-            pygame.gfxdraw.filled_circle(
-                surface, 
-                p['pos'][0] + BLOCK_SIZE // 2, 
-                p['pos'][1] + BLOCK_SIZE // 2, 
-                int(p['size']), 
-                color
-            )
-        
-        # Draw snake body with smooth movement interpolation
-        for index, block in enumerate(self.body):
-            if index < len(self.tail_history):
-                ratio = index / len(self.body)
-                interp_x = block[0] * ratio + self.tail_history[index][0] * (1 - ratio)
-                interp_y = block[1] * ratio + self.tail_history[index][1] * (1 - ratio)
-                draw_pos = [interp_x, interp_y]
-            else:
-                draw_pos = block
-                
-            if index == 0:
-                self._draw_head(surface, draw_pos, skin)
-            else:
-                self._draw_body_segment(surface, draw_pos, skin, index)
-                
-    def _draw_body_segment(self, surface, pos, skin, index):
-        # Special effects
+        clock = pygame.time.get_ticks() if now is None else now
+        
+        # Time based animations, at the rates they used to run per move at BASE_SPEED
+        self.tongue_out = clock % 4000 < 667
+        self.glow_timer = int(clock / 66) % len(self.glow_colors)
+        self.rainbow_timer = int(clock * BASE_SPEED / 1000) % 360
+        
+        # Each segment slides from where it was before the last move towards
+        # its cell; that is the next segment's cell, or the popped tail for
+        # the last one
+        body = list(self.body)
+        progress = self.move_progress(now) if self.moved and now is not None else 1.0
+        if progress < 1.0:
+            previous = body[1:]
+            previous.append(engine.OccupancyGrid.pixel(self.last_tail) if self.last_tail is not None else body[-1])
+            body = [(int(px + (x - px) * progress), int(py + (y - py) * progress))
+                    for (x, y), (px, py) in zip(body, previous)]
+        
+        # Everything comes from the skin's atlas and goes out as one blits batch
+        atlas = skin.atlas()
+        rainbow = skin.special_effect == "rainbow"
+        glow = None
         if skin.special_effect == "glow" or self.glow_effect:
-            glow_color = self.glow_colors[self.glow_timer]
-            pygame.gfxdraw.filled_circle(
-                surface, 
-                pos[0] + BLOCK_SIZE // 2, 
-                pos[1] + BLOCK_SIZE // 2, 
-                BLOCK_SIZE // 2 + 2, 
-                (*glow_color, 100)
-            )
-            
-        if skin.special_effect == "rainbow":
-            hue = (self.rainbow_timer + index * 10) % 360
-            rainbow_color = pygame.Color(0, 0, 0)
-            rainbow_color.hsva = (hue, 100, 100, 100)
-            body_color = rainbow_color[:3]
-        else:
-            body_color = skin.body
-            
-        # Draw main body segment
-        pygame.draw.rect(surface, body_color, (pos[0], pos[1], BLOCK_SIZE, BLOCK_SIZE), border_radius=4)
-        
-        # Draw inner highlight
-        inner_size = BLOCK_SIZE - 4
-        inner_color = (
-            min(body_color[0] + 30, 255),
-            min(body_color[1] + 30, 255),
-            min(body_color[2] + 30, 255)
-        )
-        pygame.draw.rect(
-            surface, inner_color, 
-            (pos[0] + 2, pos[1] + 2, inner_size, inner_size),
-            border_radius=2
-        )
-        
-        # Draw shield effect if active
+            glow = atlas.glow(self.glow_colors[self.glow_timer])
+            glow_offset = BLOCK_SIZE // 2 - SkinAtlas.GLOW_RADIUS
+        shield = None
         if self.shield:
-            shield_size = BLOCK_SIZE + 4
-            shield_alpha = 100 + int(155 * (math.sin(pygame.time.get_ticks() / 200) + 1) / 2)
-            shield_surface = pygame.Surface((shield_size, shield_size), pygame.SRCALPHA)
-            pygame.draw.rect(
-                shield_surface, (*COLORS["LIGHT_BLUE"], shield_alpha),
-                (0, 0, shield_size, shield_size), border_radius=6
-            )
-            surface.blit(shield_surface, (pos[0] - 2, pos[1] - 2))
-            
-    def _draw_head(self, surface, pos, skin):
-        # Special head color for rainbow effect
-        if skin.special_effect == "rainbow":
-            hue = self.rainbow_timer % 360
-            rainbow_color = pygame.Color(0, 0, 0)
-            rainbow_color.hsva = (hue, 100, 100, 100)
-            head_color = rainbow_color[:3]
-        else:
-            head_color = skin.head
-            
-        # Draw head
-        pygame.draw.rect(
-            surface, head_color, 
-            (pos[0], pos[1], BLOCK_SIZE, BLOCK_SIZE),
-            border_radius=6
-        )
-        
-        # Draw eyes
-        eye_size = BLOCK_SIZE // 4
-        pupil_size = eye_size // 2
-        
-        dx, dy = self.direction.value
-        if dx > 0:  # Right
-            left_eye_pos = (pos[0] + BLOCK_SIZE - eye_size - 4, pos[1] + 6)
-            right_eye_pos = (pos[0] + BLOCK_SIZE - eye_size - 4, pos[1] + BLOCK_SIZE - 6 - eye_size)
-        elif dx < 0:  # Left
-            left_eye_pos = (pos[0] + 4, pos[1] + 6)
-            right_eye_pos = (pos[0] + 4, pos[1] + BLOCK_SIZE - 6 - eye_size)
-        elif dy < 0:  # Up
-            left_eye_pos = (pos[0] + 6, pos[1] + 4)
-            right_eye_pos = (pos[0] + BLOCK_SIZE - 6 - eye_size, pos[1] + 4)
-        else:  # Down
-            left_eye_pos = (pos[0] + 6, pos[1] + BLOCK_SIZE - eye_size - 4)
-            right_eye_pos = (pos[0] + BLOCK_SIZE - 6 - eye_size, pos[1] + BLOCK_SIZE - eye_size - 4)
-            
-        pygame.draw.rect(surface, skin.eye, (*left_eye_pos, eye_size, eye_size), border_radius=eye_size//2)
-        pygame.draw.rect(surface, skin.eye, (*right_eye_pos, eye_size, eye_size), border_radius=eye_size//2)
-        
-        pygame.draw.rect(surface, skin.pupil, 
-                        (left_eye_pos[0] + (eye_size - pupil_size)//2, 
-                         left_eye_pos[1] + (eye_size - pupil_size)//2, 
-                         pupil_size, pupil_size), border_radius=pupil_size//2)
-        pygame.draw.rect(surface, skin.pupil, 
-                        (right_eye_pos[0] + (eye_size - pupil_size)//2, 
-                         right_eye_pos[1] + (eye_size - pupil_size)//2, 
-                         pupil_size, pupil_size), border_radius=pupil_size//2)
-        
-        # Draw tongue if out
-        if self.tongue_out:
-            tongue_length = BLOCK_SIZE // 2
-            tongue_width = BLOCK_SIZE // 6
-            tongue_base = (pos[0] + BLOCK_SIZE // 2, pos[1] + BLOCK_SIZE // 2)
-            
-            if self.direction == Direction.RIGHT:
-                points = [
-                    tongue_base,
-                    (tongue_base[0] + tongue_length, tongue_base[1] - tongue_width),
-                    (tongue_base[0] + tongue_length, tongue_base[1] + tongue_width)
-                ]
-            elif self.direction == Direction.LEFT:
-                points = [
-                    tongue_base,
-                    (tongue_base[0] - tongue_length, tongue_base[1] - tongue_width),
-                    (tongue_base[0] - tongue_length, tongue_base[1] + tongue_width)
-                ]
-            elif self.direction == Direction.UP:
-                points = [
-                    tongue_base,
-                    (tongue_base[0] - tongue_width, tongue_base[1] - tongue_length),
-                    (tongue_base[0] + tongue_width, tongue_base[1] - tongue_length)
-                ]
-            else:  # DOWN
-                points = [
-                    tongue_base,
-                    (tongue_base[0] - tongue_width, tongue_base[1] + tongue_length),
-                    (tongue_base[0] + tongue_width, tongue_base[1] + tongue_length)
-                ]
-                
-            pygame.draw.polygon(surface, COLORS["HOT_PINK"], points)
+            shield_alpha = 100 + int(155 * (math.sin(clock / 200) + 1) / 2)
+            shield = overlay_cache.rect((BLOCK_SIZE + 4, BLOCK_SIZE + 4), COLORS["LIGHT_BLUE"], shield_alpha, 6)
+        
+        x, y = body[0]
+        margin = SkinAtlas.HEAD_MARGIN
+        head_color = HUE_PALETTE[self.rainbow_timer % 360 // HUE_BUCKET * HUE_BUCKET] if rainbow else None
+        blits = [(atlas.head(self.direction, self.tongue_out, head_color), (x - margin, y - margin))]
+        tile = atlas.body()
+        rainbow_tiles = atlas.rainbow_bodies() if rainbow else None
+        for index in range(1, len(body)):
+            x, y = body[index]
+            if glow:
+                blits.append((glow, (x + glow_offset, y + glow_offset)))
+            if rainbow_tiles:
+                tile = rainbow_tiles[(self.rainbow_timer + index * 10) % 360 // HUE_BUCKET]
+            blits.append((tile, (x, y)))
+            if shield:
+                blits.append((shield, (x - 2, y - 2)))
+        return surface.blits(blits)
 
-@dataclass
-class FoodType:
-    name: str
-    color: Tuple[int, int, int]
-    value: int
-    rarity: int
-    effect: Optional[str] = None
-    expires: bool = False
-    duration: int = 0
-    special_visual: Optional[str] = None
-    sound: Optional[str] = None
-
-class FoodSystem:
-    def __init__(self, count: int = 1):
-        self.food_items: List[Dict[str, Any]] = []
-        self.types = [
-            FoodType("normal", COLORS["GREEN"], 1, 60),
-            FoodType("speed", COLORS["CYAN"], 2, 15, "speed_boost", False, 0, "symbol", "powerup"),
-            FoodType("slow", COLORS["BLUE"], 2, 10, "slow_down", False, 0, "symbol", "powerup"),
-            FoodType("invincible", COLORS["GOLD"], 3, 8, "invincible", True, 15000, "glow", "powerup"),
-            FoodType("shield", COLORS["LIGHT_BLUE"], 3, 8, "shield", True, 10000, "ring", "powerup"),
-            FoodType("glow", COLORS["PURPLE"], 3, 5, "glow", True, 20000, "pulse", "powerup"),
-            FoodType("golden", COLORS["GOLD"], 5, 5, None, False, 0, "star", "coin"),
-            FoodType("rainbow", COLORS["RED"], 10, 2, "score_multiplier", True, 10000, "rainbow", "special"),
-            FoodType("poison", COLORS["DARK_GREEN"], -1, 12, "shrink", False, 0, "skull", "negative"),
-            FoodType("combo", COLORS["ORANGE"], 0, 8, "combo_boost", False, 0, "combo", "powerup"),
-            FoodType("bomb", COLORS["DARK_RED"], -2, 5, "bomb", False, 0, "bomb", "negative"),
-        ]
+class FoodSystem(engine.FoodSystem):
+    def __init__(self, count: int = 1, rng=None, now: int = 0,
+                 grid: Optional[engine.OccupancyGrid] = None, types=None):
         self.rainbow_colors = [COLORS["RED"], COLORS["ORANGE"], COLORS["YELLOW"], 
                              COLORS["GREEN"], COLORS["BLUE"], COLORS["INDIGO"], COLORS["VIOLET"]]
-        for _ in range(count):
-            self.food_items.append(self._create_food())
-            
-    def _create_food(self) -> Dict[str, Any]:
-        total_rarity = sum(food.rarity for food in self.types)
-        r = random.uniform(0, total_rarity)
-        upto = 0
-        
-        for food_type in self.types:
-            if upto + food_type.rarity >= r:
-                food = {
-                    "type": food_type.name,
-                    "color": food_type.color,
-                    "value": food_type.value,
-                    "effect": food_type.effect,
-                    "pos": [
-                        random.randrange(BLOCK_SIZE, SCREEN_WIDTH - BLOCK_SIZE, BLOCK_SIZE),
-                        random.randrange(BLOCK_SIZE, SCREEN_HEIGHT - BLOCK_SIZE, BLOCK_SIZE)
-                    ],
-                    "spawn_time": pygame.time.get_ticks(),
-                    "spawn_animation": True,
-                    "animation_timer": 0,
-                    "expires": food_type.expires,
-                    "duration": food_type.duration,
-                    "special_visual": food_type.special_visual,
-                    "sound": food_type.sound,
-                    "rotation": 0,
-                    "pulse_timer": 0,
-                    "pulse_direction": 1
-                }
-                
-                if food_type.name == "rainbow":
-                    food["current_color_index"] = 0
-                    
-                return food
-            upto += food_type.rarity
-        return self._create_food()  # Fallback
-        
-    def respawn(self, index: int = 0) -> None:
-        if index < len(self.food_items):
-            self.food_items[index] = self._create_food()
-            
-    def update(self) -> None:
-        for food in self.food_items:
-            # Rainbow color cycling
-            if food["type"] == "rainbow":
-                food["current_color_index"] = (food.get("current_color_index", 0) + 1) % len(self.rainbow_colors)
-                food["color"] = self.rainbow_colors[food["current_color_index"]]
-                
-            # Spawn animation
-            if food["spawn_animation"]:
-                food["animation_timer"] += 1
-                if food["animation_timer"] > 30:
-                    food["spawn_animation"] = False
-                    
-            # Expiration timer
-            if food.get("expires", False):
-                if pygame.time.get_ticks() - food["spawn_time"] > food.get("duration", 10000):
-                    self.respawn(self.food_items.index(food))
-                    
-            # Rotation for special foods
-            if food.get("special_visual") in ["star", "combo", "bomb"]:
-                food["rotation"] = (food.get("rotation", 0) + 1) % 360
-                
-            # Pulse animation
-            if food.get("special_visual") == "pulse":
-                food["pulse_timer"] += food["pulse_direction"] * 0.1
-                if food["pulse_timer"] > 1 or food["pulse_timer"] < 0:
-                    food["pulse_direction"] *= -1
+        super().__init__(count, rng, now, grid, types)
+            
+    def _animate(self, food: Dict[str, Any], now: float) -> None:
+        # Animations are worked out from the food's age rather than counted
+        # per frame; "frames" keeps the rates they were tuned at (60 per second)
+        frames = max(0.0, now - food["spawn_time"]) * 60 / 1000
+        
+        # Rainbow color cycling
+        if food["type"] == "rainbow":
+            food["current_color_index"] = int(frames) % len(self.rainbow_colors)
+            food["color"] = self.rainbow_colors[food["current_color_index"]]
+            
+        # Spawn animation
+        food["spawn_animation"] = frames < 30
+        food["animation_timer"] = frames
+        
+        # Rotation for special foods
+        if food.get("special_visual") in ["star", "combo", "bomb"]:
+            food["rotation"] = frames % 360
+            
+        # Pulse animation, bouncing between 0 and 1
+        if food.get("special_visual") == "pulse":
+            phase = (frames * 0.1) % 2
+            food["pulse_timer"] = phase if phase <= 1 else 2 - phase
                     
-    def draw(self, surface) -> None:
+    def draw(self, surface, now: Optional[float] = None) -> List[pygame.Rect]:
+        # now is simulation time in ms; without it everything is fully spawned
+        pad = FoodSprites.PAD
+        rects = []
         for food in self.food_items:
+            clock = food["spawn_time"] + 1000 if now is None else now
+            self._animate(food, clock)
             size = BLOCK_SIZE
             
             if food["spawn_animation"]:
                 size = int(BLOCK_SIZE * (food["animation_timer"] / 30))
                 
             x, y = food["pos"][0] + (BLOCK_SIZE - size) // 2, food["pos"][1] + (BLOCK_SIZE - size) // 2
-            
-            # Draw different food types with special visuals
-            if food["type"] == "golden":
-                self._draw_golden_food(surface, x, y, size, food)
-            elif food["type"] == "rainbow":
-                self._draw_rainbow_food(surface, x, y, size, food)
-            elif food.get("special_visual") == "symbol":
-                self._draw_symbol_food(surface, x, y, size, food)
-            elif food.get("special_visual") == "glow":
-                self._draw_glow_food(surface, x, y, size, food)
-            elif food.get("special_visual") == "ring":
-                self._draw_ring_food(surface, x, y, size, food)
-            elif food.get("special_visual") == "pulse":
-                self._draw_pulse_food(surface, x, y, size, food)
-            elif food.get("special_visual") == "star":
-                self._draw_star_food(surface, x, y, size, food)
-            elif food.get("special_visual") == "combo":
-                self._draw_combo_food(surface, x, y, size, food)
-            elif food.get("special_visual") == "bomb":
-                self._draw_bomb_food(surface, x, y, size, food)
-            elif food.get("special_visual") == "skull":
-                self._draw_skull_food(surface, x, y, size, food)
-            else:
-                pygame.draw.rect(surface, food["color"], (x, y, size, size), border_radius=size//2)
+            rects.append(surface.blit(self._sprites(food).frame(food, size, clock), (x - pad, y - pad)))
+        return rects
+            
+    def _sprites(self, food: Dict[str, Any]) -> "FoodSprites":
+        key = (food["type"], food.get("special_visual"), BLOCK_SIZE)
+        if key not in _food_sprites:
+            _food_sprites[key] = FoodSprites(self)
+        return _food_sprites[key]
+        
+    def _draw_food(self, surface, x, y, size, food):
+        # Draw different food types with special visuals
+        if food["type"] == "golden":
+            self._draw_golden_food(surface, x, y, size, food)
+        elif food["type"] == "rainbow":
+            self._draw_rainbow_food(surface, x, y, size, food)
+        elif food.get("special_visual") == "symbol":
+            self._draw_symbol_food(surface, x, y, size, food)
+        elif food.get("special_visual") == "glow":
+            self._draw_glow_food(surface, x, y, size, food)
+        elif food.get("special_visual") == "ring":
+            self._draw_ring_food(surface, x, y, size, food)
+        elif food.get("special_visual") == "pulse":
+            self._draw_pulse_food(surface, x, y, size, food)
+        elif food.get("special_visual") == "star":
+            self._draw_star_food(surface, x, y, size, food)
+        elif food.get("special_visual") == "combo":
+            self._draw_combo_food(surface, x, y, size, food)
+        elif food.get("special_visual") == "bomb":
+            self._draw_bomb_food(surface, x, y, size, food)
+        elif food.get("special_visual") == "skull":
+            self._draw_skull_food(surface, x, y, size, food)
+        else:
+            pygame.draw.rect(surface, food["color"], (x, y, size, size), border_radius=size//2)
                 
     def _draw_golden_food(self, surface, x, y, size, food):
         pygame.draw.rect(surface, food["color"], (x, y, size, size), border_radius=size//2)
@@ -851,20 +1096,15 @@ class FoodSystem:
                 3
             )
         elif food["type"] == "combo":
-            font = pygame.font.SysFont("Arial", symbol_size, bold=True)
-            text = font.render("C", True, COLORS["WHITE"])
-            surface.blit(text, (symbol_x, symbol_y))
+            surface.blit(fonts.symbol("C", symbol_size, COLORS["WHITE"]), (symbol_x, symbol_y))
             
     def _draw_glow_food(self, surface, x, y, size, food):
         glow_size = int(size * 1.5)
         glow_x, glow_y = x - (glow_size - size)//2, y - (glow_size - size)//2
-        glow_alpha = 100 + int(155 * (math.sin(pygame.time.get_ticks() / 200) + 1) / 2)
-        glow_surface = pygame.Surface((glow_size, glow_size), pygame.SRCALPHA)
         pygame.draw.rect(
-            glow_surface, (*food["color"], glow_alpha),
-            (0, 0, glow_size, glow_size), border_radius=glow_size//2
+            surface, (*food["color"], food["glow_alpha"]),
+            (glow_x, glow_y, glow_size, glow_size), border_radius=glow_size//2
         )
-        surface.blit(glow_surface, (glow_x, glow_y))
         pygame.draw.rect(surface, food["color"], (x, y, size, size), border_radius=size//2)
         
     def _draw_ring_food(self, surface, x, y, size, food):
@@ -906,9 +1146,8 @@ class FoodSystem:
         center_x, center_y = x + size//2, y + size//2
         
         # Draw combo symbol (C with +)
-        font = pygame.font.SysFont("Arial", size//2, bold=True)
-        text_c = font.render("C", True, COLORS["WHITE"])
-        text_plus = font.render("+", True, COLORS["WHITE"])
+        text_c = fonts.symbol("C", size//2, COLORS["WHITE"])
+        text_plus = fonts.symbol("+", size//2, COLORS["WHITE"])
         
         surface.blit(text_c, (center_x - size//3, center_y - size//4))
         surface.blit(text_plus, (center_x, center_y - size//4))
@@ -946,65 +1185,107 @@ class FoodSystem:
             2
         )
 
-class Obstacle:
-    def __init__(self):
-        self.blocks = []
-        self.moving = False
-        self.direction = Direction.RIGHT
-        self.move_timer = 0
-        self.move_delay = 500  # ms
-        self.generate()
-        
-    def generate(self, count=10):
-        self.blocks = []
-        for _ in range(count):
-            x = random.randrange(0, SCREEN_WIDTH, BLOCK_SIZE)
-            y = random.randrange(0, SCREEN_HEIGHT, BLOCK_SIZE)
-            # Make sure obstacle doesn't spawn on snake or food
-            if (x != SCREEN_WIDTH//2 and y != SCREEN_HEIGHT//2 and 
-                abs(x - SCREEN_WIDTH//2) > BLOCK_SIZE*3 and 
-                abs(y - SCREEN_HEIGHT//2) > BLOCK_SIZE*3):
-                self.blocks.append([x, y])
-                
-    def move(self):
-        if not self.moving:
-            return
-            
-        current_time = pygame.time.get_ticks()
-        if current_time - self.move_timer < self.move_delay:
-            return
-            
-        self.move_timer = current_time
-        
-        dx, dy = self.direction.value
-        for block in self.blocks:
-            block[0] += dx * BLOCK_SIZE
-            block[1] += dy * BLOCK_SIZE
-            
-            # Wrap around screen edges
-            if block[0] >= SCREEN_WIDTH:
-                block[0] = 0
-            elif block[0] < 0:
-                block[0] = SCREEN_WIDTH - BLOCK_SIZE
-                
-            if block[1] >= SCREEN_HEIGHT:
-                block[1] = 0
-            elif block[1] < 0:
-                block[1] = SCREEN_HEIGHT - BLOCK_SIZE
-                
-        # Randomly change direction occasionally
-        if random.random() < 0.05:
-            self.direction = random.choice(list(Direction))
-            
-    def draw(self, surface):
+class FoodSprites:
+    # Pre-rendered frames for one food type, drawn once by the FoodSystem's
+    # _draw_* routines onto a transparent canvas and then just blitted.
+    # Frames are keyed by the spawn-in size plus whichever animation the
+    # visual has: the golden star's rotation (it repeats every 72 degrees),
+    # the rainbow color, the glow's alpha or the pulse phase. The canvas
+    # has PAD pixels around the food so the glow halo fits.
+    PAD = BLOCK_SIZE // 4
+    ROTATION_STEPS = 24  # per 72 degrees
+    PULSE_STEPS = 10
+    
+    def __init__(self, food_system: "FoodSystem"):
+        self.food_system = food_system
+        self.frames: Dict[Tuple, pygame.Surface] = {}
+        
+    def phase(self, food: Dict[str, Any], now: float):
+        if food["type"] == "golden":
+            return int(food.get("rotation", 0) * self.ROTATION_STEPS / 72) % self.ROTATION_STEPS
+        if food["type"] == "rainbow":
+            return food.get("current_color_index", 0)
+        visual = food.get("special_visual")
+        if visual == "glow":
+            return round((100 + 155 * (math.sin(now / 200) + 1) / 2) / ALPHA_STEP)
+        if visual == "pulse":
+            return round(food["pulse_timer"] * self.PULSE_STEPS)
+        return 0
+        
+    def frame(self, food: Dict[str, Any], size: int, now: float) -> pygame.Surface:
+        key = (size, self.phase(food, now))
+        sprite = self.frames.get(key)
+        if sprite is None:
+            sprite = self.frames[key] = self._render(food, size, key[1])
+        return sprite
+        
+    def _render(self, food: Dict[str, Any], size: int, phase: int) -> pygame.Surface:
+        # Draw from a copy holding the quantized animation state, so every
+        # food that lands on this frame looks the same
+        food = dict(food, rotation=phase * 72 / self.ROTATION_STEPS,
+                    glow_alpha=min(255, phase * ALPHA_STEP), pulse_timer=phase / self.PULSE_STEPS)
+        sprite = pygame.Surface((size + 2 * self.PAD, size + 2 * self.PAD), pygame.SRCALPHA)
+        self.food_system._draw_food(sprite, self.PAD, self.PAD, size, food)
+        return sprite
+
+_food_sprites: Dict[Tuple, FoodSprites] = {}
+
+class Obstacle(engine.Obstacle):
+    def draw(self, surface) -> List[pygame.Rect]:
+        rects = []
         for block in self.blocks:
-            pygame.draw.rect(surface, COLORS["GRAY"], (block[0], block[1], BLOCK_SIZE, BLOCK_SIZE))
+            rects.append(pygame.draw.rect(surface, COLORS["GRAY"], (block[0], block[1], BLOCK_SIZE, BLOCK_SIZE)))
             pygame.draw.rect(surface, COLORS["DARK_GRAY"], (block[0]+2, block[1]+2, BLOCK_SIZE-4, BLOCK_SIZE-4))
+        return rects
+
+class BackgroundLayer:
+    # The play field's static layer: background color, grid lines and the
+    # obstacles when they don't move (EASY). Kept on one display-format
+    # surface that is only redrawn when one of those changes and otherwise
+    # costs a single blit per frame.
+    def __init__(self):
+        self.surface: Optional[pygame.Surface] = None
+        self.key: Optional[Tuple] = None
+        self.rebuilds = 0
+        
+    def draw(self, screen: pygame.Surface, color: Tuple[int, int, int], grid: bool,
+             obstacle: Optional[Obstacle] = None) -> None:
+        if not grid and obstacle is None:
+            # Nothing to keep, a fill is cheaper than the blit
+            screen.fill(color)
+            return
+        self.update(screen, color, grid, obstacle)
+        screen.blit(self.surface, (0, 0))
+        
+    def update(self, screen: pygame.Surface, color: Tuple[int, int, int], grid: bool,
+               obstacle: Optional[Obstacle] = None) -> bool:
+        # Brings the layer up to date, returning whether it had to be redrawn
+        key = (color, grid, obstacle, obstacle.revision if obstacle else None)
+        if self.surface is None or self.surface.get_size() != screen.get_size():
+            self.surface = pygame.Surface(screen.get_size(), 0, screen)
+            self.key = None
+        if key == self.key:
+            return False
+        self._build(color, grid, obstacle)
+        self.key = key
+        return True
+        
+    def _build(self, color: Tuple[int, int, int], grid: bool, obstacle: Optional[Obstacle]) -> None:
+        self.rebuilds += 1
+        self.surface.fill(color)
+        if grid:
+            for x in range(0, SCREEN_WIDTH, BLOCK_SIZE):
+                pygame.draw.line(self.surface, (*COLORS["GRAY"], 30), (x, 0), (x, SCREEN_HEIGHT))
+            for y in range(0, SCREEN_HEIGHT, BLOCK_SIZE):
+                pygame.draw.line(self.surface, (*COLORS["GRAY"], 30), (0, y), (SCREEN_WIDTH, y))
+        if obstacle is not None:
+            obstacle.draw(self.surface)
 
 class Button:
     def __init__(self, x: int, y: int, width: int, height: int, text: str, 
                  color: Tuple[int, int, int], hover_color: Tuple[int, int, int], 
-                 text_color: Tuple[int, int, int] = COLORS["WHITE"], font=None,
+                 text_color: Tuple[int, int, int] = COLORS["WHITE"],
+                 font: Union[str, pygame.font.Font] = "medium",
                  border_radius: int = 10, outline: bool = True, 
                  outline_color: Tuple[int, int, int] = COLORS["WHITE"],
                  outline_hover_color: Tuple[int, int, int] = COLORS["YELLOW"],
@@ -1014,7 +1295,7 @@ class Button:
         self.color = color
         self.hover_color = hover_color
         self.text_color = text_color
-        self.font = font or font_medium
+        self.font = font  # a FontRegistry role or a font
         self.is_hovered = False
         self.clicked = False
         self.border_radius = border_radius
@@ -1022,8 +1303,7 @@ class Button:
         self.outline_color = outline_color
         self.outline_hover_color = outline_hover_color
         self.sound = sound
-        self.pulse_timer = 0
-        self.pulse_speed = 0.05
+        self.pulse_speed = 0.003  # radians per ms
         
     def draw(self, surface) -> None:
         color = self.hover_color if self.is_hovered else self.color
@@ -1031,14 +1311,8 @@ class Button:
         
         # Draw pulsing effect if hovered
         if self.is_hovered:
-            self.pulse_timer += self.pulse_speed
-            pulse_alpha = int(100 * (math.sin(self.pulse_timer) + 1) / 2)
-            pulse_surface = pygame.Surface((self.rect.width, self.rect.height), pygame.SRCALPHA)
-            pygame.draw.rect(
-                pulse_surface, (*outline_color[:3], pulse_alpha),
-                (0, 0, self.rect.width, self.rect.height),
-                border_radius=self.border_radius
-            )
+            pulse_alpha = int(100 * (math.sin(pygame.time.get_ticks() * self.pulse_speed) + 1) / 2)
+            pulse_surface = overlay_cache.rect(self.rect.size, outline_color, pulse_alpha, self.border_radius)
             surface.blit(pulse_surface, (self.rect.x, self.rect.y))
         
         pygame.draw.rect(surface, color, self.rect, border_radius=self.border_radius)
@@ -1049,7 +1323,7 @@ class Button:
                 2, border_radius=self.border_radius
             )
         
-        text_surface = self.font.render(self.text, True, self.text_color)
+        text_surface = text_cache.render(self._font(), self.text, True, self.text_color)
         text_rect = text_surface.get_rect(center=self.rect.center)
         surface.blit(text_surface, text_rect)
         
@@ -1058,13 +1332,18 @@ class Button:
         clicked = self.is_hovered and mouse_click
         
         if clicked and not self.clicked and self.sound:
-            pygame.mixer.Sound(f"assets/sounds/{self.sound}.wav").play()
+            sound_system.play_sound(self.sound)
             
         self.clicked = clicked
         return self.clicked
         
     def set_text(self, new_text: str) -> None:
+        if new_text != self.text:
+            text_cache.invalidate(self._font(), self.text)
         self.text = new_text
+        
+    def _font(self) -> pygame.font.Font:
+        return fonts[self.font] if isinstance(self.font, str) else self.font
 
 class Slider:
     def __init__(self, x: int, y: int, width: int, height: int, 
@@ -1148,7 +1427,11 @@ class Slider:
         return False
 
 class Game:
-    def __init__(self):
+    def __init__(self, profile: bool = False, trace_path: Optional[str] = None):
+        self.trace_path = trace_path
+        profiler.enabled = profile or trace_path is not None
+        self.profiler_rows: List[Tuple[str, float, float, float]] = []
+        self.profiler_colors: Dict[str, Tuple[int, int, int]] = {}
         self._initialize_pygame()
         self._load_assets()
         self._setup_game_objects()
@@ -1156,67 +1439,59 @@ class Game:
         self._load_save_data()
         
     def _initialize_pygame(self):
-        pygame.init()
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+        # Only what the first frame needs; pygame.init() would also open the
+        # audio device, which the asset loader does in the background
+        pygame.display.init()
+        pygame.font.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.DOUBLEBUF | pygame.HWSURFACE)
         pygame.display.set_caption("Ultimate Snake Game 2024")
         self.clock = pygame.time.Clock()
         self.running = True
         self.fps = FPS
+        self.render_alpha = 0.0
         
     def _load_assets(self):
-        self._load_fonts()
-        self._load_sounds()
+        # Fonts first so the menu switches over to them early, then audio.
+        # The first frames draw with stand-ins and play no sound meanwhile.
+        self.sound_system = sound_system
+        self.assets = AssetLoader()
+        fonts.loading = True
+        self.assets.add("fonts", fonts.load)
+        self.assets.add("mixer", self.sound_system.init_mixer)
+        for name in ("click", "eat", "crash", "powerup", "negative", "coin", "special"):
+            self.assets.add(f"sound {name}", partial(self.sound_system.load_sound, name, f"assets/sounds/{name}.wav"))
+        for name in ("menu", "background", "gameplay"):
+            self.assets.add(f"music {name}", partial(self.sound_system.load_music, name, f"assets/music/{name}.mp3"))
+        self.assets.start()
+        self.assets_loaded = False
+        
+    def _poll_assets(self):
+        if not self.assets_loaded and self.assets.finished:
+            self.assets_loaded = True
+            fonts.finish()
+            self.sound_system.resume_music()
+            
+    def _reset_particles(self):
+        # Fresh particle pool for whichever simulation is on screen, shared
+        # by the game's effects and the snake's trail and skin emitters
+        self.particle_system = ParticleSystem(self.sim.rngs["particles"], lod=self.particle_lod)
+        self.snake.rng = self.sim.rngs["skin"]
+        self.snake.particles = self.particle_system
         
-    def _load_fonts(self):
-        global title_font, font_large, font_medium, font_small, font_tiny
-        try:
-            title_font = pygame.font.Font("assets/fonts/RetroGaming.ttf", 72)
-            font_large = pygame.font.Font("assets/fonts/RetroGaming.ttf", 48)
-            font_medium = pygame.font.Font("assets/fonts/RetroGaming.ttf", 36)
-            font_small = pygame.font.Font("assets/fonts/RetroGaming.ttf", 24)
-            font_tiny = pygame.font.Font("assets/fonts/RetroGaming.ttf", 18)
-        except:
-            print("Custom fonts not found, using system fonts")
-            title_font = pygame.font.SysFont("arial", 72, bold=True)
-            font_large = pygame.font.SysFont("arial", 48)
-            font_medium = pygame.font.SysFont("arial", 36)
-            font_small = pygame.font.SysFont("arial", 24)
-            font_tiny = pygame.font.SysFont("arial", 18)
-            
-    def _load_sounds(self):
-        self.sound_system = SoundSystem()
-        try:
-            # Basic sounds
-            self.sound_system.load_sound("click", "assets/sounds/click.wav")
-            self.sound_system.load_sound("eat", "assets/sounds/eat.wav")
-            self.sound_system.load_sound("crash", "assets/sounds/crash.wav")
-            self.sound_system.load_sound("powerup", "assets/sounds/powerup.wav")
-            self.sound_system.load_sound("negative", "assets/sounds/negative.wav")
-            self.sound_system.load_sound("coin", "assets/sounds/coin.wav")
-            self.sound_system.load_sound("special", "assets/sounds/special.wav")
-            
-            # Music tracks
-            self.sound_system.load_music("menu", "assets/music/menu.mp3")
-            self.sound_system.load_music("background", "assets/music/background.mp3")
-            self.sound_system.load_music("gameplay", "assets/music/gameplay.mp3")
-        except Exception as e:
-            print(f"Sound files not found, continuing without sound: {e}")
-            
     def _setup_game_objects(self):
-        self.snake = Snake()
-        self.food = FoodSystem(count=3)  # Multiple food items
-        self.obstacle = Obstacle()
-        self.particle_system = ParticleSystem()
+        self.sim = engine.Simulation(snake_factory=Snake, food_factory=FoodSystem,
+                                     obstacle_factory=Obstacle)
+        self.particle_lod = ParticleLOD()
+        self._reset_particles()
+        self.recorder: Optional[ReplayRecorder] = None
+        self.last_replay_path: Optional[str] = None
+        self.replay_player: Optional[ReplayPlayer] = None
+        self.replay_paused = False
+        self.replay_fast_forward = False
         self.state = GameState.MENU
         self.game_mode = GameMode.CLASSIC
-        self.score = 0
         self.high_score = 0
-        self.level = 1
-        self.lives = 3
         self.coins = 0  # Currency for shop
-        self.combo = 0
-        self.combo_timer = 0
         self.difficulty = "NORMAL"
         self.backgrounds = [
             COLORS["BLACK"], 
@@ -1228,6 +1503,8 @@ class Game:
         ]
         self.current_bg = 0
         self.grid_visible = False
+        self.background = BackgroundLayer()
+        self.dirty_rects: Optional[List[pygame.Rect]] = None
         self.settings = {
             "sound_volume": 0.7,
             "music_volume": 0.5,
@@ -1236,21 +1513,58 @@ class Game:
             "difficulty": "NORMAL",
             "background": 0,
             "controls": "arrows",  # or "wasd"
+            "frame_rate": FPS,
+            "dirty_rects": False,  # repaint only changed areas, for slow software renderers
         }
-        self.time_attack_time = 180  # 3 minutes in seconds
-        self.campaign_levels = [
-            {"obstacles": 5, "food": 2, "time": 120, "target": 20},
-            {"obstacles": 10, "food": 3, "time": 150, "target": 30},
-            {"obstacles": 15, "food": 4, "time": 180, "target": 50},
-            # Add more levels as needed
-        ]
         self.current_campaign_level = 0
-        self.level_start_time = 0
+        
+    # Gameplay state lives in the simulation; the game only renders it
+    @property
+    def snake(self) -> Snake:
+        return self.sim.snake
+        
+    @property
+    def food(self) -> FoodSystem:
+        return self.sim.food
+        
+    @property
+    def obstacle(self) -> Obstacle:
+        return self.sim.obstacle
+        
+    @property
+    def score(self) -> int:
+        return self.sim.score
+        
+    @property
+    def lives(self) -> int:
+        return self.sim.lives
+        
+    @property
+    def combo(self) -> int:
+        return self.sim.combo
+        
+    @property
+    def campaign_levels(self) -> List[Dict[str, int]]:
+        return self.sim.campaign_levels
+        
+    @property
+    def current_campaign_level(self) -> int:
+        return self.sim.current_campaign_level
+        
+    @current_campaign_level.setter
+    def current_campaign_level(self, value: int) -> None:
+        self.sim.current_campaign_level = value
         
     def _setup_ui(self):
         button_width, button_height = 300, 60
         center_x = SCREEN_WIDTH // 2 - button_width // 2
         
+        # Built once: every Snake brings its own occupancy grid and free-cell index
+        self.menu_snake = Snake()
+        self.menu_snake.body = [[(GRID_WIDTH//2 - i) * BLOCK_SIZE, 7 * BLOCK_SIZE] for i in range(5)]
+        self.menu_snake.direction = Direction.RIGHT
+        self.menu_snake.next_direction = Direction.RIGHT
+        
         self.menu_buttons = [
             Button(center_x, 250, button_width, button_height, "Start Game", 
                   COLORS["PURPLE"], COLORS["DEEP_PURPLE"], sound="click"),
@@ -1291,7 +1605,10 @@ class Game:
             Button(center_x, 490, button_width, button_height, 
                   f"Background: {self.current_bg + 1}/{len(self.backgrounds)}", 
                   COLORS["BLUE"], COLORS["DARK_BLUE"], sound="click"),
-            Button(center_x, 570, button_width, button_height, "Back", 
+            Button(center_x, 570, button_width, button_height, 
+                  f"Frame Rate: {self.fps}", 
+                  COLORS["PURPLE"], COLORS["DEEP_PURPLE"], sound="click"),
+            Button(center_x, 650, button_width, button_height, "Back", 
                   COLORS["GRAY"], COLORS["DARK_GRAY"], sound="click"),
         ]
         
@@ -1328,14 +1645,14 @@ class Game:
                     Button(150 + (i % 3) * 350, 200 + (i // 3) * 150, 300, 100,
                           f"{skin.name} - {skin.price} coins",
                           COLORS["GRAY"], COLORS["PURPLE"],
-                          COLORS["WHITE"], font_medium)
+                          COLORS["WHITE"], "medium")
                 )
             else:
                 self.skin_buttons.append(
                     Button(150 + (i % 3) * 350, 200 + (i // 3) * 150, 300, 100,
                           f"{skin.name} (OWNED)",
                           COLORS["DARK_GREEN"], COLORS["GREEN"],
-                          COLORS["WHITE"], font_medium)
+                          COLORS["WHITE"], "medium")
                 )
         
     def _load_save_data(self):
@@ -1366,6 +1683,8 @@ class Game:
                 self.current_bg = self.settings.get("background", 0)
                 self.difficulty = self.settings.get("difficulty", "NORMAL")
                 self.snake.skin_index = self.settings.get("snake_skin", 0)
+                self.fps = self.settings.get("frame_rate", FPS)
+                self.settings_buttons[2].set_text(f"Frame Rate: {self.fps}")
                 
                 # Update sound volumes
                 self.sound_system.set_sound_volume(self.settings["sound_volume"])
@@ -1378,6 +1697,7 @@ class Game:
         self.settings["background"] = self.current_bg
         self.settings["snake_skin"] = self.snake.skin_index
         self.settings["difficulty"] = self.difficulty
+        self.settings["frame_rate"] = self.fps
         self.settings["sound_volume"] = self.sound_system.sound_volume
         self.settings["music_volume"] = self.sound_system.music_volume
         
@@ -1408,43 +1728,115 @@ class Game:
             json.dump(player_data, f)
             
     def reset(self):
-        self.snake.reset()
-        self.food = FoodSystem(count=3 if self.game_mode in [GameMode.SURVIVAL, GameMode.CAMPAIGN] else 1)
-        self.obstacle.generate()
-        self.score = 0
-        self.level = 1
-        self.lives = 3
-        self.combo = 0
-        self.combo_timer = 0
-        self.time_attack_time = 180  # Reset timer for time attack
-        
-        if self.game_mode == GameMode.CAMPAIGN:
-            level_data = self.campaign_levels[self.current_campaign_level]
-            self.obstacle.generate(level_data["obstacles"])
-            self.food = FoodSystem(count=level_data["food"])
-            self.time_attack_time = level_data["time"]
-            self.level_start_time = pygame.time.get_ticks()
-        
-        if self.difficulty == "EASY":
-            self.snake.speed = BASE_SPEED - 5
-            self.obstacle.moving = False
-        elif self.difficulty == "NORMAL":
-            self.snake.speed = BASE_SPEED
-            self.obstacle.moving = True
-        elif self.difficulty == "HARD":
-            self.snake.speed = BASE_SPEED + 5
-            self.obstacle.moving = True
-            self.obstacle.generate(15)  # More obstacles
+        self._save_replay()
+        self.sim.mode = self.game_mode
+        self.sim.difficulty = self.difficulty
+        self.sim.reset(seed=random.randrange(1 << 32), campaign_level=self.current_campaign_level)
+        self._reset_particles()
+        self.recorder = ReplayRecorder(self.sim.seed, self.sim.mode, self.sim.difficulty,
+                                       self.sim.current_campaign_level)
+        
+    def _steer(self, direction: Direction) -> None:
+        if self.recorder:
+            self.recorder.record(self.sim.tick_count, direction)
+        self.sim.change_direction(direction)
+        
+    def _save_replay(self):
+        if not self.recorder:
+            return
+        recorder, self.recorder = self.recorder, None
+        try:
+            os.makedirs(REPLAY_DIR, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.sim.seed:08x}.snkr"
+            path = os.path.join(REPLAY_DIR, name)
+            recorder.save(path, self.sim.tick_count)
+            self.last_replay_path = path
+        except OSError as e:
+            print(f"Could not save replay: {e}")
+            
+    def _save_trace(self, path: Optional[str] = None):
+        try:
+            if path is None:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                path = os.path.join(PROFILE_DIR, f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json")
+            profiler.dump_trace(path)
+            print(f"Saved trace to {path}")
+        except OSError as e:
+            print(f"Could not save trace: {e}")
+            
+    def _latest_replay(self) -> Optional[str]:
+        # The game saved this session, else the newest file on disk. Names
+        # only have one-second resolution, so games saved in the same
+        # second would sort by seed rather than by when they were saved
+        if self.last_replay_path and os.path.exists(self.last_replay_path):
+            return self.last_replay_path
+        try:
+            paths = [os.path.join(REPLAY_DIR, name) for name in os.listdir(REPLAY_DIR) if name.endswith(".snkr")]
+            return max(paths, key=os.path.getmtime) if paths else None
+        except OSError:
+            return None
+        
+    def _open_replay(self, path: Optional[str] = None):
+        # Save the game in progress first so it can be the one that gets watched
+        self._save_replay()
+        path = path or self._latest_replay()
+        if not path:
+            return
+        try:
+            replay = Replay.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load replay {path}: {e}")
+            return
+        self.replay_player = ReplayPlayer(replay, snake_factory=Snake, food_factory=FoodSystem,
+                                          obstacle_factory=Obstacle)
+        # The live simulation is parked while the HUD and drawing code read the replay's
+        self.live_sim = self.sim
+        self.sim = self.replay_player.sim
+        self.snake.skin_index = self.live_sim.snake.skin_index
+        self._reset_particles()
+        self.replay_paused = False
+        self.replay_fast_forward = False
+        self.state = GameState.REPLAY
+        
+    def _close_replay(self):
+        self.sim = self.live_sim
+        self.replay_player = None
+        self._reset_particles()
+        self.state = GameState.MENU
+        self.sound_system.play_music("menu")
+        
+    def _seek_replay(self, tick: int):
+        self.replay_player.seek(tick)
+        self._reset_particles()
             
     def run(self):
         self.sound_system.play_music("menu", fade_ms=1000)
         
+        # Fixed timestep: the simulation advances in whole ticks of
+        # 1000 / TICK_RATE ms however long frames take, and the leftover
+        # fraction of a tick is handed to the renderer to interpolate with.
+        # A frame rate above TICK_RATE draws some ticks twice; below it,
+        # several ticks run per frame.
+        tick_ms = 1000 / TICK_RATE
+        accumulator = 0.0
         while self.running:
-            self._handle_events()
-            self._update()
-            self._draw()
-            self.clock.tick(self.fps)
-            
+            profiler.frame()
+            self._poll_assets()
+            with profiler.section("events"):
+                self._handle_events()
+            with profiler.section("wait"):
+                elapsed = self.clock.tick(self.fps)
+            accumulator = min(accumulator + elapsed, MAX_FRAME_TIME)
+            while accumulator >= tick_ms:
+                with profiler.section("update"):
+                    self._update()
+                accumulator -= tick_ms
+            self.render_alpha = accumulator / tick_ms
+            with profiler.section("draw"):
+                self._draw()
+            
+        if self.trace_path:
+            self._save_trace(self.trace_path)
         pygame.quit()
         sys.exit()
         
@@ -1454,6 +1846,7 @@ class Game:
         
         for event in pygame.event.get():
             if event.type == QUIT:
+                self._save_replay()
                 self._save_highscore()
                 self._save_settings()
                 self._save_player_data()
@@ -1471,18 +1864,25 @@ class Game:
         self._handle_button_clicks(mouse_pos, mouse_click)
         
     def _handle_key_event(self, event):
+        if event.key == K_F3:
+            profiler.toggle()
+            return
+        if event.key == K_F4 and profiler.enabled:
+            self._save_trace()
+            return
+            
         if self.state == GameState.PLAYING:
             if event.key == K_ESCAPE or event.key == K_p:
                 self.state = GameState.PAUSED
                 self.sound_system.play_sound("click")
             elif event.key == K_RIGHT or event.key == K_d:
-                self.snake.change_direction(Direction.RIGHT)
+                self._steer(Direction.RIGHT)
             elif event.key == K_LEFT or event.key == K_a:
-                self.snake.change_direction(Direction.LEFT)
+                self._steer(Direction.LEFT)
             elif event.key == K_UP or event.key == K_w:
-                self.snake.change_direction(Direction.UP)
+                self._steer(Direction.UP)
             elif event.key == K_DOWN or event.key == K_s:
-                self.snake.change_direction(Direction.DOWN)
+                self._steer(Direction.DOWN)
             elif event.key == K_g:
                 self.grid_visible = not self.grid_visible
             elif event.key == K_b:
@@ -1498,11 +1898,33 @@ class Game:
                 self.reset()
                 self.sound_system.play_music("gameplay")
                 self.sound_system.play_sound("click")
+            elif event.key == K_r:
+                self._open_replay()
         elif self.state == GameState.GAME_OVER:
             if event.key == K_RETURN:
                 self.state = GameState.PLAYING
                 self.reset()
                 self.sound_system.play_music("gameplay")
+            elif event.key == K_r:
+                self._open_replay()
+        elif self.state == GameState.REPLAY:
+            player = self.replay_player
+            if event.key == K_ESCAPE:
+                self._close_replay()
+            elif event.key == K_SPACE:
+                self.replay_paused = not self.replay_paused
+            elif event.key == K_f:
+                self.replay_fast_forward = not self.replay_fast_forward
+            elif event.key == K_LEFT:
+                self._seek_replay(player.tick - 5 * TICK_RATE)
+            elif event.key == K_RIGHT:
+                self._seek_replay(player.tick + 5 * TICK_RATE)
+            elif event.key == K_HOME:
+                self._seek_replay(0)
+            elif event.key == K_END:
+                self._seek_replay(player.length)
+            elif K_0 <= event.key <= K_9:
+                self._seek_replay(player.length * (event.key - K_0) // 10)
                 
     def _handle_button_clicks(self, mouse_pos, mouse_click):
         if self.state == GameState.MENU:
@@ -1563,7 +1985,12 @@ class Game:
                 self.current_bg = (self.current_bg + 1) % len(self.backgrounds)
                 self.settings["background"] = self.current_bg
                 self.settings_buttons[1].set_text(f"Background: {self.current_bg + 1}/{len(self.backgrounds)}")
-            elif self.settings_buttons[2].update(mouse_pos, mouse_click):  # Back
+            elif self.settings_buttons[2].update(mouse_pos, mouse_click):  # Frame rate
+                # Only the display rate changes; the simulation always runs at TICK_RATE
+                faster = [rate for rate in FRAME_RATES if rate > self.fps]
+                self.fps = faster[0] if faster else FRAME_RATES[0]
+                self.settings_buttons[2].set_text(f"Frame Rate: {self.fps}")
+            elif self.settings_buttons[3].update(mouse_pos, mouse_click):  # Back
                 self.state = GameState.MENU
                 self._save_settings()
                 
@@ -1588,6 +2015,13 @@ class Game:
                 self.state = GameState.MENU
                 self.sound_system.play_music("menu")
                 
+        elif self.state == GameState.REPLAY:
+            # Click or drag on the progress bar to scrub
+            bar = self._replay_bar_rect()
+            if mouse_click and bar.inflate(0, 16).collidepoint(mouse_pos):
+                fraction = (mouse_pos[0] - bar.x) / bar.width
+                self._seek_replay(int(self.replay_player.length * fraction))
+                
         elif self.state == GameState.SHOP:
             if self.shop_buttons[0].update(mouse_pos, mouse_click):  # Back
                 self.state = GameState.MENU
@@ -1616,167 +2050,102 @@ class Game:
     def _update(self):
         if self.state == GameState.PLAYING:
             self._update_game()
+        elif self.state == GameState.REPLAY:
+            self._update_replay()
             
     def _update_game(self):
-        self.snake.move()
-        self.food.update()
-        self.obstacle.move()
-        self.particle_system.update()
-        self._update_combo()
-        
-        if self._check_collision():
-            self._handle_collision()
-            
-        self._check_food_collision()
-        
-        # Update time attack timer
-        if self.game_mode == GameMode.TIME_ATTACK or self.game_mode == GameMode.CAMPAIGN:
-            elapsed = (pygame.time.get_ticks() - self.level_start_time) // 1000
-            remaining = max(0, self.time_attack_time - elapsed)
-            
-            if remaining <= 0:
-                self.state = GameState.GAME_OVER
-                if self.game_mode == GameMode.CAMPAIGN and self.score >= self.campaign_levels[self.current_campaign_level]["target"]:
-                    self.current_campaign_level += 1
-                    if self.current_campaign_level >= len(self.campaign_levels):
-                        self.state = GameState.LEVEL_COMPLETE
-                    else:
-                        self.reset()
-                
-    def _update_combo(self):
-        if self.combo > 0:
-            self.combo_timer += 1
-            if self.combo_timer > 180:  # 3 seconds at 60 FPS
-                self.combo = 0
-                self.combo_timer = 0
-                
-    def _check_collision(self) -> bool:
-        head = self.snake.body[0]
-        
-        # Check wall collision
-        if (head[0] < 0 or head[0] >= SCREEN_WIDTH or 
-            head[1] < 0 or head[1] >= SCREEN_HEIGHT):
-            return True
-            
-        # Check self collision
-        for block in self.snake.body[1:]:
-            if head[0] == block[0] and head[1] == block[1]:
-                return True
+        for event in self.sim.step():
+            self._handle_sim_event(event)
+        with profiler.section("update.particles"):
+            self.particle_system.update()
+        
+    def _update_replay(self):
+        player = self.replay_player
+        if not self.replay_paused and not player.finished:
+            if self.replay_fast_forward:
+                # Skip the in-between ticks entirely, only the last one is drawn
+                player.fast_forward(REPLAY_FAST_FORWARD - 1)
+            for event in player.step():
+                self._play_sim_event(event)
+        with profiler.section("update.particles"):
+            self.particle_system.update()
+        
+    def _handle_sim_event(self, event):
+        kind = event[0]
+        if kind == "eat":
+            food = event[1]
+            # Add coins for golden and rainbow food
+            if food["type"] == "golden":
+                self.coins += 1
+            elif food["type"] == "rainbow":
+                self.coins += 5
+        elif kind == "game_over":
+            self.state = GameState.GAME_OVER
+            self._save_highscore()
+            self._save_replay()
+        elif kind == "level_complete":
+            self.state = GameState.LEVEL_COMPLETE
+            self._save_replay()
+        self._play_sim_event(event)
+        
+    def _play_sim_event(self, event):
+        # Sounds and particles only, so replays can show events too
+        kind = event[0]
+        if kind == "eat":
+            _, food, head = event
+            # Play appropriate sound
+            if food.get("sound"):
+                self.sound_system.play_sound(food["sound"])
+            else:
+                self.sound_system.play_sound("eat")
                 
-        # Check obstacle collision
-        for block in self.obstacle.blocks:
-            if head[0] == block[0] and head[1] == block[1]:
-                if not self.snake.invincible and not self.snake.shield:
-                    return True
-                else:
-                    # Break the obstacle if invincible or shielded
-                    self.obstacle.blocks.remove(block)
-                    self.particle_system.add_explosion(
-                        block[0] + BLOCK_SIZE//2, block[1] + BLOCK_SIZE//2,
-                        COLORS["GRAY"], 15
-                    )
-                    return False
-                    
-        return False
-        
-    def _handle_collision(self):
-        if self.snake.shield:
-            self.snake.shield = False
+            # Add eating particles
+            self.particle_system.add_explosion(
+                head[0] + BLOCK_SIZE//2, 
+                head[1] + BLOCK_SIZE//2,
+                food["color"], 15
+            )
+        elif kind == "obstacle_break":
+            block = event[1]
+            self.particle_system.add_explosion(
+                block[0] + BLOCK_SIZE//2, block[1] + BLOCK_SIZE//2,
+                COLORS["GRAY"], 15
+            )
+        elif kind == "shield_break":
+            head = event[1]
             self.particle_system.add_explosion(
-                self.snake.body[0][0] + BLOCK_SIZE//2, 
-                self.snake.body[0][1] + BLOCK_SIZE//2,
+                head[0] + BLOCK_SIZE//2, head[1] + BLOCK_SIZE//2,
                 COLORS["LIGHT_BLUE"], 30
             )
-            return
+        elif kind == "crash":
+            head = event[1]
+            self.sound_system.play_sound("crash")
+            self.particle_system.add_explosion(
+                head[0] + BLOCK_SIZE//2, head[1] + BLOCK_SIZE//2,
+                COLORS["RED"], 50
+            )
             
-        self.sound_system.play_sound("crash")
-        self.particle_system.add_explosion(
-            self.snake.body[0][0] + BLOCK_SIZE//2, 
-            self.snake.body[0][1] + BLOCK_SIZE//2,
-            COLORS["RED"], 50
-        )
+    def _draw(self):
+        if self.settings["dirty_rects"] and self.state in (GameState.PLAYING, GameState.REPLAY):
+            self._draw_dirty()
+            return
+        self.dirty_rects = None
         
-        if self.game_mode == GameMode.SURVIVAL:
-            self.lives -= 1
-            if self.lives <= 0:
-                self.state = GameState.GAME_OVER
-                self._save_highscore()
+        with profiler.section("draw.background"):
+            if self.state in (GameState.PLAYING, GameState.PAUSED, GameState.GAME_OVER, GameState.REPLAY):
+                static = None if self.obstacle.moving else self.obstacle
+                self.background.draw(self.screen, self.backgrounds[self.current_bg], self.grid_visible, static)
             else:
-                # Respawn snake
-                self.snake.reset()
-        else:
-            self.state = GameState.GAME_OVER
-            self._save_highscore()
-            
-    def _check_food_collision(self):
-        head = self.snake.body[0]
+                self.screen.fill(self.backgrounds[self.current_bg])
         
-        for i, food in enumerate(self.food.food_items):
-            if head[0] == food["pos"][0] and head[1] == food["pos"][1]:
-                self._apply_food_effect(food)
-                self.food.respawn(i)
-                
-                # Add coins for golden and rainbow food
-                if food["type"] == "golden":
-                    self.coins += 1
-                elif food["type"] == "rainbow":
-                    self.coins += 5
-                    
-                # Play appropriate sound
-                if food.get("sound"):
-                    self.sound_system.play_sound(food["sound"])
-                else:
-                    self.sound_system.play_sound("eat")
-                    
-                # Add eating particles
-                self.particle_system.add_explosion(
-                    head[0] + BLOCK_SIZE//2, 
-                    head[1] + BLOCK_SIZE//2,
-                    food["color"], 15
-                )
-                
-    def _apply_food_effect(self, food):
-        value = food["value"]
-        
-        # Apply combo multiplier if active
-        if self.combo > 1:
-            value = int(value * (1 + self.combo * 0.2))
-            
-        self.score += max(0, value)  # Don't subtract from score for negative foods
-        
-        if food["effect"] == "speed_boost":
-            self.snake.speed = min(self.snake.speed + 3, MAX_SPEED)
-            self.snake.glow_effect = True
-        elif food["effect"] == "slow_down":
-            self.snake.speed = max(self.snake.speed - 3, MIN_SPEED)
-        elif food["effect"] == "invincible":
-            self.snake.invincible = True
-            pygame.time.set_timer(USEREVENT + 1, food["duration"])  # Timer to disable invincibility
-        elif food["effect"] == "shield":
-            self.snake.shield = True
-            pygame.time.set_timer(USEREVENT + 2, food["duration"])  # Timer to disable shield
-        elif food["effect"] == "glow":
-            self.snake.glow_effect = True
-            pygame.time.set_timer(USEREVENT + 3, food["duration"])  # Timer to disable glow
-        elif food["effect"] == "score_multiplier":
-            self.snake.score_multiplier = 2.0
-            pygame.time.set_timer(USEREVENT + 4, food["duration"])  # Timer to disable multiplier
-        elif food["effect"] == "shrink":
-            self.snake.shrink(2)
-        elif food["effect"] == "combo_boost":
-            self.combo += 1
-            self.combo_timer = 0
-        elif food["effect"] == "bomb":
-            # Remove 3 segments and slow down
-            self.snake.shrink(3)
-            self.snake.speed = max(self.snake.speed - 2, MIN_SPEED)
-            
-        if value > 0:  # Only grow for positive food
-            self.snake.grow(value)
+        with profiler.section(f"draw.{self.state.name.lower()}"):
+            self._draw_state()
+        self._draw_loading()
+        self._draw_profiler()
+        with profiler.section("draw.flip"):
+            pygame.display.flip()
             
-    def _draw(self):
-        self.screen.fill(self.backgrounds[self.current_bg])
-        
+    def _draw_state(self):
         if self.state == GameState.MENU:
             self._draw_menu()
         elif self.state == GameState.MODE_SELECT:
@@ -1795,24 +2164,55 @@ class Game:
             self._draw_shop()
         elif self.state == GameState.LEVEL_COMPLETE:
             self._draw_level_complete()
-            
-        pygame.display.flip()
+        elif self.state == GameState.REPLAY:
+            self._draw_game()
+            self._draw_replay_bar()
+        
+    def _draw_dirty(self):
+        # Repaint only what changed: put the background back under everything
+        # drawn last frame, draw this frame, and hand both sets of rects to the
+        # display. Anything that invalidates the whole screen (a new layer, a
+        # state change, too many pieces to be worth it) falls back to a flip.
+        with profiler.section("draw.background"):
+            static = None if self.obstacle.moving else self.obstacle
+            rebuilt = self.background.update(self.screen, self.backgrounds[self.current_bg], self.grid_visible, static)
+            layer = self.background.surface
+            previous = self.dirty_rects
+            if previous is None or rebuilt:
+                self.screen.blit(layer, (0, 0))
+            else:
+                self.screen.blits([(layer, rect, rect) for rect in previous], doreturn=False)
+            
+        with profiler.section(f"draw.{self.state.name.lower()}"):
+            rects = self._draw_game()
+            if self.state == GameState.REPLAY:
+                rects.extend(self._draw_replay_bar())
+        rects.extend(self._draw_loading())
+        rects.extend(self._draw_profiler())
+            
+        with profiler.section("draw.flip"):
+            if previous is None or rebuilt or len(previous) + len(rects) > DIRTY_RECT_LIMIT:
+                pygame.display.flip()
+            else:
+                pygame.display.update(previous + rects)
+        self.dirty_rects = rects
         
     def _draw_menu(self):
         # Draw animated background
+        rng = self.sim.rngs["menu"]
         for i in range(20):
-            x = random.randint(0, SCREEN_WIDTH)
-            y = random.randint(0, SCREEN_HEIGHT)
-            size = random.randint(2, 5)
-            alpha = random.randint(50, 150)
+            x = rng.randint(0, SCREEN_WIDTH)
+            y = rng.randint(0, SCREEN_HEIGHT)
+            size = rng.randint(2, 5)
+            alpha = rng.randint(50, 150)
             pygame.draw.circle(
                 self.screen, (*COLORS["PURPLE"], alpha), 
                 (x, y), size
             )
         
-        title_text = title_font.render("ULTIMATE SNAKE", True, COLORS["PURPLE"])
-        shadow_text = title_font.render("ULTIMATE SNAKE", True, COLORS["BLACK"])
-        version_text = font_tiny.render("Version 2.0", True, COLORS["WHITE"])
+        title_text = text_cache.render(fonts["title"], "ULTIMATE SNAKE", True, COLORS["PURPLE"])
+        shadow_text = text_cache.render(fonts["title"], "ULTIMATE SNAKE", True, COLORS["BLACK"])
+        version_text = text_cache.render(fonts["tiny"], "Version 2.0", True, COLORS["WHITE"])
         
         self.screen.blit(shadow_text, (SCREEN_WIDTH//2 - title_text.get_width()//2 + 3, 100 + 3))
         self.screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 100))
@@ -1823,19 +2223,14 @@ class Game:
             button.draw(self.screen)
             
         # Draw a sample snake in the menu
-        sample_snake = Snake()
-        sample_snake.body = [[SCREEN_WIDTH//2 - i * BLOCK_SIZE, 180] for i in range(5)]
-        sample_snake.direction = Direction.RIGHT
-        sample_snake.next_direction = Direction.RIGHT
-        sample_snake.draw(self.screen)
+        self.menu_snake.draw(self.screen)
             
     def _draw_mode_select(self):
         # Draw semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
+        overlay = overlay_cache.rect((SCREEN_WIDTH, SCREEN_HEIGHT), COLORS["BLACK"], 180)
         self.screen.blit(overlay, (0, 0))
         
-        title_text = font_large.render("SELECT GAME MODE", True, COLORS["WHITE"])
+        title_text = text_cache.render(fonts["large"], "SELECT GAME MODE", True, COLORS["WHITE"])
         self.screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 120))
         
         # Draw mode select buttons
@@ -1852,77 +2247,145 @@ class Game:
         ]
         
         for desc in modes:
-            desc_text = font_small.render(desc, True, COLORS["WHITE"])
+            desc_text = text_cache.render(fonts["small"], desc, True, COLORS["WHITE"])
             self.screen.blit(desc_text, (SCREEN_WIDTH//2 - desc_text.get_width()//2, desc_y))
             desc_y += 30
             
-    def _draw_game(self):
-        if self.grid_visible:
-            self._draw_grid()
-            
-        self.food.draw(self.screen)
-        self.obstacle.draw(self.screen)
-        self.snake.draw(self.screen)
-        self.particle_system.draw(self.screen)
-        self._draw_hud()
+    def _render_time(self) -> float:
+        # Simulation time to draw at: the last tick plus however far into the
+        # next one the frame is, while the simulation is actually advancing
+        running = (self.state == GameState.PLAYING or
+                   self.state == GameState.REPLAY and not self.replay_paused and not self.replay_player.finished)
+        alpha = self.render_alpha if running else 0.0
+        return self.sim.now + alpha * 1000 / TICK_RATE
+        
+    def _draw_game(self) -> List[pygame.Rect]:
+        # The background, grid and static obstacles are already down.
+        # Returns every rect drawn over, for the dirty-rect renderer
+        now = self._render_time()
+        with profiler.section("draw.food"):
+            rects = self.food.draw(self.screen, now)
+        if self.obstacle.moving:
+            with profiler.section("draw.obstacles"):
+                rects.extend(self.obstacle.draw(self.screen))
+        with profiler.section("draw.snake"):
+            rects.extend(self.snake.draw(self.screen, now))
+        with profiler.section("draw.particles"):
+            rects.extend(self.particle_system.draw(self.screen))
+        self.particle_lod.end_frame()
+        with profiler.section("draw.hud"):
+            rects.extend(self._draw_hud())
         
         if self.combo > 1:
-            self._draw_combo()
-            
-    def _draw_grid(self):
-        for x in range(0, SCREEN_WIDTH, BLOCK_SIZE):
-            pygame.draw.line(self.screen, (*COLORS["GRAY"], 30), (x, 0), (x, SCREEN_HEIGHT))
-        for y in range(0, SCREEN_HEIGHT, BLOCK_SIZE):
-            pygame.draw.line(self.screen, (*COLORS["GRAY"], 30), (0, y), (SCREEN_WIDTH, y))
+            rects.append(self._draw_combo())
+        return rects
             
-    def _draw_hud(self):
-        score_text = font_small.render(f"Score: {self.score}", True, COLORS["WHITE"])
-        high_score_text = font_small.render(f"High Score: {self.high_score}", True, COLORS["YELLOW"])
+    def _draw_hud(self) -> List[pygame.Rect]:
+        rects = []
+        score_text = text_cache.render(fonts["small"], f"Score: {self.score}", True, COLORS["WHITE"])
+        high_score_text = text_cache.render(fonts["small"], f"High Score: {self.high_score}", True, COLORS["YELLOW"])
         
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(high_score_text, (10, 40))
+        rects.append(self.screen.blit(score_text, (10, 10)))
+        rects.append(self.screen.blit(high_score_text, (10, 40)))
         
-        if self.game_mode == GameMode.SURVIVAL:
-            lives_text = font_small.render(f"Lives: {self.lives}", True, COLORS["WHITE"])
-            self.screen.blit(lives_text, (10, 70))
+        if self.sim.mode == GameMode.SURVIVAL:
+            lives_text = text_cache.render(fonts["small"], f"Lives: {self.lives}", True, COLORS["WHITE"])
+            rects.append(self.screen.blit(lives_text, (10, 70)))
             
-        if self.game_mode in [GameMode.TIME_ATTACK, GameMode.CAMPAIGN]:
-            elapsed = (pygame.time.get_ticks() - self.level_start_time) // 1000
-            remaining = max(0, self.time_attack_time - elapsed)
+        if self.sim.mode in [GameMode.TIME_ATTACK, GameMode.CAMPAIGN]:
+            remaining = self.sim.time_remaining()
             mins, secs = divmod(remaining, 60)
-            time_text = font_small.render(f"Time: {mins:02d}:{secs:02d}", True, COLORS["WHITE"])
-            self.screen.blit(time_text, (SCREEN_WIDTH - time_text.get_width() - 10, 10))
+            time_text = text_cache.render(fonts["small"], f"Time: {mins:02d}:{secs:02d}", True, COLORS["WHITE"])
+            rects.append(self.screen.blit(time_text, (SCREEN_WIDTH - time_text.get_width() - 10, 10)))
             
-            if self.game_mode == GameMode.CAMPAIGN:
-                target_text = font_small.render(
+            if self.sim.mode == GameMode.CAMPAIGN:
+                target_text = text_cache.render(fonts["small"],
                     f"Target: {self.campaign_levels[self.current_campaign_level]['target']}", 
                     True, COLORS["WHITE"])
-                self.screen.blit(target_text, (SCREEN_WIDTH - target_text.get_width() - 10, 40))
+                rects.append(self.screen.blit(target_text, (SCREEN_WIDTH - target_text.get_width() - 10, 40)))
                 
         if self.settings["show_fps"]:
-            fps_text = font_tiny.render(f"FPS: {int(self.clock.get_fps())}", True, COLORS["WHITE"])
-            self.screen.blit(fps_text, (SCREEN_WIDTH - fps_text.get_width() - 10, SCREEN_HEIGHT - 30))
+            fps_text = text_cache.render(
+                fonts["tiny"], f"FPS: {int(self.clock.get_fps())}  LOD: {self.particle_lod.level}", True, COLORS["WHITE"])
+            rects.append(self.screen.blit(fps_text, (SCREEN_WIDTH - fps_text.get_width() - 10, SCREEN_HEIGHT - 30)))
             
         # Draw powerup indicators
         indicator_y = SCREEN_HEIGHT - 30
         if self.snake.invincible:
-            inv_text = font_tiny.render("INVINCIBLE", True, COLORS["GOLD"])
-            self.screen.blit(inv_text, (10, indicator_y))
+            inv_text = text_cache.render(fonts["tiny"], self._effect_label("INVINCIBLE", "invincible"), True, COLORS["GOLD"])
+            rects.append(self.screen.blit(inv_text, (10, indicator_y)))
             indicator_y -= 20
         if self.snake.shield:
-            shield_text = font_tiny.render("SHIELD", True, COLORS["LIGHT_BLUE"])
-            self.screen.blit(shield_text, (10, indicator_y))
+            shield_text = text_cache.render(fonts["tiny"], self._effect_label("SHIELD", "shield"), True, COLORS["LIGHT_BLUE"])
+            rects.append(self.screen.blit(shield_text, (10, indicator_y)))
             indicator_y -= 20
         if self.snake.score_multiplier > 1:
-            multi_text = font_tiny.render(f"x{self.snake.score_multiplier} SCORE", True, COLORS["PURPLE"])
-            self.screen.blit(multi_text, (10, indicator_y))
+            multi_text = text_cache.render(fonts["tiny"],
+                self._effect_label(f"x{self.snake.score_multiplier} SCORE", "score_multiplier"), True, COLORS["PURPLE"])
+            rects.append(self.screen.blit(multi_text, (10, indicator_y)))
             indicator_y -= 20
         if self.snake.glow_effect:
-            glow_text = font_tiny.render("GLOW", True, COLORS["PURPLE"])
-            self.screen.blit(glow_text, (10, indicator_y))
-            
-    def _draw_combo(self):
-        combo_text = font_medium.render(f"COMBO x{self.combo}!", True, COLORS["ORANGE"])
+            glow_text = text_cache.render(fonts["tiny"], self._effect_label("GLOW", "glow"), True, COLORS["PURPLE"])
+            rects.append(self.screen.blit(glow_text, (10, indicator_y)))
+        return rects
+            
+    def _draw_loading(self) -> List[pygame.Rect]:
+        # Thin progress bar along the bottom while assets are still loading
+        if self.assets.finished:
+            return []
+        bar = pygame.Rect(SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 50, 300, 6)
+        pygame.draw.rect(self.screen, COLORS["GRAY"], bar, 1)
+        filled = bar.inflate(-2, -2)
+        filled.width = int(filled.width * self.assets.progress)
+        pygame.draw.rect(self.screen, COLORS["WHITE"], filled)
+        label = text_cache.render(fonts["tiny"], "Loading...", True, COLORS["GRAY"])
+        return [bar, self.screen.blit(label, (bar.centerx - label.get_width() // 2, bar.y - 20))]
+        
+    def _draw_profiler(self) -> List[pygame.Rect]:
+        # F3 overlay: a flame bar of the last frame, one row per nesting
+        # level and scaled to the frame budget, over a table of per-stage
+        # percentiles that refreshes a few times a second
+        if not profiler.enabled:
+            return []
+        with profiler.section("draw.profiler"):
+            width, row_height = 420, 8
+            x, y = SCREEN_WIDTH - width - 10, 80
+            if profiler.frames % 15 == 0 or not self.profiler_rows:
+                self.profiler_rows = profiler.summary()[:12]
+            rows = self.profiler_rows
+            depth = max((section[1] for section in profiler.last_frame), default=0) + 1
+            height = 10 + depth * row_height + 22 + 18 * len(rows) + 10
+            panel = pygame.Rect(x - 10, y - 10, width + 20, height)
+            self.screen.blit(overlay_cache.rect(panel.size, COLORS["BLACK"], 180), panel)
+            
+            frame_ns = max(profiler.last_frame_ns, 1_000_000_000 // self.fps)
+            for name, level, start, duration in profiler.last_frame:
+                color = self.profiler_colors.get(name)
+                if color is None:
+                    palette = ("RED", "ORANGE", "YELLOW", "GREEN", "CYAN", "LIGHT_BLUE", "VIOLET", "HOT_PINK")
+                    color = self.profiler_colors[name] = COLORS[palette[len(self.profiler_colors) % len(palette)]]
+                left = (start - profiler.last_frame_start) * width // frame_ns
+                span = max(1, duration * width // frame_ns)
+                pygame.draw.rect(self.screen, color, (x + left, y + level * row_height, span, row_height - 1))
+                
+            y += depth * row_height + 6
+            columns = (x, x + 210, x + 280, x + 350)
+            for column, label in zip(columns, ("stage (ms)", "p50", "p95", "p99")):
+                self.screen.blit(text_cache.render(fonts["tiny"], label, True, COLORS["WHITE"]), (column, y))
+            for name, *times in rows:
+                y += 18
+                color = self.profiler_colors.get(name, COLORS["WHITE"])
+                self.screen.blit(text_cache.render(fonts["tiny"], name, True, color), (columns[0], y))
+                for column, ms in zip(columns[1:], times):
+                    self.screen.blit(text_cache.render(fonts["tiny"], f"{ms:.2f}", True, color), (column, y))
+        return [panel]
+        
+    def _effect_label(self, label: str, effect: str) -> str:
+        remaining = self.sim.effect_remaining(effect)
+        return f"{label} {remaining}s" if remaining else label
+        
+    def _draw_combo(self) -> pygame.Rect:
+        combo_text = text_cache.render(fonts["medium"], f"COMBO x{self.combo}!", True, COLORS["ORANGE"])
         text_rect = combo_text.get_rect(center=(SCREEN_WIDTH//2, 30))
         
         # Add pulsing effect
@@ -1930,16 +2393,40 @@ class Game:
         scaled_text = pygame.transform.scale_by(combo_text, scale)
         scaled_rect = scaled_text.get_rect(center=text_rect.center)
         
-        self.screen.blit(scaled_text, scaled_rect)
+        return self.screen.blit(scaled_text, scaled_rect)
+        
+    def _replay_bar_rect(self) -> pygame.Rect:
+        return pygame.Rect(200, SCREEN_HEIGHT - 60, SCREEN_WIDTH - 400, 8)
+        
+    def _draw_replay_bar(self) -> List[pygame.Rect]:
+        player = self.replay_player
+        bar = self._replay_bar_rect()
+        rects = [pygame.draw.rect(self.screen, COLORS["GRAY"], bar, border_radius=4)]
+        filled = bar.copy()
+        filled.width = int(bar.width * player.tick / max(1, player.length))
+        pygame.draw.rect(self.screen, COLORS["PURPLE"], filled, border_radius=4)
+        rects.append(pygame.draw.circle(self.screen, COLORS["WHITE"], (filled.right, bar.centery), 8))
+        
+        now_mins, now_secs = divmod(player.tick // TICK_RATE, 60)
+        end_mins, end_secs = divmod(player.length // TICK_RATE, 60)
+        status = "PAUSED" if self.replay_paused else f"x{REPLAY_FAST_FORWARD}" if self.replay_fast_forward else "PLAYING"
+        info_text = text_cache.render(fonts["tiny"],
+            f"REPLAY  {now_mins:02d}:{now_secs:02d} / {end_mins:02d}:{end_secs:02d}  {status}", 
+            True, COLORS["WHITE"])
+        help_text = text_cache.render(fonts["tiny"],
+            "Space pause   Left/Right seek   0-9 jump   F fast-forward   Esc exit", 
+            True, COLORS["DARK_GRAY"])
+        rects.append(self.screen.blit(info_text, (bar.x, bar.y - 26)))
+        rects.append(self.screen.blit(help_text, (bar.centerx - help_text.get_width()//2, bar.bottom + 12)))
+        return rects
         
     def _draw_pause_menu(self):
         # Draw semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
+        overlay = overlay_cache.rect((SCREEN_WIDTH, SCREEN_HEIGHT), COLORS["BLACK"], 180)
         self.screen.blit(overlay, (0, 0))
         
         # Draw pause text
-        pause_text = font_large.render("PAUSED", True, COLORS["WHITE"])
+        pause_text = text_cache.render(fonts["large"], "PAUSED", True, COLORS["WHITE"])
         self.screen.blit(pause_text, (SCREEN_WIDTH//2 - pause_text.get_width()//2, 200))
         
         # Draw pause menu buttons
@@ -1948,44 +2435,45 @@ class Game:
             
     def _draw_game_over(self):
         # Draw semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 200))
+        overlay = overlay_cache.rect((SCREEN_WIDTH, SCREEN_HEIGHT), COLORS["BLACK"], 200)
         self.screen.blit(overlay, (0, 0))
         
         # Draw game over text
-        game_over_text = font_large.render("GAME OVER", True, COLORS["RED"])
+        game_over_text = text_cache.render(fonts["large"], "GAME OVER", True, COLORS["RED"])
         self.screen.blit(game_over_text, (SCREEN_WIDTH//2 - game_over_text.get_width()//2, 200))
         
         # Draw final score
-        score_text = font_medium.render(f"Final Score: {self.score}", True, COLORS["WHITE"])
+        score_text = text_cache.render(fonts["medium"], f"Final Score: {self.score}", True, COLORS["WHITE"])
         self.screen.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, 280))
         
         # Draw high score if beaten
         if self.score > self.high_score:
-            new_high_text = font_medium.render("NEW HIGH SCORE!", True, COLORS["YELLOW"])
+            new_high_text = text_cache.render(fonts["medium"], "NEW HIGH SCORE!", True, COLORS["YELLOW"])
             self.screen.blit(new_high_text, (SCREEN_WIDTH//2 - new_high_text.get_width()//2, 330))
             
         # Draw game over buttons
         for button in self.game_over_buttons:
             button.draw(self.screen)
             
+        replay_text = text_cache.render(fonts["tiny"], "Press R to watch the replay", True, COLORS["WHITE"])
+        self.screen.blit(replay_text, (SCREEN_WIDTH//2 - replay_text.get_width()//2, SCREEN_HEIGHT - 40))
+            
     def _draw_settings(self):
         # Draw semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
+        overlay = overlay_cache.rect((SCREEN_WIDTH, SCREEN_HEIGHT), COLORS["BLACK"], 180)
         self.screen.blit(overlay, (0, 0))
         
         # Draw settings title
-        title_text = font_large.render("SETTINGS", True, COLORS["WHITE"])
+        title_text = text_cache.render(fonts["large"], "SETTINGS", True, COLORS["WHITE"])
         self.screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 120))
         
         # Draw sound volume slider
-        sound_text = font_medium.render("Sound Volume:", True, COLORS["WHITE"])
+        sound_text = text_cache.render(fonts["medium"], "Sound Volume:", True, COLORS["WHITE"])
         self.screen.blit(sound_text, (SCREEN_WIDTH//2 - 200, 250))
         self.settings_sliders[0].draw(self.screen)
         
         # Draw music volume slider
-        music_text = font_medium.render("Music Volume:", True, COLORS["WHITE"])
+        music_text = text_cache.render(fonts["medium"], "Music Volume:", True, COLORS["WHITE"])
         self.screen.blit(music_text, (SCREEN_WIDTH//2 - 200, 330))
         self.settings_sliders[1].draw(self.screen)
         
@@ -1998,7 +2486,7 @@ class Game:
         self.screen.fill(COLORS["BLACK_OLIVE"])
         
         # Draw shop title
-        title_text = font_large.render("SNAKE SKIN SHOP", True, COLORS["GOLD"])
+        title_text = text_cache.render(fonts["large"], "SNAKE SKIN SHOP", True, COLORS["GOLD"])
         self.screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 40))
         
         # Draw shop buttons
@@ -2031,25 +2519,24 @@ class Game:
             
             # Draw special effect indicator
             if skin.special_effect:
-                effect_text = font_tiny.render(f"Effect: {skin.special_effect}", True, COLORS["WHITE"])
+                effect_text = text_cache.render(fonts["tiny"], f"Effect: {skin.special_effect}", True, COLORS["WHITE"])
                 self.screen.blit(effect_text, (preview_x + BLOCK_SIZE*2 + 20, preview_y - effect_text.get_height()//2))
                 
     def _draw_level_complete(self):
         # Draw semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 200))
+        overlay = overlay_cache.rect((SCREEN_WIDTH, SCREEN_HEIGHT), COLORS["BLACK"], 200)
         self.screen.blit(overlay, (0, 0))
         
         # Draw congratulations text
-        congrats_text = font_large.render("CAMPAIGN COMPLETE!", True, COLORS["GOLD"])
+        congrats_text = text_cache.render(fonts["large"], "CAMPAIGN COMPLETE!", True, COLORS["GOLD"])
         self.screen.blit(congrats_text, (SCREEN_WIDTH//2 - congrats_text.get_width()//2, 200))
         
         # Draw final score
-        score_text = font_medium.render(f"Final Score: {self.score}", True, COLORS["WHITE"])
+        score_text = text_cache.render(fonts["medium"], f"Final Score: {self.score}", True, COLORS["WHITE"])
         self.screen.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, 280))
         
         # Draw reward
-        reward_text = font_medium.render("You earned 100 coins!", True, COLORS["YELLOW"])
+        reward_text = text_cache.render(fonts["medium"], "You earned 100 coins!", True, COLORS["YELLOW"])
         self.screen.blit(reward_text, (SCREEN_WIDTH//2 - reward_text.get_width()//2, 330))
         
         # Add coins
@@ -2069,5 +2556,9 @@ class Game:
         continue_button.draw(self.screen)
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="Ultimate Snake Game")
+    parser.add_argument("--profile", action="store_true", help="start with the frame profiler on (F3 toggles it)")
+    parser.add_argument("--trace", metavar="PATH", help="profile and write a Chrome trace to PATH on exit")
+    args = parser.parse_args()
+    game = Game(profile=args.profile, trace_path=args.trace)
     game.run()
@@ -0,0 +1,124 @@
+import json
+import time
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from typing import Deque, Dict, List, Tuple
+
+from constants import PROFILER_WINDOW, PROFILER_TRACE_EVENTS
+
+# Frame profiler. Code marks the stages it wants timed with
+#
+#   with profiler.section("update.snake"):
+#       ...
+#
+# and the game loop calls profiler.frame() once per frame. While enabled,
+# every section is timed with perf_counter_ns; the per-frame total of each
+# stage goes into a rolling window of PROFILER_WINDOW frames for
+# percentiles, the sections of the last finished frame are kept for the
+# on-screen flame bar, and every section is appended to a Chrome trace
+# (chrome://tracing, Perfetto) capped at PROFILER_TRACE_EVENTS events.
+#
+# Disabled, section() hands back one shared no-op context manager, so
+# instrumented code pays an attribute check and an empty with block.
+
+_NULL_SECTION = nullcontext()
+
+class _Section:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.profiler.depth += 1
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter_ns()
+        profiler = self.profiler
+        # Switched off mid-section: the reset already threw the frame away
+        if profiler.enabled:
+            profiler.depth -= 1
+            profiler.record(self.name, profiler.depth, self.start, end - self.start)
+
+class Profiler:
+    def __init__(self, window: int = PROFILER_WINDOW, max_events: int = PROFILER_TRACE_EVENTS):
+        self.enabled = False
+        self.window = window
+        self.history: Dict[str, Deque[int]] = {}
+        self.totals: Dict[str, int] = defaultdict(int)
+        self.trace: Deque[Tuple[str, int, int]] = deque(maxlen=max_events)
+        self.sections: List[Tuple[str, int, int, int]] = []
+        self.last_frame: List[Tuple[str, int, int, int]] = []
+        self.frame_start = self.last_frame_start = time.perf_counter_ns()
+        self.last_frame_ns = 0
+        self.frames = 0
+        self.depth = 0
+
+    def section(self, name: str):
+        if not self.enabled:
+            return _NULL_SECTION
+        return _Section(self, name)
+
+    def record(self, name: str, depth: int, start: int, duration: int) -> None:
+        self.totals[name] += duration
+        self.sections.append((name, depth, start, duration))
+        self.trace.append((name, start, duration))
+
+    def toggle(self) -> bool:
+        self.enabled = not self.enabled
+        self.reset()
+        return self.enabled
+
+    def reset(self) -> None:
+        self.history.clear()
+        self.totals.clear()
+        self.trace.clear()
+        self.sections = []
+        self.last_frame = []
+        self.frame_start = time.perf_counter_ns()
+        self.frames = 0
+        self.depth = 0
+
+    def frame(self) -> None:
+        # Closes the frame that started at the previous call. Stages that
+        # didn't run this frame count as zero, so their percentiles stay
+        # honest about how often they cost something.
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        for name in self.totals.keys() | self.history.keys():
+            history = self.history.get(name)
+            if history is None:
+                history = self.history[name] = deque([0] * min(self.frames, self.window), maxlen=self.window)
+            history.append(self.totals.get(name, 0))
+        self.trace.append(("frame", self.frame_start, now - self.frame_start))
+        self.totals.clear()
+        self.last_frame, self.sections = self.sections, []
+        self.last_frame_start, self.last_frame_ns = self.frame_start, now - self.frame_start
+        self.frame_start = now
+        self.frames += 1
+
+    def percentiles(self, name: str, points=(50, 95, 99)) -> List[float]:
+        # Milliseconds per frame spent in `name` at each percentile
+        ordered = sorted(self.history.get(name, ()))
+        if not ordered:
+            return [0.0] * len(points)
+        return [ordered[min(len(ordered) - 1, len(ordered) * p // 100)] / 1e6 for p in points]
+
+    def summary(self) -> List[Tuple[str, float, float, float]]:
+        # (stage, p50, p95, p99) in ms, most expensive p95 first
+        rows = [(name, *self.percentiles(name)) for name in self.history]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def trace_events(self) -> List[Dict]:
+        # Chrome trace-event "complete" events, timestamps in microseconds
+        return [{"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000, "pid": 0, "tid": 0}
+                for name, start, duration in self.trace]
+
+    def dump_trace(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f)
+
+profiler = Profiler()
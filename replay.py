@@ -0,0 +1,198 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import List, Tuple, Dict, Any
+
+from constants import TICK_RATE
+from engine import Simulation, GameMode, Direction
+
+# Compact replay files. A seeded Simulation is fully determined by its seed,
+# mode, difficulty and the direction inputs it was given, so that is all a
+# replay stores:
+#
+#   magic  b"SNKR"
+#   varint version
+#   varint seed
+#   str    mode name, str difficulty name    (varint length + ASCII)
+#   varint campaign level
+#   varint (tick delta << 3) | code, ...     code 0-3 = Direction, 4 = end
+#
+# The end record carries the tick the recording stopped at. Inputs are a
+# byte or two each, so a 10 minute game is a few KB.
+
+MAGIC = b"SNKR"
+VERSION = 1
+
+DIRECTIONS = list(Direction)
+END = 4
+
+def write_varint(out: bytearray, value: int) -> None:
+    if value < 0:
+        raise ValueError("varints are unsigned")
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated replay")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _write_str(out: bytearray, text: str) -> None:
+    raw = text.encode("ascii")
+    write_varint(out, len(raw))
+    out += raw
+
+def _read_str(data: bytes, pos: int) -> Tuple[str, int]:
+    length, pos = read_varint(data, pos)
+    return data[pos:pos + length].decode("ascii"), pos + length
+
+@dataclass
+class Replay:
+    seed: int
+    mode: GameMode
+    difficulty: str
+    campaign_level: int = 0
+    inputs: List[Tuple[int, Direction]] = field(default_factory=list)
+    length: int = 0  # ticks
+
+    def header(self) -> bytearray:
+        out = bytearray(MAGIC)
+        write_varint(out, VERSION)
+        write_varint(out, self.seed)
+        _write_str(out, self.mode.name)
+        _write_str(out, self.difficulty)
+        write_varint(out, self.campaign_level)
+        return out
+
+    def to_bytes(self) -> bytes:
+        out = self.header()
+        last = 0
+        for tick, direction in self.inputs:
+            write_varint(out, (tick - last) << 3 | DIRECTIONS.index(direction))
+            last = tick
+        write_varint(out, (self.length - last) << 3 | END)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a replay file")
+        version, pos = read_varint(data, len(MAGIC))
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}")
+        seed, pos = read_varint(data, pos)
+        mode, pos = _read_str(data, pos)
+        difficulty, pos = _read_str(data, pos)
+        campaign_level, pos = read_varint(data, pos)
+        replay = cls(seed, GameMode[mode], difficulty, campaign_level)
+        tick = 0
+        while True:
+            record, pos = read_varint(data, pos)
+            tick += record >> 3
+            code = record & 7
+            if code == END:
+                replay.length = tick
+                return replay
+            replay.inputs.append((tick, DIRECTIONS[code]))
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "Replay":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+class ReplayRecorder:
+    # Inputs are encoded straight into a bytearray as they arrive, which is
+    # a couple of appends per key press; nothing touches the disk until save()
+    def __init__(self, seed: int, mode: GameMode, difficulty: str, campaign_level: int = 0):
+        self.header = bytes(Replay(seed, mode, difficulty, campaign_level).header())
+        self.records = bytearray()
+        self.last_tick = 0
+        self.count = 0
+
+    def record(self, tick: int, direction: Direction) -> None:
+        write_varint(self.records, (tick - self.last_tick) << 3 | DIRECTIONS.index(direction))
+        self.last_tick = tick
+        self.count += 1
+
+    def to_bytes(self, tick: int) -> bytes:
+        end = bytearray()
+        write_varint(end, (tick - self.last_tick) << 3 | END)
+        return self.header + self.records + end
+
+    def save(self, path: str, tick: int) -> None:
+        with open(path, "wb") as f:
+            f.write(self.to_bytes(tick))
+
+class ReplayPlayer:
+    # Plays a Replay back through a fresh Simulation. Opening a replay runs
+    # it through once and keeps a Simulation.snapshot() keyframe every
+    # KEYFRAME_INTERVAL ticks, so seeking anywhere only re-simulates from the
+    # nearest keyframe before it. Keyframes live in memory, which keeps the
+    # files themselves down to the seed and inputs.
+    KEYFRAME_INTERVAL = 5 * TICK_RATE
+
+    def __init__(self, replay: Replay, **factories):
+        self.replay = replay
+        self.input_ticks = [tick for tick, _ in replay.inputs]
+        self.sim = Simulation(replay.mode, replay.difficulty, seed=replay.seed, **factories)
+        if replay.campaign_level:
+            self.sim.reset(seed=replay.seed, campaign_level=replay.campaign_level)
+        self.next_input = 0
+        self.keyframes: List[Dict[str, Any]] = []
+        self._index()
+        self.seek(0)
+
+    @property
+    def tick(self) -> int:
+        return self.sim.tick_count
+
+    @property
+    def length(self) -> int:
+        return self.replay.length
+
+    @property
+    def finished(self) -> bool:
+        return self.sim.over or self.tick >= self.length
+
+    def _index(self) -> None:
+        while True:
+            if self.tick % self.KEYFRAME_INTERVAL == 0:
+                self.keyframes.append(self.sim.snapshot())
+            if self.finished:
+                break
+            self.step()
+
+    def step(self) -> List[Tuple]:
+        if self.finished:
+            return []
+        inputs = self.replay.inputs
+        while self.next_input < len(inputs) and inputs[self.next_input][0] <= self.tick:
+            self.sim.change_direction(inputs[self.next_input][1])
+            self.next_input += 1
+        return self.sim.step()
+
+    def fast_forward(self, ticks: int) -> None:
+        # Simulate without handing back events, for skipping ahead quickly
+        end = min(self.tick + ticks, self.length)
+        while self.tick < end and not self.sim.over:
+            self.step()
+
+    def seek(self, tick: int) -> None:
+        tick = max(0, min(tick, self.length))
+        keyframe = min(tick // self.KEYFRAME_INTERVAL, len(self.keyframes) - 1)
+        if not (keyframe * self.KEYFRAME_INTERVAL <= self.tick <= tick):
+            self.sim.restore(self.keyframes[keyframe])
+            self.next_input = bisect_left(self.input_ticks, self.tick)
+        self.fast_forward(tick - self.tick)
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import balance
+
+
+def config(**overrides):
+    base = {
+        "key": "test/CLASSIC/NORMAL/greedy",
+        "fingerprint": "",
+        "mode": "CLASSIC",
+        "difficulty": "NORMAL",
+        "policy": "greedy",
+        "max_seconds": 20,
+        "rarity": {},
+        "value": {},
+        "speed": None,
+        "targets": None,
+    }
+    base.update(overrides)
+    return base
+
+
+def test_games_are_reproducible_per_seed():
+    assert balance.play_game(config(), 3) == balance.play_game(config(), 3)
+
+
+def test_overrides_reach_the_simulation():
+    sim = balance.build_simulation(config(rarity={"golden": 1000}, value={"golden": 9}, speed=7), 1)
+    golden = next(t for t in sim.food.types if t.name == "golden")
+    assert (golden.rarity, golden.value) == (1000, 9)
+    assert sim.snake.speed == 7
+    assert balance.DIFFICULTIES["NORMAL"]["speed"] != 7
+
+
+def test_targets_override_only_the_first_campaign_levels():
+    sim = balance.build_simulation(config(mode="CAMPAIGN", targets=[5, 10]), 1)
+    assert len(sim.campaign_levels) == len(balance.CAMPAIGN_LEVELS)
+    assert [level["target"] for level in sim.campaign_levels[:2]] == [5, 10]
+    assert sim.campaign_levels[2:] == balance.CAMPAIGN_LEVELS[2:]
+
+
+def test_more_targets_than_levels_are_rejected(tmp_path):
+    targets = [str(n) for n in range(len(balance.CAMPAIGN_LEVELS) + 1)]
+    with pytest.raises(SystemExit):
+        balance.main(["--targets", *targets, "--out", str(tmp_path / "results.jsonl")])
+
+
+def test_run_resumes_from_results_file(tmp_path, capsys):
+    out = tmp_path / "results.jsonl"
+    argv = ["--games", "4", "--workers", "1", "--chunk-size", "2", "--max-seconds", "5", "--out", str(out)]
+    balance.main(argv)
+    first = out.read_text().splitlines()
+    assert len(first) == 4
+
+    # Simulate an interrupted run: drop one result and leave a torn line
+    out.write_text("\n".join(first[:3]) + "\n" + first[3][:10])
+    balance.main(argv)
+    lines = out.read_text().splitlines()
+    results = [json.loads(line) for line in lines if line.endswith("}")]
+    assert sorted(r["seed"] for r in results) == [0, 1, 2, 3]
+    assert "4 games" in capsys.readouterr().out
@@ -0,0 +1,36 @@
+from bench import board_cycle, compare, find_run, load_history, append_history
+from constants import GRID_WIDTH, GRID_HEIGHT
+
+
+def run(label, **medians):
+    return {"label": label, "commit": None, "timestamp": label,
+            "results": {name: {"median_us": us, "min_us": us, "calls": 1} for name, us in medians.items()}}
+
+
+def test_board_cycle_visits_every_cell_once_in_single_steps():
+    cycle = board_cycle()
+    assert sorted(cycle) == list(range(GRID_WIDTH * GRID_HEIGHT))
+    for cell, following in zip(cycle, cycle[1:] + cycle[:1]):
+        assert abs(cell - following) in (1, GRID_WIDTH)
+        if abs(cell - following) == 1:
+            assert cell // GRID_WIDTH == following // GRID_WIDTH
+
+
+def test_compare_flags_slowdowns_past_the_threshold():
+    old = run("old", a=100.0, b=100.0, c=100.0, gone=5.0)
+    new = run("new", a=109.0, b=125.0, c=50.0, added=1.0)
+    rows = {name: (change, regressed) for name, _, _, change, regressed in compare(old, new, threshold=10)}
+    assert rows == {"a": (9.0, False), "b": (25.0, True), "c": (-50.0, False)}
+
+
+def test_history_round_trip_and_lookup(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    for label in ("first", "second", "third"):
+        append_history(path, run(label, a=1.0))
+    with open(path, "a") as f:
+        f.write('{"torn')
+    history = load_history(path)
+    assert [record["label"] for record in history] == ["first", "second", "third"]
+    assert find_run(history, "second")["label"] == "second"
+    assert find_run(history, "-1")["label"] == "third"
+    assert find_run(history, "0")["label"] == "first"
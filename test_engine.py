@@ -0,0 +1,256 @@
+import random
+from collections import Counter
+from dataclasses import replace
+
+from constants import BLOCK_SIZE, COMBO_WINDOW, GRID_WIDTH, TICK_RATE
+from balance import greedy_policy
+from engine import Simulation, GameMode, Direction, FoodSystem, OccupancyGrid, SnakeBody, TimerScheduler
+
+
+def run_ticks(sim, ticks):
+    events = []
+    for _ in range(ticks):
+        events.extend(sim.step())
+    return events
+
+
+def clear_board(sim):
+    sim.obstacle.generate(0)
+    sim.food = FoodSystem(0, sim.rngs["food"], grid=sim.grid)
+
+
+def test_same_seed_same_game():
+    a = Simulation(seed=42)
+    b = Simulation(seed=42)
+    for sim in (a, b):
+        sim.change_direction(Direction.UP)
+        run_ticks(sim, 120)
+    assert a.snake.body == b.snake.body
+    assert [f["pos"] for f in a.food.food_items] == [f["pos"] for f in b.food.food_items]
+    assert a.obstacle.blocks == b.obstacle.blocks
+
+
+def test_snake_moves_one_cell_per_interval():
+    sim = Simulation(seed=1, difficulty="EASY")
+    interval = TICK_RATE // int(sim.snake.speed)
+    start = sim.snake.body[0].copy()
+    run_ticks(sim, interval - 1)
+    assert sim.snake.body[0] == start
+    run_ticks(sim, 1)
+    assert sim.snake.body[0] == [start[0] + BLOCK_SIZE, start[1]]
+
+
+def test_eating_food_scores_and_grows():
+    sim = Simulation(seed=3, difficulty="EASY")
+    clear_board(sim)
+    head = sim.snake.body[0]
+    sim.food.food_items.append(sim.food._create_food())
+    food = sim.food.food_items[0]
+    sim.grid.clear_flag(*food["pos"], OccupancyGrid.FOOD)
+    sim.grid.set_flag(head[0] + BLOCK_SIZE, head[1], OccupancyGrid.FOOD)
+    food.update({"pos": [head[0] + BLOCK_SIZE, head[1]], "value": 1, "effect": None, "type": "normal"})
+    events = run_ticks(sim, TICK_RATE // int(sim.snake.speed))
+    assert ("eat", food, [head[0] + BLOCK_SIZE, head[1]]) in events
+    assert sim.score == 1
+    assert sim.snake.length == 2
+
+
+def test_wall_crash_ends_classic_game():
+    sim = Simulation(seed=5, difficulty="EASY")
+    clear_board(sim)
+    events = run_ticks(sim, GRID_WIDTH * TICK_RATE)
+    assert sim.over
+    assert ("game_over",) in events
+    assert sim.step() == []
+
+
+def test_survival_crash_costs_a_life():
+    sim = Simulation(mode=GameMode.SURVIVAL, seed=5, difficulty="EASY")
+    clear_board(sim)
+    while sim.lives == 3:
+        sim.step()
+    assert not sim.over
+    assert sim.snake.length == 1
+
+
+def test_timed_effects_expire():
+    sim = Simulation(seed=7, difficulty="EASY")
+    sim._apply_food_effect({"value": 3, "effect": "invincible", "duration": 1000})
+    assert sim.snake.invincible
+    clear_board(sim)
+    sim.change_direction(Direction.UP)
+    run_ticks(sim, TICK_RATE + 1)
+    assert not sim.snake.invincible
+
+
+def test_combo_window_is_measured_in_time():
+    sim = Simulation(seed=7, difficulty="EASY")
+    clear_board(sim)
+    sim.snake.speed = 1  # stay well clear of the walls
+    sim._apply_food_effect({"value": 0, "effect": "combo_boost", "duration": 0})
+    run_ticks(sim, COMBO_WINDOW * TICK_RATE // 1000)
+    assert sim.combo == 1
+    run_ticks(sim, 1)
+    assert sim.combo == 0
+
+
+def test_grid_tracks_snake_and_obstacles():
+    sim = Simulation(seed=11, difficulty="EASY")
+    clear_board(sim)
+    sim.snake.grow(3)
+    run_ticks(sim, 10 * TICK_RATE // int(sim.snake.speed))
+    assert sum(sim.grid.snake) == len(sim.snake.body) == 4
+    for cell in sim.snake.segments:
+        assert sim.grid.snake_count(cell) == 1
+
+    head = sim.snake.body[0]
+    block = [head[0] + BLOCK_SIZE, head[1]]
+    sim.obstacle._add_block(block)
+    sim.snake.invincible = True
+    events = run_ticks(sim, TICK_RATE // int(sim.snake.speed))
+    assert ("obstacle_break", block) in events
+    assert not sim.grid.has(*block, OccupancyGrid.OBSTACLE)
+    assert sim.obstacle.blocks == []
+
+def test_obstacle_revision_tracks_block_changes():
+    sim = Simulation(seed=11, difficulty="NORMAL")
+    obstacle = sim.obstacle
+    state = obstacle.snapshot()
+    revision = obstacle.revision
+    assert not obstacle.move(obstacle.move_timer)
+    assert obstacle.revision == revision
+    assert obstacle.move(obstacle.move_timer + obstacle.move_delay)
+    assert obstacle.revision > revision
+
+    revision = obstacle.revision
+    obstacle.remove(*obstacle.blocks[0])
+    assert obstacle.revision > revision
+    revision = obstacle.revision
+    obstacle.restore(state)
+    assert obstacle.revision > revision
+
+
+def test_snake_body_ring_buffer_wraps():
+    body = SnakeBody(capacity=4)
+    for cell in range(10):
+        body.push_head(cell)
+        if len(body) > 3:
+            assert body.pop_tail() == cell - 3
+    assert list(body) == [9, 8, 7]
+    assert body.cell(0) == 9 and body.cell(-1) == 7
+    for cell in range(10, 13):
+        body.push_head(cell)
+    assert list(body) == [12, 11, 10, 9, 8, 7]
+
+
+def test_food_spawns_on_the_last_free_cell():
+    grid = OccupancyGrid()
+    last = grid.spawnable[len(grid.spawnable) // 2]
+    for cell in grid.spawnable:
+        if cell != last:
+            grid.add_snake(cell)
+    assert list(grid.free) == [last]
+    food = FoodSystem(1, grid=grid)
+    assert OccupancyGrid.index(*food.food_items[0]["pos"]) == last
+    assert len(grid.free) == 0
+
+    grid.remove_snake(grid.spawnable[0])
+    assert list(grid.free) == [grid.spawnable[0]]
+
+
+def test_alias_table_follows_rarities():
+    food = FoodSystem(0, random.Random(0))
+    counts = Counter(food._pick_type().name for _ in range(20000))
+    assert counts["normal"] > counts["speed"] > counts["rainbow"] > 0
+
+    food.types = [replace(t, rarity=1 if t.name == "golden" else 0) for t in food.types]
+    assert {food._pick_type().name for _ in range(200)} == {"golden"}
+
+
+def test_cosmetic_streams_do_not_change_gameplay():
+    a = Simulation(seed=7)
+    b = Simulation(seed=7)
+    b.rngs["particles"].random()
+    b.rngs["menu"].random()
+    for sim in (a, b):
+        sim.change_direction(Direction.DOWN)
+        run_ticks(sim, 600)
+    assert [f["pos"] for f in a.food.food_items] == [f["pos"] for f in b.food.food_items]
+    assert a.obstacle.blocks == b.obstacle.blocks
+
+
+def play_greedy(sim, ticks):
+    rng = random.Random(sim.seed)
+    eaten = 0
+    for _ in range(ticks):
+        direction = greedy_policy(sim, rng)
+        if direction is not None:
+            sim.change_direction(direction)
+        eaten += sum(1 for event in sim.step() if event[0] == "eat")
+        if sim.over:
+            break
+    return eaten
+
+
+def test_reset_with_seed_matches_new_simulation():
+    # Food respawns index into the grid's free-cell order, so a reused
+    # simulation only replays like a fresh one if reset rebuilds it too
+    for mode in (GameMode.CLASSIC, GameMode.CAMPAIGN):
+        sim = Simulation(mode, seed=1, difficulty="HARD")
+        if mode == GameMode.CAMPAIGN:
+            sim.current_campaign_level = 2
+            sim.reset()  # a level restart keeps the level reached
+            assert sim.time_limit == sim.campaign_levels[2]["time"]
+        play_greedy(sim, 600)
+        for seed in (12, 3, 12):
+            sim.reset(seed=seed)
+            fresh = Simulation(mode, seed=seed, difficulty="HARD")
+            assert list(sim.grid.free) == list(fresh.grid.free)
+            assert sim.current_campaign_level == fresh.current_campaign_level == 0
+            assert sim.time_limit == fresh.time_limit
+            eaten = [play_greedy(s, 1500) for s in (sim, fresh)]
+            assert eaten[0] == eaten[1] >= 3
+            assert sim.tick_count == fresh.tick_count
+            assert sim.snake.body == fresh.snake.body
+            assert sim.obstacle.blocks == fresh.obstacle.blocks
+            assert [f["pos"] for f in sim.food.food_items] == [f["pos"] for f in fresh.food.food_items]
+            assert sim.score == fresh.score
+        sim.reset(seed=5, campaign_level=1)
+        assert sim.current_campaign_level == 1
+
+
+def test_timer_scheduler_arm_cancel_extend():
+    timers = TimerScheduler()
+    timers.arm("a", 10)
+    timers.arm("b", 5)
+    timers.arm("c", 10)
+    timers.arm("b", 12)  # re-arming replaces the old deadline
+    timers.extend("a", 5)
+    assert timers.cancel("c")
+    assert not timers.cancel("missing")
+    assert timers.pop_due(11) == []
+    assert timers.pop_due(15) == ["b", "a"]
+    assert len(timers) == 0
+
+    for i in range(100):
+        timers.arm("x", i)
+    assert len(timers.heap) < 100
+
+
+def test_effect_timers_freeze_and_survive_snapshots():
+    sim = Simulation(seed=7, difficulty="EASY")
+    clear_board(sim)
+    sim.snake.speed = 1
+    sim._apply_food_effect({"value": 3, "effect": "shield", "duration": 2000})
+    run_ticks(sim, TICK_RATE)
+    state = sim.snapshot()
+    assert sim.effect_remaining("shield") == 1
+
+    run_ticks(sim, TICK_RATE)
+    assert not sim.snake.shield
+    sim.restore(state)
+    assert sim.snake.shield
+    run_ticks(sim, TICK_RATE - 1)
+    assert sim.snake.shield
+    run_ticks(sim, 1)
+    assert not sim.snake.shield
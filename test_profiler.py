@@ -0,0 +1,60 @@
+import json
+
+from engine import Simulation, GameMode
+from profiler import Profiler, profiler
+
+
+def test_disabled_profiler_records_nothing():
+    prof = Profiler()
+    with prof.section("a"):
+        pass
+    prof.frame()
+    assert prof.frames == 0
+    assert not prof.history and not prof.trace
+
+
+def test_sections_feed_percentiles_and_flame_bar():
+    prof = Profiler(window=10)
+    prof.toggle()
+    for frame in range(20):
+        with prof.section("outer"):
+            with prof.section("inner"):
+                pass
+            if frame % 2:
+                with prof.section("odd"):
+                    pass
+        prof.frame()
+
+    assert len(prof.history["outer"]) == 10
+    # Frames where a stage didn't run count as zero
+    assert list(prof.history["odd"]).count(0) == 5
+    assert [(name, depth) for name, depth, _, _ in prof.last_frame] == [("inner", 1), ("odd", 1), ("outer", 0)]
+    p50, p95, p99 = prof.percentiles("outer")
+    assert 0 <= p50 <= p95 <= p99
+    assert {row[0] for row in prof.summary()} == {"outer", "inner", "odd"}
+
+
+def test_trace_export(tmp_path):
+    prof = Profiler()
+    prof.toggle()
+    with prof.section("work"):
+        pass
+    prof.frame()
+    path = tmp_path / "trace.json"
+    prof.dump_trace(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["work", "frame"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+
+
+def test_simulation_steps_are_timed():
+    sim = Simulation(GameMode.CLASSIC, "NORMAL", seed=1)
+    profiler.toggle()
+    try:
+        for _ in range(30):
+            sim.step()
+        profiler.frame()
+        stages = set(profiler.history)
+    finally:
+        profiler.toggle()
+    assert {"update.snake", "update.food", "update.obstacle", "update.collision"} <= stages
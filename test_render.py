@@ -0,0 +1,214 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+np = pytest.importorskip("numpy")
+pygame = pytest.importorskip("pygame")
+
+import main
+
+
+@pytest.fixture(scope="module")
+def font():
+    pygame.font.init()
+    return pygame.font.Font(None, 24)
+
+
+def test_text_cache_evicts_least_recently_used(font):
+    cache = main.TextCache(max_entries=3)
+    white = (255, 255, 255)
+    first = cache.render(font, "a", True, white)
+    cache.render(font, "b", True, white)
+    cache.render(font, "c", True, white)
+    assert cache.render(font, "a", True, white) is first  # "a" is now the most recent
+    cache.render(font, "d", True, white)
+    assert [key[1] for key in cache.surfaces] == ["c", "a", "d"]
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_text_cache_renders_changed_text_and_color(font):
+    cache = main.TextCache()
+    white = cache.render(font, "Score: 10", True, (255, 255, 255))
+    red = cache.render(font, "Score: 10", True, (255, 0, 0))
+    longer = cache.render(font, "Score: 100", True, (255, 255, 255))
+    assert len({id(white), id(red), id(longer)}) == 3
+    assert longer.get_width() > white.get_width()
+    # Composed from per-digit glyphs, but in the color asked for
+    pixels = pygame.surfarray.pixels3d(red)
+    alpha = pygame.surfarray.pixels_alpha(red)
+    opaque = alpha == 255
+    assert opaque.any() and (pixels[opaque] == (255, 0, 0)).all()
+    del pixels, alpha
+
+
+def test_text_cache_invalidate_drops_only_that_text(font):
+    cache = main.TextCache()
+    other = pygame.font.Font(None, 30)
+    stale = cache.render(font, "Music: On", True, (255, 255, 255))
+    cache.render(font, "Music: On", True, (0, 0, 0))
+    kept = cache.render(other, "Music: On", True, (255, 255, 255))
+    cache.invalidate(font, "Music: On")
+    assert all(key[0] is other for key in cache.surfaces)
+    assert cache.render(font, "Music: On", True, (255, 255, 255)) is not stale
+    assert cache.render(other, "Music: On", True, (255, 255, 255)) is kept
+
+
+def test_surface_cache_evicts_least_recently_used_past_max_bytes():
+    cache = main.SurfaceCache(max_bytes=3 * 10 * 10 * 4, alpha_step=5)
+    red, green, blue, white = (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 255)
+    first = cache.rect((10, 10), red, 100)
+    cache.rect((10, 10), green, 100)
+    cache.rect((10, 10), blue, 100)
+    assert cache.rect((10, 10), red, 99) is first  # alpha rounds onto the same entry
+    cache.rect((10, 10), white, 100)
+    assert [key[1] for key in cache.surfaces] == [blue, red, white]
+    assert cache.bytes == cache.max_bytes
+    assert (cache.hits, cache.misses) == (1, 4)
+
+    # Too big to keep at all: handed out, but nothing is evicted for it
+    cache.rect((20, 20), red, 100)
+    assert [key[1] for key in cache.surfaces] == [blue, red, white]
+    assert cache.misses == 5
+
+
+def emit_at(particles, xs, lifetime, emitter="effects"):
+    # One particle per x, standing still, so the x says which emit it came from
+    zeros = [0.0] * len(xs)
+    return particles.emit(list(xs), 0, zeros, zeros, lifetime, 2, (255, 255, 255), emitter=emitter)
+
+
+def test_particle_pool_reuses_freed_slots():
+    particles = main.ParticleSystem(capacity=8)
+    assert emit_at(particles, range(5), [1, 3, 1, 3, 1]) == 5
+    assert particles.top == 5 and len(particles) == 5
+    particles.update()
+    assert len(particles) == 2
+    assert sorted(particles.free[-3:]) == [0, 2, 4]
+
+    # The freed slots are handed out again before any fresh ones
+    assert emit_at(particles, [10, 11, 12], 5) == 3
+    assert particles.top == 5
+    assert sorted(particles.pos[[0, 2, 4], 0].tolist()) == [10, 11, 12]
+    assert particles.pos[[1, 3], 0].tolist() == [1, 3]
+
+
+def test_particle_pool_drops_when_full_and_clears_when_empty():
+    particles = main.ParticleSystem(capacity=4)
+    assert emit_at(particles, range(6), 2) == 4
+    assert emit_at(particles, [9], 2) == 0
+    particles.update()
+    particles.update()
+    assert len(particles) == 0
+    assert particles.top == 0 and particles.live == [0] * len(particles.EMITTERS)
+    assert emit_at(particles, [7], 2) == 1
+    assert particles.pos[0, 0] == 7
+
+
+def test_particle_emitters_stay_within_their_budgets():
+    particles = main.ParticleSystem(capacity=64)
+    particles.budgets = [64, 4, 6, 6]  # effects, trail, fire, ice
+    trail = particles.EMITTERS.index("trail")
+    assert emit_at(particles, range(10), 1, emitter="trail") == 4
+    assert emit_at(particles, [0], 1, emitter="trail") == 0
+    # A full trail budget doesn't hold back the other emitters
+    assert emit_at(particles, range(10), 2, emitter="fire") == 6
+    assert emit_at(particles, range(10), 2) == 10
+    assert particles.live == [10, 4, 6, 0]
+
+    # Trail particles dying make room for exactly that many more trail ones
+    particles.update()
+    assert particles.live == [10, 0, 6, 0]
+    assert emit_at(particles, range(10), 1, emitter="trail") == 4
+    assert particles.live[trail] == 4
+
+
+def run_frames(lod, ms, frames):
+    for _ in range(frames):
+        lod.spent = ms / 1000
+        lod.end_frame()
+
+
+def test_particle_lod_steps_down_over_budget():
+    lod = main.ParticleLOD(budget_ms=3.0)
+    run_frames(lod, 10.0, 3)
+    assert lod.level == 0  # the running average hasn't caught up yet
+    run_frames(lod, 10.0, 1)
+    assert lod.level == 1
+    run_frames(lod, 10.0, lod.SETTLE_FRAMES)
+    assert lod.level == 1  # settling before judging again
+    run_frames(lod, 10.0, 1)
+    assert lod.level == 2
+    run_frames(lod, 10.0, 200)
+    assert lod.level == len(lod.LEVELS) - 1 and not lod.circles
+
+
+def test_particle_lod_steps_back_up_well_under_budget():
+    lod = main.ParticleLOD(budget_ms=3.0)
+    lod.level = len(lod.LEVELS) - 1
+    lod.average_ms = 3.0
+    run_frames(lod, 2.0, 200)
+    assert lod.level == len(lod.LEVELS) - 1  # under budget, but not by half
+    run_frames(lod, 0.5, 300)
+    assert lod.level == 0 and lod.circles
+
+
+def test_particle_lod_scales_emission_and_drawing():
+    lod = main.ParticleLOD()
+    particles = main.ParticleSystem(capacity=64, lod=lod)
+    lod.level = 2
+    lifetime = lod.LEVELS[2][1]
+    assert emit_at(particles, range(10), 100) == 4  # ceil(10 * 0.35)
+    assert particles.max_life[0] == int(100 * lifetime)
+
+    lod.level = len(lod.LEVELS) - 1
+    surface = pygame.Surface((32, 32))
+    rects = particles.draw(surface)
+    assert all(rect.size == (1, 1) for rect in rects) and len(rects) == 4
+
+
+def test_rainbow_head_sprites_share_hue_buckets():
+    snake = main.Snake()
+    snake.skin_index = next(i for i, skin in enumerate(snake.skins) if skin.special_effect == "rainbow")
+    atlas = snake.skins[snake.skin_index].atlas()
+    atlas.heads.clear()
+    surface = pygame.Surface((main.SCREEN_WIDTH, main.SCREEN_HEIGHT))
+    for hue in range(400):  # more than a full trip round the hues
+        snake.draw(surface, hue * 1000 / main.BASE_SPEED)
+    # Per direction and tongue state, one head per hue bucket at most
+    assert len(atlas.heads) <= 2 * 360 // main.HUE_BUCKET
+
+
+def test_particle_sprites_blit_like_per_pixel_alpha():
+    sprites = main.ParticleSprites()
+    target = pygame.Surface((16, 16))
+    sprites.bind(target)
+    for radius, color, alpha in [(3, (255, 165, 0), 170), (4, (0, 255, 255), 60), (1, (255, 255, 255), 255)]:
+        key = int(sprites.keys(np.array([radius]), np.array([color]), np.array([alpha]))[0])
+        shade = [int(c) >> 3 << 3 | int(c) >> 5 for c in color]  # 5 bits a channel, spread back out
+        reference = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+        pygame.gfxdraw.filled_circle(reference, radius, radius, radius, shade)
+        reference.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+        for sprite in (sprites.sprite(key), reference):
+            target.fill((40, 80, 120))
+            target.blit(sprite, (2, 2))
+            if sprite is reference:
+                expected = pygame.surfarray.array3d(target).astype(int)
+            else:
+                got = pygame.surfarray.array3d(target).astype(int)
+        assert np.abs(got - expected).max() <= 1
+
+
+def test_particle_sprites_survive_a_second_target():
+    # SDL spoils RLE sprites blitted onto a new surface; bind() starts over
+    sprites = main.ParticleSprites()
+    first, second = pygame.Surface((16, 16)), pygame.Surface((16, 16))
+    key = int(sprites.keys(np.array([3]), np.array([(255, 165, 0)]), np.array([170]))[0])
+    sprites.bind(first)
+    first.blit(sprites.sprite(key), (0, 0))
+    sprites.bind(second)
+    second.fill((0, 0, 0))
+    second.blit(sprites.sprite(key), (0, 0))
+    assert np.abs(np.subtract(second.get_at((3, 3))[:3], (170, 110, 0))).max() <= 1
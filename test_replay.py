@@ -0,0 +1,101 @@
+import random
+import time
+
+from balance import greedy_policy
+from engine import Simulation, GameMode, Direction
+from replay import Replay, ReplayPlayer, ReplayRecorder, read_varint, write_varint
+
+
+def test_varint_round_trip():
+    out = bytearray()
+    values = [0, 1, 127, 128, 300, 2 ** 32 - 1]
+    for value in values:
+        write_varint(out, value)
+    pos, decoded = 0, []
+    while pos < len(out):
+        value, pos = read_varint(out, pos)
+        decoded.append(value)
+    assert decoded == values
+    assert len(out) == 1 + 1 + 1 + 2 + 2 + 5
+
+
+def play(sim, inputs, ticks):
+    pending = list(inputs)
+    while sim.tick_count < ticks and not sim.over:
+        while pending and pending[0][0] == sim.tick_count:
+            sim.change_direction(pending.pop(0)[1])
+        sim.step()
+
+
+def test_recorded_game_replays_exactly():
+    rng = random.Random(3)
+    sim = Simulation(GameMode.SURVIVAL, "HARD", seed=1234)
+    recorder = ReplayRecorder(sim.seed, sim.mode, sim.difficulty)
+    for _ in range(3000):
+        if rng.random() < 0.05:
+            direction = rng.choice(list(Direction))
+            recorder.record(sim.tick_count, direction)
+            sim.change_direction(direction)
+        sim.step()
+
+    replay = Replay.from_bytes(recorder.to_bytes(sim.tick_count))
+    assert (replay.seed, replay.mode, replay.difficulty, replay.length) == (1234, GameMode.SURVIVAL, "HARD", sim.tick_count)
+    assert len(replay.inputs) == recorder.count
+
+    again = Simulation(replay.mode, replay.difficulty, seed=replay.seed)
+    play(again, replay.inputs, replay.length)
+    assert again.snake.body == sim.snake.body
+    assert again.score == sim.score
+    assert again.lives == sim.lives
+    assert again.over == sim.over
+
+
+def test_ten_minute_session_is_a_few_kb():
+    recorder = ReplayRecorder(2 ** 31, GameMode.CLASSIC, "NORMAL")
+    rng = random.Random(0)
+    tick = 0
+    for _ in range(10 * 60 * 3):  # three turns a second
+        tick += rng.randrange(1, 40)
+        recorder.record(tick, rng.choice(list(Direction)))
+    assert len(recorder.to_bytes(tick)) < 4096
+
+
+def record_game(mode=GameMode.SURVIVAL, difficulty="HARD", seed=1234, ticks=3000):
+    rng = random.Random(seed)
+    sim = Simulation(mode, difficulty, seed=seed)
+    recorder = ReplayRecorder(sim.seed, sim.mode, sim.difficulty)
+    states = {}
+    for _ in range(ticks):
+        direction = greedy_policy(sim, rng)
+        if direction is not None and direction != sim.snake.next_direction:
+            recorder.record(sim.tick_count, direction)
+            sim.change_direction(direction)
+        sim.step()
+        states[sim.tick_count] = (list(sim.snake.body), sim.score, [f["pos"] for f in sim.food.food_items])
+        if sim.over:
+            break
+    return Replay.from_bytes(recorder.to_bytes(sim.tick_count)), states
+
+
+def test_seek_matches_straight_playback():
+    replay, states = record_game(GameMode.CLASSIC, "NORMAL", seed=5, ticks=4000)
+    player = ReplayPlayer(replay)
+    assert len(player.keyframes) == replay.length // ReplayPlayer.KEYFRAME_INTERVAL + 1
+    assert replay.length > 1000
+    for tick in [replay.length, 17, replay.length // 2, 1, replay.length - 1, 900]:
+        player.seek(tick)
+        assert player.tick == tick
+        assert (list(player.sim.snake.body), player.sim.score,
+                [f["pos"] for f in player.sim.food.food_items]) == states[tick]
+
+
+def test_seek_is_fast():
+    replay, _ = record_game(GameMode.SURVIVAL, "EASY", seed=8, ticks=36000)
+    assert replay.length > 10000
+    player = ReplayPlayer(replay)
+    worst = 0.0
+    for tick in random.Random(1).sample(range(replay.length), 20):
+        start = time.perf_counter()
+        player.seek(tick)
+        worst = max(worst, time.perf_counter() - start)
+    assert worst < 0.05
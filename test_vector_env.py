@@ -0,0 +1,104 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from constants import BLOCK_SIZE, GRID_WIDTH, TICK_RATE
+from vector_env import VectorSnakeEnv, ACTIONS, EMPTY, OBSTACLE, BODY, HEAD, FOOD
+from engine import Direction, FoodSystem, OccupancyGrid, Simulation
+
+RIGHT = ACTIONS.index(Direction.RIGHT)
+
+
+def test_board_matches_snake_bodies():
+    env = VectorSnakeEnv(num_envs=64, seed=0)
+    env.reset()
+    rng = np.random.default_rng(1)
+    for _ in range(500):
+        env.step(rng.integers(0, 4, env.num_envs))
+        snake = (env.board == BODY) | (env.board == HEAD)
+        assert (snake.sum(axis=1) + env.overlap.sum(axis=1) == env.size).all()
+        assert (env.board[np.arange(env.num_envs), env.head] == HEAD).all()
+
+
+def test_eating_scores_and_grows():
+    env = VectorSnakeEnv(num_envs=2, obstacle_count=0, seed=0)
+    env.reset()
+    normal = [t.name for t in env.food_types].index("normal")
+    for k in range(2):
+        env.board[k, env.food_pos[k]] = EMPTY
+        env.food_pos[k, 0] = env.head[k] + 1
+        env.food_type[k, 0] = normal
+        env.board[k, env.head[k] + 1] = FOOD + normal
+    _, rewards, terminated, _, _ = env.step([RIGHT, RIGHT])
+    assert rewards.tolist() == [1.0, 1.0]
+    assert not terminated.any()
+    assert env.length.tolist() == [2, 2]
+    env.step([RIGHT, RIGHT])
+    assert env.size.tolist() == [2, 2]
+
+
+def test_wall_crash_terminates_and_resets():
+    env = VectorSnakeEnv(num_envs=3, obstacle_count=0, food_count=0, seed=0)
+    env.reset()
+    for _ in range(GRID_WIDTH):
+        _, rewards, terminated, _, info = env.step([RIGHT] * 3)
+        if terminated.any():
+            break
+    assert terminated.all()
+    assert (rewards == -1.0).all()
+    assert "final_score" in info
+    assert (env.head == env.center).all()
+
+
+def test_shield_matches_simulation():
+    # Same board, snake and moves in both; the shield absorbs the first
+    # self-hit and the snake carries on over its own body, the second kills
+    cells = [10 * GRID_WIDTH + x for x in range(12, 6, -1)]
+    sim = Simulation(seed=0)
+    sim.obstacle.generate(0)
+    sim.food = FoodSystem(0, sim.rngs["food"], grid=sim.grid)
+    sim.snake.body = [list(OccupancyGrid.pixel(cell)) for cell in cells]
+    sim.snake.length = len(cells)
+    sim.snake.speed = TICK_RATE  # one move per tick
+    sim.snake.shield = True
+    sim.effect_timers.arm("shield", 10 ** 6)
+
+    env = VectorSnakeEnv(num_envs=1, food_count=0, obstacle_count=0, seed=0)
+    env.reset()
+    env.board[0] = EMPTY
+    env.body[0, :len(cells)] = cells
+    env.board[0, cells[1:]] = BODY
+    env.board[0, cells[0]] = HEAD
+    env.head[0], env.size[0], env.length[0] = cells[0], len(cells), len(cells)
+    env.shield_until[0] = 10 ** 9
+
+    moves = [Direction.DOWN, Direction.LEFT, Direction.UP, Direction.UP, Direction.UP,
+             Direction.LEFT, Direction.DOWN, Direction.RIGHT]
+    for move in moves:
+        sim.change_direction(move)
+        events = sim.step()
+        _, _, terminated, _, _ = env.step([ACTIONS.index(move)])
+        assert bool(terminated[0]) == sim.over
+        if sim.over:
+            break
+        body = [OccupancyGrid.index(*segment) for segment in sim.snake.body]
+        assert [int(env.body[0, (env.start[0] + i) % env.cells]) for i in range(env.size[0])] == body
+        assert (env.shield_until[0] > env.clock[0]) == sim.snake.shield
+        assert np.flatnonzero(env.board[0] >= BODY).tolist() == sorted(set(body))
+        if ("shield_break", sim.snake.body[0]) in events:
+            assert env.overlap[0, body[0]] == 1
+    assert sim.over and not sim.snake.shield
+
+
+def test_food_spawns_on_the_last_empty_cells():
+    env = VectorSnakeEnv(num_envs=2, food_count=1, obstacle_count=0, seed=0)
+    env.reset()
+    env.board[:] = OBSTACLE
+    spare = 5 * GRID_WIDTH + 7
+    env.board[0, spare] = EMPTY
+    env._spawn_food(np.array([0, 1]), np.array([0, 0]))
+    assert env.food_pos[0, 0] == spare and env.board[0, spare] >= FOOD
+    # Nowhere to go: the slot stays empty instead of pointing at a cell
+    assert env.food_pos[1, 0] == -1
+    assert env.food_expire[1, 0] <= env.clock[1]
+    assert not (env.board[1] >= FOOD).any()
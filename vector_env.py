@@ -0,0 +1,269 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from constants import *
+from engine import Direction, FOOD_TYPES
+
+# Batched version of the simulation for agent training and balance farms.
+# K games live side by side in NumPy arrays and every step() advances all of
+# them by one snake move. Food types, values and effects come straight from
+# engine.FOOD_TYPES so the rules stay in sync with the real game; obstacles
+# are placed like Obstacle.generate() but stay put, as on EASY.
+#
+# The observation is a (K, GRID_HEIGHT, GRID_WIDTH) uint8 board using the
+# cell codes below, with food stored as FOOD + index into `food_types`. It
+# is a view of the live board, so copy it if you need to keep it around.
+
+ACTIONS = [Direction.UP, Direction.DOWN, Direction.LEFT, Direction.RIGHT]
+DX = np.array([d.value[0] for d in ACTIONS], dtype=np.int32)
+DY = np.array([d.value[1] for d in ACTIONS], dtype=np.int32)
+OPPOSITE = np.array([ACTIONS.index(Direction((-d.value[0], -d.value[1]))) for d in ACTIONS], dtype=np.int8)
+
+EMPTY, OBSTACLE, BODY, HEAD, FOOD = 0, 1, 2, 3, 4
+
+EFFECTS = [None, "speed_boost", "slow_down", "invincible", "shield", "glow",
+           "score_multiplier", "shrink", "combo_boost", "bomb"]
+
+class VectorSnakeEnv:
+    def __init__(self, num_envs: int = 4096, food_count: int = 1, obstacle_count: int = 10,
+                 speed: float = BASE_SPEED, max_steps: int = 10000, death_penalty: float = 1.0,
+                 seed: Optional[int] = None):
+        self.num_envs = num_envs
+        self.food_count = food_count
+        self.obstacle_count = obstacle_count
+        self.start_speed = speed
+        self.max_steps = max_steps
+        self.death_penalty = death_penalty
+        self.rng = np.random.default_rng(seed)
+
+        self.food_types = list(FOOD_TYPES)
+        rarity = np.array([t.rarity for t in self.food_types], dtype=np.float64)
+        self.type_cdf = np.cumsum(rarity) / rarity.sum()
+        self.type_value = np.array([t.value for t in self.food_types], dtype=np.int64)
+        self.type_effect = np.array([EFFECTS.index(t.effect) for t in self.food_types], dtype=np.int8)
+        self.type_duration = np.array([t.duration if t.expires else np.inf for t in self.food_types])
+
+        k, n = num_envs, GRID_WIDTH * GRID_HEIGHT
+        self.cells = n
+        self.center = (GRID_HEIGHT // 2) * GRID_WIDTH + GRID_WIDTH // 2
+        self.board = np.zeros((k, n), dtype=np.uint8)
+        # Extra segments stacked on a cell, left behind when a shield saves a
+        # self-hit; the board only clears once the last of them moves off
+        self.overlap = np.zeros((k, n), dtype=np.uint8)
+        self.body = np.zeros((k, n), dtype=np.int32)
+        self.start = np.zeros(k, dtype=np.int32)
+        self.size = np.zeros(k, dtype=np.int32)
+        self.head = np.zeros(k, dtype=np.int32)
+        self.direction = np.zeros(k, dtype=np.int8)
+        self.length = np.zeros(k, dtype=np.int32)
+        self.growth = np.zeros(k, dtype=np.int32)
+        self.speed = np.zeros(k, dtype=np.float64)
+        self.clock = np.zeros(k, dtype=np.float64)
+        self.score = np.zeros(k, dtype=np.int64)
+        self.combo = np.zeros(k, dtype=np.int32)
+        self.combo_until = np.zeros(k, dtype=np.float64)
+        self.invincible_until = np.zeros(k, dtype=np.float64)
+        self.shield_until = np.zeros(k, dtype=np.float64)
+        self.steps = np.zeros(k, dtype=np.int32)
+        self.food_pos = np.zeros((k, food_count), dtype=np.int32)
+        self.food_type = np.zeros((k, food_count), dtype=np.int32)
+        self.food_expire = np.full((k, food_count), np.inf)
+        self._all = np.arange(k)
+        self.interior = np.array([y * GRID_WIDTH + x for y in range(1, GRID_HEIGHT - 1)
+                                  for x in range(1, GRID_WIDTH - 1)], dtype=np.int32)
+
+    @property
+    def observation(self) -> np.ndarray:
+        return self.board.reshape(self.num_envs, GRID_HEIGHT, GRID_WIDTH)
+
+    def reset(self, seed: Optional[int] = None) -> Tuple[np.ndarray, Dict]:
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset_envs(self._all)
+        return self.observation, {}
+
+    def _reset_envs(self, envs: np.ndarray) -> None:
+        if len(envs) == 0:
+            return
+        self.board[envs] = EMPTY
+        self.overlap[envs] = 0
+        self.start[envs] = 0
+        self.size[envs] = 1
+        self.head[envs] = self.center
+        self.body[envs, 0] = self.center
+        self.board[envs, self.center] = HEAD
+        self.direction[envs] = ACTIONS.index(Direction.RIGHT)
+        self.length[envs] = 1
+        self.growth[envs] = 0
+        self.speed[envs] = self.start_speed
+        self.clock[envs] = 0
+        self.score[envs] = 0
+        self.combo[envs] = 0
+        self.combo_until[envs] = 0
+        self.invincible_until[envs] = 0
+        self.shield_until[envs] = 0
+        self.steps[envs] = 0
+
+        # Same placement rule as Obstacle.generate: keep clear of the spawn area
+        if self.obstacle_count:
+            shape = (len(envs), self.obstacle_count)
+            x = self.rng.integers(0, GRID_WIDTH, shape)
+            y = self.rng.integers(0, GRID_HEIGHT, shape)
+            ok = (np.abs(x - GRID_WIDTH // 2) > 3) & (np.abs(y - GRID_HEIGHT // 2) > 3)
+            rows = np.broadcast_to(envs[:, None], shape)
+            self.board[rows[ok], (y * GRID_WIDTH + x)[ok]] = OBSTACLE
+
+        for slot in range(self.food_count):
+            self._spawn_food(envs, np.full(len(envs), slot))
+
+    def _spawn_food(self, envs: np.ndarray, slots: np.ndarray) -> None:
+        m = len(envs)
+        if m == 0:
+            return
+        types = np.searchsorted(self.type_cdf, self.rng.random(m), side="right")
+        types = np.minimum(types, len(self.food_types) - 1)
+
+        # Rejection-sample empty interior cells, a few rounds is plenty
+        pos = self._random_interior(m)
+        for _ in range(8):
+            taken = self.board[envs, pos] != EMPTY
+            if not taken.any():
+                break
+            pos[taken] = self._random_interior(int(taken.sum()))
+        else:
+            # A crowded board: pick from the cells that are actually empty.
+            # With none left the slot stays empty (-1) and expires straight
+            # away, so it tries again next step
+            for i in np.flatnonzero(self.board[envs, pos] != EMPTY):
+                empty = self.interior[self.board[envs[i], self.interior] == EMPTY]
+                pos[i] = self.rng.choice(empty) if len(empty) else -1
+
+        placed = pos >= 0
+        self.food_pos[envs, slots] = pos
+        self.food_type[envs, slots] = types
+        self.food_expire[envs, slots] = np.where(placed, self.clock[envs] + self.type_duration[types],
+                                                 self.clock[envs])
+        self.board[envs[placed], pos[placed]] = FOOD + types[placed]
+
+    def _random_interior(self, m: int) -> np.ndarray:
+        x = self.rng.integers(1, GRID_WIDTH - 1, m)
+        y = self.rng.integers(1, GRID_HEIGHT - 1, m)
+        return (y * GRID_WIDTH + x).astype(np.int32)
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict]:
+        actions = np.asarray(actions, dtype=np.int8)
+        k = self._all
+        turn = actions != OPPOSITE[self.direction]
+        self.direction = np.where(turn, actions, self.direction).astype(np.int8)
+
+        x = self.head % GRID_WIDTH + DX[self.direction]
+        y = self.head // GRID_WIDTH + DY[self.direction]
+        wall = (x < 0) | (x >= GRID_WIDTH) | (y < 0) | (y >= GRID_HEIGHT)
+        target = np.clip(y, 0, GRID_HEIGHT - 1) * GRID_WIDTH + np.clip(x, 0, GRID_WIDTH - 1)
+        moving = ~wall
+        shield = self.shield_until > self.clock
+        invincible = self.invincible_until > self.clock
+        interval = 1000 // self.speed
+
+        # Retire tail segments first so the head may follow its own tail
+        growing = moving & (self.growth > 0)
+        self.growth[growing] -= 1
+        pops = np.where(moving & ~growing, np.maximum(0, self.size + 1 - self.length), 0)
+        for p in range(int(pops.max(initial=0))):
+            envs = k[pops > p]
+            tail = self.body[envs, (self.start[envs] + self.size[envs] - 1) % self.cells]
+            stacked = self.overlap[envs, tail] > 0
+            self.overlap[envs[stacked], tail[stacked]] -= 1
+            self.board[envs[~stacked], tail[~stacked]] = EMPTY
+            self.size[envs] -= 1
+
+        hit = self.board[k, target]
+        self_hit = moving & ((hit == BODY) | (hit == HEAD))
+        obstacle_hit = moving & (hit == OBSTACLE)
+        breaks = obstacle_hit & (invincible | shield)
+        # As in Simulation._handle_collision, a shield absorbs one wall or
+        # self hit and is used up; the head still moves onto its body
+        dead = ((wall | self_hit) & ~shield) | (obstacle_hit & ~breaks)
+        self.shield_until[(wall | self_hit) & shield] = 0
+
+        # Push the new head
+        alive = moving & ~dead
+        envs = k[alive]
+        keeps_old_head = envs[self.size[envs] > 0]
+        self.board[keeps_old_head, self.head[keeps_old_head]] = BODY
+        self.start[envs] = (self.start[envs] - 1) % self.cells
+        self.body[envs, self.start[envs]] = target[envs]
+        self.size[envs] += 1
+        self.head[envs] = target[envs]
+        self.board[envs, target[envs]] = HEAD
+        saved = k[self_hit & shield]
+        self.overlap[saved, target[saved]] += 1
+
+        rewards = np.zeros(self.num_envs, dtype=np.float64)
+        eaten = k[alive & (hit >= FOOD)]
+        if len(eaten):
+            slots = np.argmax(self.food_pos[eaten] == target[eaten, None], axis=1)
+            rewards[eaten] = self._apply_food_effect(eaten, self.food_type[eaten, slots])
+            self._spawn_food(eaten, slots)
+
+        self.clock += interval
+        self.combo[self.clock > self.combo_until] = 0
+        expired_env, expired_slot = np.nonzero(self.food_expire <= self.clock[:, None])
+        if len(expired_env):
+            expired_pos = self.food_pos[expired_env, expired_slot]
+            keep = (expired_pos >= 0) & (self.board[expired_env, expired_pos] >= FOOD)
+            self.board[expired_env[keep], expired_pos[keep]] = EMPTY
+            self._spawn_food(expired_env, expired_slot)
+
+        self.steps += 1
+        rewards[dead] -= self.death_penalty
+        terminated = dead
+        truncated = ~dead & (self.steps >= self.max_steps)
+        done = terminated | truncated
+        info = {}
+        if done.any():
+            info["final_score"] = np.where(done, self.score, 0)
+            self._reset_envs(k[done])
+        return self.observation, rewards, terminated, truncated, info
+
+    def _apply_food_effect(self, envs: np.ndarray, types: np.ndarray) -> np.ndarray:
+        # Vectorized Simulation._apply_food_effect; glow and score_multiplier
+        # are cosmetic there and are skipped here
+        value = self.type_value[types]
+        combo = self.combo[envs]
+        value = np.where(combo > 1, (value * (1 + combo * 0.2)).astype(np.int64), value)
+        gained = np.maximum(0, value)
+        self.score[envs] += gained
+
+        effect = self.type_effect[types]
+        speed = self.speed[envs]
+        length = self.length[envs]
+        clock = self.clock[envs]
+        duration = self.type_duration[types]
+
+        speed = np.where(effect == EFFECTS.index("speed_boost"), np.minimum(speed + 3, MAX_SPEED), speed)
+        speed = np.where(effect == EFFECTS.index("slow_down"), np.maximum(speed - 3, MIN_SPEED), speed)
+        is_invincible = effect == EFFECTS.index("invincible")
+        self.invincible_until[envs[is_invincible]] = (clock + duration)[is_invincible]
+        is_shield = effect == EFFECTS.index("shield")
+        self.shield_until[envs[is_shield]] = (clock + duration)[is_shield]
+
+        is_shrink = effect == EFFECTS.index("shrink")
+        length = np.where(is_shrink, np.maximum(1, length - 2), length)
+        is_bomb = effect == EFFECTS.index("bomb")
+        length = np.where(is_bomb, np.maximum(1, length - 3), length)
+        speed = np.where(is_shrink | is_bomb, np.maximum(speed - 1, MIN_SPEED), speed)
+        speed = np.where(is_bomb, np.maximum(speed - 2, MIN_SPEED), speed)
+
+        is_combo = effect == EFFECTS.index("combo_boost")
+        self.combo[envs[is_combo]] += 1
+        self.combo_until[envs[is_combo]] = clock[is_combo] + COMBO_WINDOW
+
+        grows = value > 0
+        self.growth[envs] += np.where(grows, value, 0).astype(np.int32)
+        length = np.where(grows, length + value, length)
+        speed = np.where(grows, np.minimum(speed + 0.2, MAX_SPEED), speed)
+
+        self.speed[envs] = speed
+        self.length[envs] = length
+        return gained.astype(np.float64)